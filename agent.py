@@ -1,30 +1,36 @@
 # agent.py
 
-import requests
 import os
 import json
-from dotenv import load_dotenv
+import time
+import http_client
 from memory import Memory
-from tools import function_defs, handle_tool_call
+from tokenizer import count_message_tokens, count_tokens
+from tools import function_defs
+from executor import ToolExecutor
+from prefetch import Prefetcher
+from ratelimit import COMPLETION_RESERVE, estimate_request_tokens, groq_limiter
+from response_cache import response_cache
+from retry import CircuitBreaker, RetryPolicy, call_with_retry
+from tracing import tracer
 
-load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY") or None
-if GROQ_API_KEY is None:
-    print("Error: Please set your GROQ_API_KEY in the .env file")
-    exit(1)
+GROQ_API_KEY = None  # Set by load_config()
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_MODEL = "llama-3.3-70b-versatile"
 
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+# Shared by every agent in the process so an outage trips it once for all
+GROQ_BREAKER = CircuitBreaker("Groq API", failure_threshold=5, reset_timeout=30.0)
 
-class TaskTrekAgent:
-    def __init__(self):
-        # System prompt ready for ReAct enhancement
-        self.memory = Memory(
-            system_prompt="""You are TaskTrek, a helpful AI agent that assists users in solving tasks. Use available tools when needed.
+_tools_tokens = None  # Size of function_defs, counted on first use
+
+# System prompt ready for ReAct enhancement
+SYSTEM_PROMPT = """You are TaskTrek, a helpful AI agent that assists users in solving tasks. Use available tools when needed.
 
 Tool Usage Guidelines:
 - Use calculate() ONLY when the user asks for a specific calculation or mathematical computation
 - Use get_current_time() when asked about current time, date, "now", "today", etc.
 - Use days_between() for specific date difference calculations
+- To look at several files use ONE read_files() or file_info_many() call (a list of paths or a glob), not read_file() / file_info() per file
 - Respond directly for explanations, definitions, concepts, or general knowledge
 
 Examples:
@@ -33,74 +39,349 @@ Examples:
 - "what's power in math?" → explain directly, optionally show example with calculate
 - "what is electrical power?" → explain directly (concept/definition)
 - "what time is it?" → use get_current_time()"""
-        )
+
+def load_config():
+    """Load .env and return the Groq API key (None if unset).
+
+    Called when the first agent is created rather than at import time, so
+    importing this module has no side effects and stays cheap.
+    """
+    global GROQ_API_KEY
+    if GROQ_API_KEY is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        GROQ_API_KEY = os.getenv("GROQ_API_KEY") or None
+    return GROQ_API_KEY
+
+def tool_call_signature(tool_call):
+    """Identity of a tool call (name + normalized arguments) for repeat detection"""
+    arguments = tool_call["function"].get("arguments") or "{}"
+    try:
+        arguments = json.dumps(json.loads(arguments), sort_keys=True)
+    except (TypeError, ValueError):
+        pass
+    return (tool_call["function"]["name"], arguments)
+
+def request_token_estimate(payload, history_count=0, history_tokens=0):
+    """Rate-limiter cost of a Groq request. The first history_count messages
+    are Memory history, which Memory.get_history already estimated at
+    history_tokens; the rest (the turn's own messages), tool schemas and the
+    reply reserve are counted here"""
+    global _tools_tokens
+    if not groq_limiter.limits_tokens:
+        return 0
+    added = payload["messages"][history_count:]
+    tools_tokens = 0
+    if payload.get("tools"):
+        if _tools_tokens is None:
+            _tools_tokens = count_tokens(json.dumps(function_defs))
+        tools_tokens = _tools_tokens
+    return estimate_request_tokens(added, history_tokens, tools_tokens, payload.get("max_tokens", COMPLETION_RESERVE))
+
+def _drain(generator):
+    """Run a generator to completion and return its return value"""
+    try:
+        while True:
+            next(generator)
+    except StopIteration as stop:
+        return stop.value
+
+class TaskTrekAgent:
+    def __init__(self, token_budget=None, max_tool_rounds=5, turn_token_budget=20000, priority=0):
+        api_key = load_config()
+        if api_key is None:
+            raise Exception("Please set your GROQ_API_KEY in the .env file")
+        self.memory = Memory(system_prompt=SYSTEM_PROMPT, token_budget=token_budget)
         self.headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
+            "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
-        self.max_retries = 3
+        # Retries apply to the single failed Groq request, never the whole turn
+        self.retry_policy = RetryPolicy(max_attempts=3)
+        # Place in the shared Groq rate-limit queue (lower goes first)
+        self.priority = priority
+        self._last_estimate = 0
+        # (messages, tokens) of the Memory history the current turn starts with
+        self._turn_history = (0, 0)
+        self.tool_executor = ToolExecutor()
+        # Starts obvious tool calls (pasted URLs, "weather in X", file paths)
+        # while the first Groq request is in flight
+        self.prefetcher = Prefetcher(self.tool_executor, enabled=os.getenv("TASKTREK_PREFETCH", "1") != "0")
+        self._prefetch = None
+        
+        # Tool loop limits: LLM rounds that may request tools, and total tokens
+        # (prompt + completion, summed over round trips) one user turn may use
+        self.max_tool_rounds = max_tool_rounds
+        self.turn_token_budget = turn_token_budget
+        self.last_turn_stats = {}
+        self._last_usage = None
 
     def chat(self, user_input):
         """Main chat method - ready for ReAct enhancement"""
-        self.memory.add_user_message(user_input)
-        
-        # Execute task (ready to be enhanced with ReAct pattern)
-        return self._execute_task()
+        with tracer.span("turn", mode="chat"):
+            self.memory.add_user_message(user_input)
+            self._prefetch = self.prefetcher.start(user_input)
+            try:
+                # Execute task (ready to be enhanced with ReAct pattern)
+                return self._execute_task()
+            finally:
+                self._finish_prefetch()
     
     def _execute_task(self):
         """Execute task - structured for easy ReAct integration"""
-        for attempt in range(self.max_retries):
+        # This is where ReAct reasoning will be added:
+        # 1. Thought: Analyze what needs to be done
+        # 2. Action: Use tools or respond directly  
+        # 3. Observation: Review results
+        # 4. Answer: Provide final response
+        
+        # No retry loop here: each Groq request retries itself (see _post_groq),
+        # so tools that already ran are never run again
+        with tracer.span("history") as span:
+            history = list(self.memory.get_history())
+            span.set(messages=len(history))
+        self._turn_history = (len(history), self.memory.context_tokens)
+        response = _drain(self._run_turn(history))
+        with tracer.span("memory.save"):
+            self.memory.add_agent_message(response)
+        return response
+    
+    def chat_stream(self, user_input):
+        """Streaming chat - yields response text as tokens arrive.
+        
+        Memory is only updated once the whole turn (including any tool calls
+        and the follow-up response) has finished streaming.
+        """
+        with tracer.span("turn", mode="stream"):
+            user_message = {"role": "user", "content": user_input}
+            with tracer.span("history") as span:
+                messages = list(self.memory.get_history()) + [user_message]
+                span.set(messages=len(messages))
+            self._turn_history = (len(messages) - 1, self.memory.context_tokens)
+            
+            self._prefetch = self.prefetcher.start(user_input)
             try:
-                # This is where ReAct reasoning will be added:
-                # 1. Thought: Analyze what needs to be done
-                # 2. Action: Use tools or respond directly  
-                # 3. Observation: Review results
-                # 4. Answer: Provide final response
-                
-                response = self._call_groq_with_tools()
-                
-                # Handle tool calls if present
-                if self._has_tool_calls(response):
-                    tool_response = self._handle_tool_calls(response)
-                    self.memory.add_agent_message(tool_response)
-                    return tool_response
-                else:
-                    print("[LLM] Responding directly without tools")
-                    content = response['choices'][0]['message']['content']
-                    self.memory.add_agent_message(content)
-                    return content
-                    
-            except Exception as e:
-                if attempt == self.max_retries - 1:
-                    raise e
-                print(f"Retry {attempt + 1}/{self.max_retries} after error: {e}")
+                response = yield from self._run_turn(messages, stream=True)
+            finally:
+                self._finish_prefetch()
+            
+            with tracer.span("memory.save"):
+                self.memory.add_user_message(user_input)
+                self.memory.add_agent_message(response)
     
-    # Planning methods removed - ready for ReAct implementation
+    def _finish_prefetch(self):
+        """Cancel this turn's prefetches that the model didn't use"""
+        if self._prefetch is not None:
+            self._prefetch.finish()
+            self._prefetch = None
+    
+    def _run_turn(self, messages, stream=False):
+        """Iterative tool loop for one user turn.
         
-    def _call_groq_with_tools(self):
-        payload = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": self.memory.get_history(),
+        Each round, the assistant's tool_calls message and the matching
+        role "tool" results are appended to messages so the model sees what
+        its tools returned. The loop ends when the model answers without
+        tools; after max_tool_rounds, on turn_token_budget, or when it only
+        repeats earlier calls, one last round is forced to answer without
+        tools. Generator: yields streamed text, returns the memory entry.
+        """
+        stats = {"llm_round_trips": 0, "tool_calls": 0, "repeated_tool_calls": 0, "tokens": 0}
+        seen_results = {}   # tool_call_signature -> result from earlier rounds
+        tool_results = []
+        allow_tools = True
+        
+        while True:
+            self._last_usage = None
+            if stream:
+                message = yield from self._stream_groq_with_tools(messages, allow_tools)
+            else:
+                response = self._call_groq_with_tools(messages, allow_tools)
+                message = response['choices'][0]['message']
+            stats["llm_round_trips"] += 1
+            stats["tokens"] += self._usage_tokens(messages, message)
+            
+            tool_calls = message.get("tool_calls") if allow_tools else None
+            if not tool_calls:
+                break
+            
+            # Give every call an id so the tool results can reference it
+            for index, tool_call in enumerate(tool_calls):
+                if not tool_call.get("id"):
+                    tool_call["id"] = f"call_{stats['llm_round_trips']}_{index}"
+            messages.append({"role": "assistant", "content": message.get("content"), "tool_calls": tool_calls})
+            
+            # Only run calls we haven't already answered this turn
+            fresh = {}
+            for tool_call in tool_calls:
+                signature = tool_call_signature(tool_call)
+                if signature not in seen_results and signature not in fresh:
+                    fresh[signature] = tool_call
+            if fresh:
+                results = self._run_tool_calls(list(fresh.values()))
+                for (signature, tool_call), result in zip(fresh.items(), results):
+                    seen_results[signature] = result
+                    tool_results.append(f"{tool_call['function']['name']}: {result}")
+            stats["tool_calls"] += len(fresh)
+            stats["repeated_tool_calls"] += len(tool_calls) - len(fresh)
+            
+            for tool_call in tool_calls:
+                result = seen_results[tool_call_signature(tool_call)]
+                messages.append({"role": "tool", "tool_call_id": tool_call["id"], "content": str(result)})
+            
+            if not fresh:
+                print("[TOOL] Model repeated earlier tool calls - asking for a final answer")
+                allow_tools = False
+            elif stats["llm_round_trips"] >= self.max_tool_rounds:
+                print(f"[TOOL] Reached {self.max_tool_rounds} tool rounds - asking for a final answer")
+                allow_tools = False
+            elif stats["tokens"] >= self.turn_token_budget:
+                print(f"[TOOL] Turn used {stats['tokens']} tokens - asking for a final answer")
+                allow_tools = False
+        
+        content = message.get("content") or ""
+        self.last_turn_stats = stats
+        
+        if not tool_results:
+            if not stream:
+                print("[LLM] Responding directly without tools")
+            return content
+        
+        print(f"[LLM] Turn took {stats['llm_round_trips']} round trip(s), {stats['tool_calls']} tool call(s)")
+        # Combine tool summary with final response for memory
+        tool_summary = f"[TOOL] Used {len(tool_results)} tool(s): " + "; ".join(tool_results)
+        return f"{tool_summary}\n{content}"
+    
+    def _usage_tokens(self, messages, message):
+        """Tokens spent by the last call - API usage if reported, else estimated"""
+        if self._last_usage and self._last_usage.get("total_tokens"):
+            return self._last_usage["total_tokens"]
+        prompt = sum(count_message_tokens(m["role"], m.get("content") or "") for m in messages)
+        return prompt + count_message_tokens("assistant", message.get("content") or "")
+    
+    # Planning methods removed - ready for ReAct implementation
+    
+    def _groq_payload(self, messages, allow_tools=True):
+        return {
+            "model": GROQ_MODEL,
+            "messages": messages,
             "temperature": 0.7,
             "tools": function_defs,
-            "tool_choice": "auto"
+            "tool_choice": "auto" if allow_tools else "none"
         }
+    
+    def _stream_groq_with_tools(self, messages, allow_tools=True):
+        """Stream one completion over SSE, yielding content deltas.
+        
+        Returns the assembled assistant message (content + tool_calls).
+        """
+        payload = self._groq_payload(messages, allow_tools)
+        cached = response_cache.get(payload)
+        if cached is not None:
+            if cached.get("content"):
+                yield cached["content"]
+            return cached
+        payload["stream"] = True
+        
+        started = time.perf_counter()
+        response = self._post_groq(payload, stream=True)
+        
+        try:
+            if response.status_code != 200:
+                raise Exception(f"Groq API error {response.status_code}: {response.text}")
+            
+            content_parts = []
+            tool_calls = {}
+            # Body arrives as SSE events while the model generates
+            with tracer.span("llm.stream"):
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                
+                    chunk = json.loads(data)
+                    usage = chunk.get("usage") or chunk.get("x_groq", {}).get("usage")
+                    if usage:
+                        self._last_usage = usage
+                        self.memory.record_usage(usage)
+                        groq_limiter.settle(self._last_estimate, usage.get("total_tokens"))
+                    if not chunk.get("choices"):
+                        continue
+                    delta = chunk["choices"][0].get("delta", {})
+                
+                    if delta.get("content"):
+                        content_parts.append(delta["content"])
+                        yield delta["content"]
+                
+                    # Tool calls arrive in pieces keyed by index - stitch them together
+                    for part in delta.get("tool_calls") or []:
+                        call = tool_calls.setdefault(part.get("index", 0), {
+                            "id": None,
+                            "type": "function",
+                            "function": {"name": "", "arguments": ""}
+                        })
+                        if part.get("id"):
+                            call["id"] = part["id"]
+                        function = part.get("function") or {}
+                        if function.get("name"):
+                            call["function"]["name"] += function["name"]
+                        if function.get("arguments"):
+                            call["function"]["arguments"] += function["arguments"]
+        finally:
+            response.close()
+        
+        message = {"role": "assistant", "content": "".join(content_parts)}
+        if tool_calls:
+            message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+        response_cache.put(payload, message, time.perf_counter() - started, self._last_usage)
+        return message
+    
+    def _post_groq(self, payload, stream=False, history=None):
+        """POST to Groq, retrying just this request on rate limits, 5xx and timeouts.
+        
+        Every attempt first waits its turn in the process-wide rate limiter.
+        history is the (messages, tokens) Memory prefix of payload's messages,
+        by default the current turn's.
+        """
+        history_count, history_tokens = self._turn_history if history is None else history
+        tokens = self._last_estimate = request_token_estimate(payload, history_count, history_tokens)
+        
+        def send():
+            groq_limiter.acquire(tokens, self.priority)
+            response = http_client.post(GROQ_API_URL, kind="llm", headers=self.headers, json=payload, stream=stream)
+            groq_limiter.observe_headers(response.headers)
+            return response
+        
+        return call_with_retry(send, self.retry_policy, GROQ_BREAKER)
+    
+    def _call_groq_with_tools(self, messages=None, allow_tools=True):
+        history = None
+        if messages is None:
+            messages = self.memory.get_history()
+            history = (len(messages), self.memory.context_tokens)
+        payload = self._groq_payload(messages, allow_tools)
+        cached = response_cache.get(payload)
+        if cached is not None:
+            return {"choices": [{"index": 0, "message": cached, "finish_reason": "stop"}]}
 
-        response = requests.post(GROQ_API_URL, headers=self.headers, json=payload)
+        started = time.perf_counter()
+        response = self._post_groq(payload, history=history)
         
         if response.status_code != 200:
             raise Exception(f"Groq API error {response.status_code}: {response.text}")
-            
-        return response.json()
-
-    def _has_tool_calls(self, response):
-        message = response['choices'][0]['message']
-        return 'tool_calls' in message and message['tool_calls']
-
-    def _handle_tool_calls(self, response):
-        message = response['choices'][0]['message']
-        tool_calls = message['tool_calls']
         
+        with tracer.span("llm.decode"):
+            data = response.json()
+        # Keep the exact prompt size Groq billed for this turn
+        self._last_usage = data.get("usage")
+        self.memory.record_usage(self._last_usage)
+        groq_limiter.settle(self._last_estimate, (self._last_usage or {}).get("total_tokens"))
+        response_cache.put(payload, data["choices"][0]["message"], time.perf_counter() - started, self._last_usage)
+        return data
+
+    def _run_tool_calls(self, tool_calls):
+        """Execute tool calls and return their results in call order"""
         # Show which tools are being called
         print(f"[TOOL] Using {len(tool_calls)} tool(s):")
         for tool_call in tool_calls:
@@ -108,39 +389,38 @@ Examples:
             tool_args = tool_call['function']['arguments']
             print(f"[TOOL] → {tool_name}({tool_args})")
         
-        # Execute each tool call and collect results
-        tool_results = []
-        for tool_call in tool_calls:
-            result = handle_tool_call(tool_call)
+        # Execute the tool calls concurrently; results keep the call order
+        started = time.perf_counter()
+        results = []
+        for tool_call, result, elapsed in self.tool_executor.run(tool_calls, prefetched=self._prefetch):
             tool_name = tool_call['function']['name']
-            print(f"[TOOL] ← {tool_name} result: {result}")
-            tool_results.append(f"{tool_name}: {result}")
-        
-        # Create a summary of tool usage for memory
-        tool_summary = f"[TOOL] Used {len(tool_calls)} tool(s): " + "; ".join(tool_results)
+            print(f"[TOOL] ← {tool_name} result ({elapsed:.2f}s): {result}")
+            results.append(result)
+        if len(tool_calls) > 1:
+            print(f"[TOOL] {len(tool_calls)} tools finished in {time.perf_counter() - started:.2f}s")
         
-        # Get final response after tool execution
-        final_response = self._call_groq_with_tools()
-        final_content = final_response['choices'][0]['message']['content']
-        
-        # Combine tool summary with final response for memory
-        combined_response = f"{tool_summary}\n{final_content}"
-        return combined_response
+        return results
     
     # Helper methods for future ReAct implementation
     
     def _make_llm_call(self, messages, temperature=0.7):
         """Generic LLM call - useful for ReAct reasoning steps"""
         payload = {
-            "model": "llama-3.3-70b-versatile",
+            "model": GROQ_MODEL,
             "messages": messages,
             "temperature": temperature,
             "max_tokens": 1000
         }
         
-        response = requests.post(GROQ_API_URL, headers=self.headers, json=payload)
+        response = self._post_groq(payload, history=(0, 0))
         
         if response.status_code != 200:
             raise Exception(f"LLM API error {response.status_code}: {response.text}")
         
-        return response.json()['choices'][0]['message']['content']
\ No newline at end of file
+        data = response.json()
+        groq_limiter.settle(self._last_estimate, (data.get("usage") or {}).get("total_tokens"))
+        return data['choices'][0]['message']['content']
+    
+    def _call_llm_for_planning(self, prompt):
+        """Single tool-free completion used by SmartTaskPlanner"""
+        return self._make_llm_call([{"role": "user", "content": prompt}], temperature=0.3)
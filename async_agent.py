@@ -0,0 +1,214 @@
+# async_agent.py
+
+import asyncio
+import threading
+import time
+import http_client
+from agent import (
+    GROQ_API_URL, GROQ_BREAKER, GROQ_MODEL, SYSTEM_PROMPT, load_config, request_token_estimate, tool_call_signature
+)
+from async_tools import get_async_client, handle_tool_call_async
+from executor import tool_timeout
+from memory import Memory
+from persistence import PersistenceWorker
+from ratelimit import groq_limiter
+from registry import registry
+from response_cache import response_cache
+from retry import RetryPolicy, async_call_with_retry
+from tools import function_defs
+from tracing import tracer
+
+# One write-behind thread serves every async session in the process
+_shared_persistence = None
+
+
+def get_shared_persistence():
+    global _shared_persistence
+    if _shared_persistence is None:
+        _shared_persistence = PersistenceWorker()
+    return _shared_persistence
+
+
+class AsyncTaskTrekAgent:
+    """asyncio-native TaskTrek agent - one instance per conversation.
+
+    Many instances can run on a single event loop: Groq and the network
+    tools are awaited on a shared pooled AsyncClient, blocking tools run in
+    the default thread executor, and each session has its own Memory.
+    """
+
+    # Per-tool limits shared by every session on a loop: {loop: {name: Semaphore}}
+    _tool_limits = {}
+    _tool_limits_lock = threading.Lock()
+
+    def __init__(self, session_id=None, token_budget=None, max_retries=3,
+                 max_tool_rounds=5, turn_token_budget=20000, storage="journal", priority=0):
+        api_key = load_config()
+        if api_key is None:
+            raise Exception("Please set your GROQ_API_KEY in the .env file")
+        self.memory = Memory(
+            system_prompt=SYSTEM_PROMPT,
+            token_budget=token_budget,
+            session_id=session_id,
+            storage=storage,
+            persistence=get_shared_persistence() if storage != "none" else None
+        )
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        self.retry_policy = RetryPolicy(max_attempts=max_retries)
+        self.priority = priority  # Place in the shared Groq rate-limit queue
+        self.max_tool_rounds = max_tool_rounds
+        self.turn_token_budget = turn_token_budget
+        self.last_turn_stats = {}
+        # (messages, tokens) of the Memory history the current turn starts with
+        self._turn_history = (0, 0)
+
+    async def chat(self, user_input):
+        """Main chat method"""
+        with tracer.span("turn", mode="async"):
+            self.memory.add_user_message(user_input)
+            return await self._execute_task()
+
+    async def aclose(self):
+        """Flush this session to disk and compact its journal"""
+        return await asyncio.to_thread(self.memory.close)
+
+    async def _execute_task(self):
+        # Failed Groq requests retry themselves; the turn (and its tools) runs once
+        with tracer.span("history") as span:
+            history = list(self.memory.get_history())
+            span.set(messages=len(history))
+        self._turn_history = (len(history), self.memory.context_tokens)
+        response = await self._run_turn(history)
+        with tracer.span("memory.save"):
+            self.memory.add_agent_message(response)
+        return response
+
+    async def _run_turn(self, messages):
+        """Iterative tool loop - same rules as TaskTrekAgent._run_turn"""
+        stats = {"llm_round_trips": 0, "tool_calls": 0, "repeated_tool_calls": 0, "tokens": 0}
+        seen_results = {}
+        tool_results = []
+        allow_tools = True
+
+        while True:
+            response = await self._call_groq_with_tools(messages, allow_tools)
+            message = response['choices'][0]['message']
+            stats["llm_round_trips"] += 1
+            stats["tokens"] += (response.get("usage") or {}).get("total_tokens", 0)
+
+            tool_calls = message.get("tool_calls") if allow_tools else None
+            if not tool_calls:
+                break
+
+            for index, tool_call in enumerate(tool_calls):
+                if not tool_call.get("id"):
+                    tool_call["id"] = f"call_{stats['llm_round_trips']}_{index}"
+            messages.append({"role": "assistant", "content": message.get("content"), "tool_calls": tool_calls})
+
+            fresh = {}
+            for tool_call in tool_calls:
+                signature = tool_call_signature(tool_call)
+                if signature not in seen_results and signature not in fresh:
+                    fresh[signature] = tool_call
+            # Run all new tool calls concurrently; gather keeps the call order
+            results = await asyncio.gather(*(self._run_tool(call) for call in fresh.values()))
+            for (signature, tool_call), result in zip(fresh.items(), results):
+                seen_results[signature] = result
+                tool_results.append(f"{tool_call['function']['name']}: {result}")
+            stats["tool_calls"] += len(fresh)
+            stats["repeated_tool_calls"] += len(tool_calls) - len(fresh)
+
+            for tool_call in tool_calls:
+                result = seen_results[tool_call_signature(tool_call)]
+                messages.append({"role": "tool", "tool_call_id": tool_call["id"], "content": str(result)})
+
+            if (not fresh or stats["llm_round_trips"] >= self.max_tool_rounds
+                    or stats["tokens"] >= self.turn_token_budget):
+                allow_tools = False
+
+        self.last_turn_stats = stats
+        content = message.get("content") or ""
+        if not tool_results:
+            return content
+
+        tool_summary = f"[TOOL] Used {len(tool_results)} tool(s): " + "; ".join(tool_results)
+        return f"{tool_summary}\n{content}"
+
+    async def _call_groq_with_tools(self, messages, allow_tools=True):
+        payload = {
+            "model": GROQ_MODEL,
+            "messages": messages,
+            "temperature": 0.7,
+            "tools": function_defs,
+            "tool_choice": "auto" if allow_tools else "none"
+        }
+        cached = response_cache.get(payload)
+        if cached is not None:
+            return {"choices": [{"index": 0, "message": cached, "finish_reason": "stop"}]}
+        connect, read = http_client.TIMEOUTS["llm"]
+        tokens = request_token_estimate(payload, *self._turn_history)
+        started = time.perf_counter()
+
+        async def send():
+            await groq_limiter.acquire_async(tokens, self.priority)
+            with tracer.span("http.llm", method="POST") as span:
+                response = await get_async_client().post(
+                    GROQ_API_URL, headers=self.headers, json=payload,
+                    timeout=(connect, read, connect, connect)
+                )
+                span.set(status=response.status_code)
+            await groq_limiter.observe_headers_async(response.headers)
+            return response
+
+        response = await async_call_with_retry(send, self.retry_policy, GROQ_BREAKER)
+
+        if response.status_code != 200:
+            raise Exception(f"Groq API error {response.status_code}: {response.text}")
+
+        with tracer.span("llm.decode"):
+            data = response.json()
+        self.memory.record_usage(data.get("usage"))
+        await groq_limiter.settle_async(tokens, (data.get("usage") or {}).get("total_tokens"))
+        response_cache.put(payload, data["choices"][0]["message"], time.perf_counter() - started, data.get("usage"))
+        return data
+
+    async def _run_tool(self, tool_call):
+        name = tool_call['function']['name']
+        limit = self._tool_limit(name)
+        timeout = tool_timeout(name)
+        start = time.perf_counter()
+        try:
+            if limit is None:
+                with tracer.span(f"tool.{name}"):
+                    return await asyncio.wait_for(handle_tool_call_async(tool_call), timeout)
+            async with limit:
+                with tracer.span(f"tool.{name}", wait_ms=round((time.perf_counter() - start) * 1000, 3)):
+                    return await asyncio.wait_for(handle_tool_call_async(tool_call), timeout)
+        except asyncio.TimeoutError:
+            return f"Error: {name} timed out after {timeout:.0f}s"
+        except Exception as e:
+            return f"Error running {name}: {e}"
+        finally:
+            print(f"[TOOL] ← {name} ({time.perf_counter() - start:.2f}s)")
+
+    @classmethod
+    def _tool_limit(cls, name):
+        spec = registry.get(name)
+        if spec is None or not spec.max_concurrency:
+            return None
+        # Semaphores bind to (and keep a reference to) the loop they're first
+        # used on, so a weak key would never die: key by loop and drop the
+        # entries of closed loops - every asyncio.run closes its loop
+        loop = asyncio.get_running_loop()
+        with cls._tool_limits_lock:
+            limits = cls._tool_limits.get(loop)
+            if limits is None:
+                for old in [old for old in cls._tool_limits if old.is_closed()]:
+                    del cls._tool_limits[old]
+                limits = cls._tool_limits[loop] = {}
+            if name not in limits:
+                limits[name] = asyncio.Semaphore(spec.max_concurrency)
+            return limits[name]
@@ -0,0 +1,121 @@
+# async_tools.py
+
+import asyncio
+import http_client
+from cache import TOOL_TTLS, tool_cache, ttl_from_headers
+from extract import CHUNK_SIZE, PageExtractor
+from registry import registry
+from tools import (
+    URL_CONTENT_HEADERS, _format_weather, _format_web_search, _url_cache_lookup, _url_cache_store,
+    _weather_url, _web_search_url
+)
+
+_clients = {}
+
+
+def get_async_client():
+    """Pooled keep-alive AsyncClient, one per running event loop"""
+    try:
+        import httpx  # Only needed for the async agent
+    except ImportError:
+        raise RuntimeError("The async agent requires httpx (pip install httpx)")
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        for old in [old for old in _clients if old.is_closed()]:
+            del _clients[old]  # Its loop is gone - the client can't be used or closed
+        connect, read = http_client.TIMEOUTS["tool"]
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(
+                max_connections=http_client.POOL_CONNECTIONS * http_client.POOL_MAXSIZE,
+                max_keepalive_connections=http_client.POOL_MAXSIZE
+            ),
+            follow_redirects=True
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_async_client():
+    """Close the AsyncClient that belongs to the running event loop"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+@registry.async_impl("web_search")
+async def web_search(query: str) -> str:
+    """Search the web using DuckDuckGo API"""
+    try:
+        response = await get_async_client().get(_web_search_url(query))
+        response.raise_for_status()
+
+        return _format_web_search(query, response.json())
+
+    except Exception as e:
+        return f"Error searching web: {e}"
+
+
+@registry.async_impl("get_weather")
+async def get_weather(city: str) -> str:
+    """Get current weather for a city"""
+    try:
+        response = await get_async_client().get(_weather_url(city))
+        response.raise_for_status()
+
+        return _format_weather(city, response.json())
+
+    except Exception as e:
+        return f"Error getting weather for {city}: {e}"
+
+
+async def _fetch_page(url: str, key: str, headers: dict):
+    """GET and summarize a page; None if it answered 304 but the cached entry is gone"""
+    async with get_async_client().stream("GET", url, headers=headers) as response:
+        if response.status_code == 304:
+            # Page unchanged since we cached it
+            return tool_cache.refresh(key, ttl_from_headers(response.headers, TOOL_TTLS["url_content"]) or 0)
+        response.raise_for_status()
+
+        extractor = PageExtractor(response.headers.get("Content-Type"))
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            # HTML parsing is CPU-bound - keep it off the event loop
+            if await asyncio.to_thread(extractor.feed, chunk):
+                break
+    result = await asyncio.to_thread(extractor.summary, url)
+    _url_cache_store(key, response.headers, result)
+    return result
+
+
+@registry.async_impl("url_content")
+async def url_content(url: str) -> str:
+    """Fetch and summarize webpage content"""
+    try:
+        key, cached, headers = _url_cache_lookup(url)
+        if cached is not None:
+            return cached
+
+        result = await _fetch_page(url, key, headers)
+        if result is None:
+            # The entry was evicted before the 304 came back - fetch the page unconditionally
+            result = await _fetch_page(url, key, URL_CONTENT_HEADERS)
+        if result is None:
+            raise ValueError("server answered 304 Not Modified to an unconditional request")
+        return result
+
+    except Exception as e:
+        return f"Error fetching content from {url}: {e}"
+
+
+async def handle_tool_call_async(tool_call):
+    """Async dispatch: native coroutines for network tools, threads for the rest"""
+    spec, args = registry.parse_call(tool_call)
+    if spec is None:
+        return args
+
+    if spec.async_func is not None:
+        return await spec.async_func(**args)
+
+    # File and compute tools block - run them in the default thread executor
+    return await asyncio.to_thread(spec.resolve(), **args)
@@ -0,0 +1,201 @@
+# batch.py
+"""Run a JSONL file of tasks through the agent without the interactive loop.
+
+    python batch.py tasks.jsonl -w 8 -o results.jsonl
+    cat tasks.jsonl | python batch.py - > results.jsonl
+    python batch.py tasks.jsonl -o results.jsonl --resume
+
+Each input line is a JSON object with the prompt under "prompt", "task",
+"input" or "body" (plain text lines are used as the prompt) and an optional
+id under "id", "task_id" or "request_id" (defaults to the line number).
+Every task gets its own AsyncTaskTrekAgent, so no memory leaks between tasks.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+
+from agent import load_config
+from async_agent import AsyncTaskTrekAgent
+from async_tools import close_async_client
+
+ID_KEYS = ("id", "task_id", "request_id")
+PROMPT_KEYS = ("prompt", "task", "input", "body")
+
+
+def parse_task(line, line_number):
+    """(task_id, prompt) from one input line, or None for blank lines"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        record = line
+    if not isinstance(record, dict):
+        return str(line_number), str(record)
+
+    task_id = next((record[key] for key in ID_KEYS if key in record), line_number)
+    prompt = next((record[key] for key in PROMPT_KEYS if key in record), None)
+    if prompt is None:
+        raise ValueError(f"line {line_number}: no prompt field (expected one of {', '.join(PROMPT_KEYS)})")
+    if record.get("title") and "body" in record and "prompt" not in record:
+        prompt = f"{record['title']}\n\n{prompt}"
+    return str(task_id), prompt
+
+
+def prepare_resume(output_file):
+    """Ids that finished successfully in a previous run (for --resume).
+
+    The output file is rewritten to hold just those results, so the retried
+    failures and a torn last line from an interrupted run don't end up next
+    to (or glued onto) the records this run appends.
+    """
+    done = set()
+    if not output_file or not os.path.exists(output_file):
+        return done
+    kept = []
+    dropped = False
+    with open(output_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                dropped = True  # Torn last line from an interrupted run
+                continue
+            task_id = str(result.get("id"))
+            if result.get("status") != "ok" or task_id in done or not line.endswith("\n"):
+                dropped = True
+                continue
+            done.add(task_id)
+            kept.append(line)
+    if dropped:
+        tmp_file = output_file + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.writelines(kept)
+        os.replace(tmp_file, output_file)
+    return done
+
+
+class BatchRunner:
+    """Feeds tasks to a fixed number of concurrent workers and streams results"""
+
+    def __init__(self, workers=4, out=None, save_sessions=False, agent_kwargs=None):
+        self.workers = workers
+        self.out = out or sys.stdout
+        self.storage = "journal" if save_sessions else "none"
+        self.agent_kwargs = agent_kwargs or {}
+        self.stats = {"ok": 0, "error": 0, "skipped": 0, "tokens": 0, "tool_calls": 0}
+
+    async def run(self, lines, skip_ids=()):
+        queue = asyncio.Queue(maxsize=self.workers * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.workers)]
+        # Reading a file or stdin blocks - do it on a thread so the workers
+        # keep running while the next line is awaited
+        lines = iter(lines)
+        line_number = 0
+        try:
+            while True:
+                line = await asyncio.to_thread(next, lines, None)
+                if line is None:
+                    break
+                line_number += 1
+                try:
+                    task = parse_task(line, line_number)
+                except ValueError as e:
+                    self._write({"id": str(line_number), "status": "error", "error": str(e)})
+                    continue
+                if task is None:
+                    continue
+                if task[0] in skip_ids:
+                    self.stats["skipped"] += 1
+                    continue
+                await queue.put(task)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await close_async_client()
+        return self.stats
+
+    async def _worker(self, queue):
+        while True:
+            task = await queue.get()
+            if task is None:
+                return
+            self._write(await self.run_task(*task))
+
+    async def run_task(self, task_id, prompt):
+        """Run one task on a fresh agent and return its result record"""
+        agent = AsyncTaskTrekAgent(session_id=f"batch_{task_id}", storage=self.storage, **self.agent_kwargs)
+        result = {"id": task_id, "status": "ok"}
+        start = time.perf_counter()
+        try:
+            result["response"] = await agent.chat(prompt)
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        result.update(agent.last_turn_stats)
+        if self.storage != "none":
+            result["session_file"] = await agent.aclose()
+        return result
+
+    def _write(self, result):
+        self.stats[result["status"]] += 1
+        self.stats["tokens"] += result.get("tokens", 0)
+        self.stats["tool_calls"] += result.get("tool_calls", 0)
+        # One line per task, flushed immediately so --resume sees it after a crash
+        self.out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.out.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a JSONL file of tasks through TaskTrek")
+    parser.add_argument("input", nargs="?", default="-", help="tasks file (JSONL), or - for stdin")
+    parser.add_argument("-o", "--output", help="results file (JSONL); default stdout")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="concurrent tasks")
+    parser.add_argument("--resume", action="store_true", help="skip tasks already completed in --output")
+    parser.add_argument("--save-sessions", action="store_true", help="save each task's conversation")
+    parser.add_argument("--max-tool-rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if load_config() is None:
+        print("Error: Please set your GROQ_API_KEY in the .env file", file=sys.stderr)
+        return 1
+    if args.resume and not args.output:
+        parser.error("--resume needs --output")
+
+    skip_ids = prepare_resume(args.output) if args.resume else set()
+    source = sys.stdin if args.input == "-" else open(args.input, 'r', encoding='utf-8')
+    out = open(args.output, 'a' if args.resume else 'w', encoding='utf-8') if args.output else sys.stdout
+    runner = BatchRunner(
+        workers=args.workers, out=out, save_sessions=args.save_sessions,
+        agent_kwargs={"max_tool_rounds": args.max_tool_rounds}
+    )
+
+    start = time.perf_counter()
+    try:
+        # Agent progress lines go to stderr so stdout stays valid JSONL
+        with contextlib.redirect_stdout(sys.stderr):
+            stats = asyncio.run(runner.run(source, skip_ids))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"[BATCH] {stats['ok']} ok, {stats['error']} failed, {stats['skipped']} skipped "
+          f"in {time.perf_counter() - start:.1f}s ({stats['tokens']} tokens, "
+          f"{stats['tool_calls']} tool calls)", file=sys.stderr)
+    return 1 if stats["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# benchmarks/html_extract.py
+"""url_content extraction benchmark over saved HTML pages.
+
+    python benchmarks/html_extract.py                 # corpus pages + 4 MiB inflated copies
+    python benchmarks/html_extract.py --inflate-mb 0  # corpus pages only
+
+Compares the old approach (whole body decoded, BeautifulSoup html.parser
+tree, decompose passes, keep 500 chars) with extract.PageExtractor fed in
+CHUNK_SIZE chunks, for each available parser backend. Reports median time,
+peak allocations, how much of the body was read, and whether the summary
+matches the old one. Inflated pages repeat a page's body after the
+original, like long comment threads on a real article.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+CORPUS_DIR = os.path.join(BENCH_DIR, "html_corpus")
+sys.path.insert(0, ROOT)
+
+import extract  # noqa: E402
+from extract import CHUNK_SIZE, PageExtractor, sniff_charset  # noqa: E402
+
+URL = "https://example.com/page"
+
+
+def legacy_summarize(url, html):
+    """url_content's extraction before the streaming engine"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup(['script', 'style', 'nav', 'footer', 'aside', 'header', 'noscript']):
+        element.decompose()
+    for element in soup.find_all(attrs={'class': ['ad', 'advertisement', 'sidebar', 'menu', 'navigation']}):
+        element.decompose()
+    main_content = (
+        soup.find('article') or
+        soup.find('main') or
+        soup.find('div', {'class': ['content', 'main-content', 'post-content']}) or
+        soup.find('body')
+    )
+    if not main_content:
+        return f"Error: Could not find main content in {url}"
+    text_content = re.sub(r'\s+', ' ', main_content.get_text(separator=' ', strip=True)).strip()
+    if len(text_content) > 500:
+        return f"Content from {url}: {text_content[:500]}..."
+    return f"Content from {url}: {text_content}"
+
+
+def legacy(body):
+    # The old tool decoded the whole body (response.text) before parsing
+    return legacy_summarize(URL, body.decode(sniff_charset("text/html", body), errors="replace")), len(body)
+
+
+def streaming(body):
+    extractor = PageExtractor("text/html", max_bytes=len(body) + 1)
+    for offset in range(0, len(body), CHUNK_SIZE):
+        if extractor.feed(body[offset:offset + CHUNK_SIZE]):
+            break
+    return extractor.summary(URL), extractor.bytes_read
+
+
+def load_corpus(inflate_mb):
+    pages = []
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        with open(os.path.join(CORPUS_DIR, name), 'rb') as f:
+            body = f.read()
+        pages.append((name, body))
+        if inflate_mb:
+            start, end = body.find(b"<body"), body.rfind(b"</body>")
+            inner = body[body.find(b">", start) + 1:end]
+            copies = max(1, int(inflate_mb * 1024 * 1024 / len(inner)))
+            pages.append((f"{name} x{copies}", body[:end] + inner * copies + body[end:]))
+    return pages
+
+
+def measure(function, body, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(body)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, statistics.median(times) * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="url_content extraction benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--inflate-mb", type=float, default=4.0, help="also test pages padded to this size")
+    args = parser.parse_args()
+
+    engines = []
+    try:
+        import bs4  # noqa: F401
+        engines.append(("bs4 (old)", legacy))
+    except ImportError:
+        print("bs4 not installed - skipping the old extractor")
+    backends = ["html.parser"]
+    try:
+        import lxml.etree  # noqa: F401
+        backends.append("lxml")
+    except ImportError:
+        print("lxml not installed - streaming engine uses html.parser only")
+    for backend in backends:
+        def run(body, backend=backend):
+            extract._backend = backend
+            return streaming(body)
+        engines.append((f"stream/{backend}", run))
+
+    totals = {name: 0.0 for name, _ in engines}
+    print(f"{'page':<34} {'engine':<20} {'size KiB':>9} {'read KiB':>9} {'ms':>9} {'peak KiB':>9}  same")
+    for page, body in load_corpus(args.inflate_mb):
+        reference = None
+        for name, function in engines:
+            (summary, read), ms, peak = measure(function, body, args.repeat)
+            reference = reference or summary
+            totals[name] += ms
+            print(f"{page:<34} {name:<20} {len(body) / 1024:9.1f} {read / 1024:9.1f} {ms:9.2f} {peak:9.1f}  "
+                  f"{'yes' if summary == reference else 'NO'}")
+
+    print()
+    baseline = next(iter(totals.values()))
+    for name, total in totals.items():
+        print(f"{name:<20} total {total:9.2f} ms  ({baseline / total:.1f}x vs {next(iter(totals))})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+# benchmarks/mock_server.py
+"""Local stand-ins for every network dependency, for offline benchmarks.
+
+One threaded HTTP server provides:
+    POST /openai/v1/chat/completions   OpenAI-compatible Groq mock (JSON + SSE)
+    GET  /wttr/<city>?format=j1        wttr.in-shaped weather
+    GET  /ddg/?q=...                   DuckDuckGo Instant Answer-shaped search
+    GET  /pages/<name>                 HTML article pages
+
+The Groq mock is scripted: each script is matched by a keyword in the last
+user message and lists what the model does on each round of the turn - a
+list of (tool_name, arguments) calls, or a final text answer. "{base_url}"
+in tool arguments is replaced with the server's address.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, unquote, urlparse
+
+LLM_PATH = "/openai/v1/chat/completions"
+
+PAGE_TEMPLATE = """<html><head><title>{title}</title></head><body>
+<nav><a href="/">Home</a> <a href="/about">About</a></nav>
+<main><article><h1>{title}</h1>{paragraphs}</article></main>
+<footer>Copyright Example Corp</footer></body></html>"""
+
+
+def tool_call(name, **arguments):
+    """A scripted tool call for one round"""
+    return (name, arguments)
+
+
+def env_for(base_url):
+    """Environment variables that point TaskTrek at a mock server"""
+    return {
+        "GROQ_API_URL": base_url + LLM_PATH,
+        "TASKTREK_WEATHER_URL": base_url + "/wttr",
+        "TASKTREK_WEB_SEARCH_URL": base_url + "/ddg/"
+    }
+
+
+class MockServer:
+    """Threaded mock of the Groq API plus the public tool APIs.
+
+    latency / tool_latency are seconds added to every LLM / tool response;
+    jitter adds up to that fraction of random extra delay.
+    """
+
+    def __init__(self, latency=0.0, tool_latency=0.0, jitter=0.0, scripts=None, seed=0, port=0):
+        self.latency = latency
+        self.tool_latency = tool_latency
+        self.jitter = jitter
+        self.scripts = dict(scripts or {})
+        self.requests = {"llm": 0, "weather": 0, "search": 0, "pages": 0}
+        self.port = port
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Environment variables that point TaskTrek at this server"""
+        return env_for(self.base_url)
+
+    def page_url(self, name):
+        return f"{self.base_url}/pages/{name}"
+
+    def start(self):
+        server = self
+
+        class Handler(_Handler):
+            mock = server
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="mock-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def delay(self, seconds):
+        if seconds <= 0:
+            return
+        with self._lock:
+            extra = self._random.random() * self.jitter * seconds
+        time.sleep(seconds + extra)
+
+    def count(self, kind):
+        with self._lock:
+            self.requests[kind] += 1
+
+    def reply_for(self, body):
+        """Assistant message for a chat completion request"""
+        messages = body.get("messages", [])
+        user_index = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+        prompt = (messages[user_index].get("content") or "") if user_index >= 0 else ""
+        # Rounds already taken this turn = assistant tool_call messages after the user message
+        turn = messages[user_index + 1:]
+        round_index = sum(1 for m in turn if m.get("tool_calls"))
+
+        script = next((steps for keyword, steps in self.scripts.items() if keyword in prompt), None)
+        tools_allowed = body.get("tools") and body.get("tool_choice") != "none"
+        step = script[round_index] if script and round_index < len(script) else None
+
+        if tools_allowed and isinstance(step, list):
+            return {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{round_index}_{index}",
+                        "type": "function",
+                        "function": {
+                            "name": name,
+                            "arguments": json.dumps(arguments).replace("{base_url}", self.base_url)
+                        }
+                    }
+                    for index, (name, arguments) in enumerate(step)
+                ]
+            }
+        if isinstance(step, str):
+            return {"role": "assistant", "content": step}
+        tool_results = sum(1 for m in turn if m.get("role") == "tool")
+        return {"role": "assistant", "content": f"Mock answer using {tool_results} tool result(s)."}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes
+    mock = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        if self.path != LLM_PATH:
+            return self._send(404, b"not found", "text/plain")
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self.mock.count("llm")
+        self.mock.delay(self.mock.latency)
+
+        message = self.mock.reply_for(body)
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        completion_tokens = len(json.dumps(message)) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        if body.get("stream"):
+            return self._send_stream(message, usage)
+        payload = {
+            "id": "mock",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": usage
+        }
+        self._send(200, json.dumps(payload).encode(), "application/json")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/wttr/"):
+            self.mock.count("weather")
+            self.mock.delay(self.mock.tool_latency)
+            city = unquote(url.path[len("/wttr/"):])
+            temp = sum(map(ord, city)) % 35
+            data = {"current_condition": [{
+                "temp_C": str(temp), "temp_F": str(temp * 9 // 5 + 32),
+                "weatherDesc": [{"value": "Partly cloudy"}], "humidity": "60"
+            }]}
+            return self._send(200, json.dumps(data).encode(), "application/json")
+
+        if url.path == "/ddg/":
+            self.mock.count("search")
+            self.mock.delay(self.mock.tool_latency)
+            query = parse_qs(url.query).get("q", [""])[0]
+            data = {"AbstractText": f"{query} is a topic with a long mock abstract. " * 20}
+            return self._send(200, json.dumps(data).encode(), "application/json")
+
+        if url.path.startswith("/pages/"):
+            self.mock.count("pages")
+            self.mock.delay(self.mock.tool_latency)
+            name = unquote(url.path[len("/pages/"):])
+            paragraphs = "".join(
+                f"<p>Paragraph {i} of {name}: benchmark text about {name} and related topics.</p>"
+                for i in range(40)
+            )
+            html = PAGE_TEMPLATE.format(title=name.title(), paragraphs=paragraphs)
+            return self._send(200, html.encode(), "text/html; charset=utf-8")
+
+        self._send(404, b"not found", "text/plain")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, message, usage):
+        """Send the message as OpenAI-style SSE chunks"""
+        chunks = []
+        if message.get("tool_calls"):
+            for index, call in enumerate(message["tool_calls"]):
+                chunks.append({"tool_calls": [{
+                    "index": index, "id": call["id"], "type": "function",
+                    "function": {"name": call["function"]["name"], "arguments": call["function"]["arguments"]}
+                }]})
+        else:
+            words = (message.get("content") or "").split(" ")
+            chunks.extend({"content": word + (" " if i < len(words) - 1 else "")} for i, word in enumerate(words))
+
+        events = [json.dumps({"choices": [{"index": 0, "delta": delta}]}) for delta in chunks]
+        events.append(json.dumps({"choices": [], "x_groq": {"usage": usage}}))
+        events.append("[DONE]")
+        body = "".join(f"data: {event}\n\n" for event in events).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _serve(options, ready):
+    server = MockServer(**options).start()
+    ready.put(server.base_url)
+    threading.Event().wait()
+
+
+def start_in_subprocess(**options):
+    """Run a MockServer in a child process so its work and allocations
+    don't show up in the benchmarked process. Returns (process, base_url)."""
+    import multiprocessing
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    process = context.Process(target=_serve, args=(options, ready), daemon=True)
+    process.start()
+    return process, ready.get(timeout=30)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the mock Groq / tool API server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per LLM response")
+    parser.add_argument("--tool-latency", type=float, default=0.0, help="seconds per tool API response")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    args = parser.parse_args()
+
+    mock = MockServer(args.latency, args.tool_latency, args.jitter, port=args.port).start()
+    print("Mock server running. Point TaskTrek at it with:")
+    for key, value in mock.env().items():
+        print(f"  export {key}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        mock.stop()
@@ -0,0 +1,277 @@
+# benchmarks/run.py
+"""Offline benchmark suite - no Groq key or internet needed.
+
+    python benchmarks/run.py                          # run and print a report
+    python benchmarks/run.py --save                   # also store baselines/<commit>.json
+    python benchmarks/run.py --compare baselines/X.json
+
+Every network dependency is served by benchmarks/mock_server.py in a child
+process. Each scenario reports p50/p95/p99 latency per operation,
+throughput, and allocations per operation (a separate tracemalloc pass, so
+tracing overhead doesn't skew the timings).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from mock_server import env_for, start_in_subprocess, tool_call
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+PLAN = json.dumps({
+    "goal": "Review the Python files",
+    "steps": [
+        {"step": 1, "description": "List the files", "tool_needed": "list_files", "expected_output": "file list"},
+        {"step": 2, "description": "Read each file", "tool_needed": "read_file", "expected_output": "contents"},
+        {"step": 3, "description": "Summarize", "tool_needed": None, "expected_output": "summary"}
+    ]
+})
+
+# Keyword in the user prompt -> what the mock model does each round
+SCRIPTS = {
+    "trip": [
+        [tool_call("get_weather", city="Paris"), tool_call("get_weather", city="Tokyo"),
+         tool_call("web_search", query="Paris travel tips")],
+        [tool_call("url_content", url="{base_url}/pages/paris-guide")],
+    ],
+    "task planning assistant": [PLAN],
+}
+
+
+class Scenario:
+    """A named, repeatable operation with optional setup/teardown"""
+
+    def __init__(self, name, operation, setup=None, teardown=None, iterations=100):
+        self.name = name
+        self.operation = operation
+        self.setup = setup
+        self.teardown = teardown
+        self.iterations = iterations
+
+
+def build_scenarios(scale=1.0):
+    """Scenarios over TaskTrekAgent, Memory, handle_tool_call and SmartTaskPlanner"""
+    # Imported here so the mock endpoints in os.environ are picked up
+    from agent import TaskTrekAgent
+    from cache import tool_cache
+    from memory import Memory
+    from planner import SmartTaskPlanner
+    from tools import handle_tool_call
+
+    state = {}
+    count = lambda n: max(1, int(n * scale))
+
+    def new_agent():
+        state["agent"] = TaskTrekAgent()
+
+    def close_agent():
+        state.pop("agent").memory.close()
+
+    def chat_direct(i):
+        state["agent"].chat(f"Explain recursion in one sentence ({i})")
+
+    def chat_tools(i):
+        tool_cache.clear()  # Measure the network path, not cache hits
+        state["agent"].chat(f"Plan a trip to Paris and Tokyo ({i})")
+
+    def chat_stream(i):
+        tool_cache.clear()
+        for _ in state["agent"].chat_stream(f"Plan a trip to Paris and Tokyo ({i})"):
+            pass
+
+    def new_memory():
+        state["memory"] = Memory("You are a benchmark.", durability="flush")
+
+    def close_memory():
+        state.pop("memory").close()
+
+    def memory_persist(i):
+        memory = state["memory"]
+        memory.add_user_message(f"Remember that benchmark item {i} is important to me.")
+        memory.add_agent_message(f"Noted item {i}. " + "Details. " * 20)
+        memory.get_history()
+
+    local_calls = [
+        {"function": {"name": "calculate", "arguments": '{"expression": "2 + 3 * (4 ** 2)"}'}},
+        {"function": {"name": "count_words", "arguments": '{"text": "the quick brown fox jumps"}'}},
+        {"function": {"name": "days_between", "arguments": '{"date1": "2024-01-01", "date2": "2024-12-25"}'}},
+        {"function": {"name": "get_current_time", "arguments": "{}"}},
+        {"function": {"name": "no_such_tool", "arguments": "{}"}},
+    ]
+
+    def tool_dispatch(i):
+        handle_tool_call(local_calls[i % len(local_calls)])
+
+    def planner(i):
+        plan = SmartTaskPlanner(state["agent"]).create_plan("List all Python files and analyze each one")
+        if plan is None:
+            raise RuntimeError("planner returned no plan")
+
+    return [
+        Scenario("chat_direct", chat_direct, new_agent, close_agent, count(200)),
+        Scenario("chat_tools", chat_tools, new_agent, close_agent, count(50)),
+        Scenario("chat_stream_tools", chat_stream, new_agent, close_agent, count(50)),
+        Scenario("memory_persist", memory_persist, new_memory, close_memory, count(1000)),
+        Scenario("tool_dispatch", tool_dispatch, None, None, count(5000)),
+        Scenario("planner", planner, new_agent, close_agent, count(100)),
+    ]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(scenario, alloc_iterations):
+    """Time the scenario, then measure its allocations in a separate pass"""
+    if scenario.setup:
+        scenario.setup()
+    try:
+        scenario.operation(0)  # Warm-up: connections, lazy imports, caches
+        samples = []
+        wall_start = time.perf_counter()
+        for i in range(1, scenario.iterations + 1):
+            start = time.perf_counter()
+            scenario.operation(i)
+            samples.append(time.perf_counter() - start)
+        wall = time.perf_counter() - wall_start
+
+        alloc_runs = min(alloc_iterations, scenario.iterations)
+        tracemalloc.start()
+        base_current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for i in range(alloc_runs):
+            scenario.operation(scenario.iterations + 1 + i)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        if scenario.teardown:
+            scenario.teardown()
+
+    samples.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "iterations": scenario.iterations,
+        "p50_ms": ms(percentile(samples, 50)),
+        "p95_ms": ms(percentile(samples, 95)),
+        "p99_ms": ms(percentile(samples, 99)),
+        "mean_ms": ms(statistics.mean(samples)),
+        "max_ms": ms(samples[-1]),
+        "throughput_per_s": round(scenario.iterations / wall, 1),
+        "alloc_peak_kb": round((peak - base_current) / 1024, 1),
+        "retained_kb_per_op": round((current - base_current) / 1024 / alloc_runs, 2)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline, tolerance):
+    """Print p50/p95 changes against a baseline; return the regressions"""
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit', '?')} ({baseline.get('timestamp', '?')}):")
+    for name, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            print(f"  {name:<18} (new)")
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms"):
+            old, new = previous[metric], current[metric]
+            change = (new - old) / old if old else 0.0
+            changes.append(f"{metric} {old:.2f} -> {new:.2f} ({change:+.0%})")
+            if change > tolerance:
+                regressions.append(f"{name} {metric} {change:+.0%}")
+        print(f"  {name:<18} " + ", ".join(changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TaskTrek offline benchmark suite")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply iteration counts")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock LLM latency per call (s)")
+    parser.add_argument("--tool-latency", type=float, default=0.0, help="mock tool API latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency fraction")
+    parser.add_argument("--only", nargs="*", help="run only these scenarios")
+    parser.add_argument("--alloc-iterations", type=int, default=20)
+    parser.add_argument("--save", nargs="?", const="", help="store results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50/p95 slowdown")
+    args = parser.parse_args()
+
+    mock_options = {"latency": args.latency, "tool_latency": args.tool_latency, "jitter": args.jitter}
+    process, base_url = start_in_subprocess(scripts=SCRIPTS, **mock_options)
+    os.environ.update(env_for(base_url))
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ.pop("TASKTREK_TOOL_CACHE_DB", None)
+    # The mock has no rate limits - measure the agent, not the limiter's waits
+    os.environ.update({"TASKTREK_GROQ_RPM": "0", "TASKTREK_GROQ_TPM": "0"})
+    sys.path.insert(0, ROOT)
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": dict(mock_options, scale=args.scale),
+        "scenarios": {}
+    }
+
+    workdir = tempfile.mkdtemp(prefix="tasktrek-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)  # Session files land in a scratch directory
+    try:
+        scenarios = build_scenarios(args.scale)
+        for scenario in scenarios:
+            if args.only and scenario.name not in args.only:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = run_scenario(scenario, args.alloc_iterations)
+            results["scenarios"][scenario.name] = stats
+            print(f"{scenario.name:<18} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+                  f"p99 {stats['p99_ms']:9.3f} ms  {stats['throughput_per_s']:9.1f}/s  "
+                  f"peak {stats['alloc_peak_kb']:8.1f} KiB")
+    finally:
+        os.chdir(cwd)
+        process.terminate()
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    if args.save is not None:
+        path = args.save or os.path.join(BASELINE_DIR, f"{results['commit']}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved results to {path}")
+
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
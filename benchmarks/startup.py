@@ -0,0 +1,119 @@
+# benchmarks/startup.py
+"""Cold-start benchmark: time from launching main.py to the first `Task:` prompt.
+
+    python benchmarks/startup.py                  # check against the baseline
+    python benchmarks/startup.py --save-baseline  # record a new baseline
+
+Exits with status 1 if the median cold start is slower than the baseline by
+more than --tolerance, or if a heavy dependency is imported before the
+prompt (those must stay lazy - see `-X importtime` report below).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+PROMPT = b"Task: "
+
+# Modules that must not be loaded before the first prompt
+LAZY_MODULES = ["requests", "urllib3", "lxml", "httpx", "tiktoken", "sqlite3", "numpy", "asyncio"]
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("GROQ_API_KEY", "startup-benchmark")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def time_to_prompt(python_args=(), timeout=30.0):
+    """Launch main.py and return (seconds until the prompt, stderr output)"""
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, *python_args, MAIN], cwd=workdir, env=_env(),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        output = b""
+        try:
+            while PROMPT not in output:
+                chunk = os.read(proc.stdout.fileno(), 4096)
+                if not chunk:
+                    raise RuntimeError(f"main.py exited before the prompt: {output.decode(errors='replace')}")
+                output += chunk
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError("Timed out waiting for the prompt")
+            elapsed = time.perf_counter() - start
+            _, stderr = proc.communicate(b"exit\n", timeout=timeout)
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+    return elapsed, stderr.decode(errors="replace")
+
+
+def import_report(top=10):
+    """Modules imported before the prompt, slowest (cumulative) first"""
+    _, stderr = time_to_prompt(["-X", "importtime"])
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:top]
+    return modules, slowest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed slowdown over the baseline (0.15 = 15%%)")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    time_to_prompt()  # Warm the OS file cache; not counted
+    samples = [time_to_prompt()[0] * 1000 for _ in range(args.runs)]
+    median_ms = statistics.median(samples)
+    print(f"Cold start to prompt: median {median_ms:.1f} ms, "
+          f"min {min(samples):.1f} ms, max {max(samples):.1f} ms ({args.runs} runs)")
+
+    modules, slowest = import_report()
+    print("Slowest imports before the prompt (cumulative):")
+    for name, micros in slowest:
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+
+    failures = []
+    eager = [name for name in LAZY_MODULES if name in modules]
+    if eager:
+        failures.append(f"imported before the prompt: {', '.join(eager)}")
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"median_ms": round(median_ms, 1), "python": sys.version.split()[0]}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {BASELINE_FILE}")
+    elif os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+            baseline_ms = json.load(f)["median_ms"]
+        limit_ms = baseline_ms * (1 + args.tolerance)
+        print(f"Baseline {baseline_ms:.1f} ms, limit {limit_ms:.1f} ms")
+        if median_ms > limit_ms:
+            failures.append(f"cold start {median_ms:.1f} ms exceeds {limit_ms:.1f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
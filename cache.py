@@ -0,0 +1,258 @@
+# cache.py
+
+from collections import OrderedDict
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+
+# Seconds a tool result stays fresh. Pages default to this when the server
+# sends no Cache-Control max-age; weather changes slowly, searches even less.
+TOOL_TTLS = {
+    "get_weather": 10 * 60,
+    "web_search": 60 * 60,
+    "url_content": 15 * 60
+}
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class ToolCache:
+    """TTL + LRU cache for tool results with an optional SQLite backend.
+
+    Entries live in an in-memory OrderedDict (least recently used first)
+    bounded to max_entries. With disk_path set, every store is also written
+    to SQLite so results survive restarts and are loaded on a memory miss;
+    the table is bounded to max_disk_entries rows (at least max_entries),
+    dropping the least recently stored or loaded rows first.
+    Stale entries that carry an ETag / Last-Modified are kept so the caller
+    can revalidate them with a conditional request.
+    """
+
+    def __init__(self, max_entries=256, disk_path=None, max_disk_entries=None):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.max_disk_entries = max(max_disk_entries or max_entries, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_rows = 0
+        self.stats = {
+            "hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0, "disk_evictions": 0
+        }
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def lookup(self, key):
+        """Return the entry for key (fresh or stale) without counting a hit"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                entry = self._load_from_disk(key)
+                if entry is not None:
+                    self._insert(key, entry)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get(self, key):
+        """Return a fresh cached value, or None on a miss"""
+        entry = self.lookup(key)
+        with self._lock:
+            if entry is not None and entry["expires"] > time.time():
+                self.stats["hits"] += 1
+                return entry["value"]
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key, value, ttl, etag=None, last_modified=None):
+        with self._lock:
+            self._store(key, value, ttl, etag, last_modified)
+            self.stats["stores"] += 1
+
+    def refresh(self, key, ttl):
+        """Mark a stale entry fresh again after a 304 Not Modified"""
+        entry = self.lookup(key)
+        if entry is None:
+            return None
+        with self._lock:
+            self._store(key, entry["value"], ttl, entry["etag"], entry["last_modified"])
+            self.stats["revalidated"] += 1
+        return entry["value"]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM tool_cache")
+                self._db.commit()
+                self._disk_rows = 0
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(
+                self.stats,
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                disk_entries=self._disk_rows if self._db is not None else None,
+                hit_rate=f"{self.stats['hits'] / lookups * 100:.1f}%" if lookups else "0%",
+                disk=self.disk_path
+            )
+
+    def _store(self, key, value, ttl, etag, last_modified):
+        entry = {
+            "value": value,
+            "expires": time.time() + ttl,
+            "etag": etag,
+            "last_modified": last_modified
+        }
+        self._insert(key, entry)
+        if self._db is not None:
+            row = (value, entry["expires"], etag, last_modified, time.time(), key)
+            updated = self._db.execute(
+                "UPDATE tool_cache SET value = ?, expires = ?, etag = ?, last_modified = ?, used = ? WHERE key = ?",
+                row
+            ).rowcount
+            if not updated:
+                self._db.execute(
+                    "INSERT INTO tool_cache (value, expires, etag, last_modified, used, key) VALUES (?, ?, ?, ?, ?, ?)",
+                    row
+                )
+                self._disk_rows += 1
+                self._trim_disk()
+            self._db.commit()
+
+    def _insert(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _open_disk(self, disk_path):
+        directory = os.path.dirname(disk_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        import sqlite3  # Only needed with a disk cache
+        self._db = sqlite3.connect(disk_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache ("
+            "key TEXT PRIMARY KEY, value TEXT, expires REAL, etag TEXT, last_modified TEXT, used REAL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(tool_cache)")]
+        if "used" not in columns:
+            # Cache file from before the disk tier was bounded
+            self._db.execute("ALTER TABLE tool_cache ADD COLUMN used REAL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS tool_cache_used ON tool_cache (used)")
+        # Drop long-expired rows that have nothing to revalidate with
+        self._db.execute(
+            "DELETE FROM tool_cache WHERE expires < ? AND etag IS NULL AND last_modified IS NULL",
+            (time.time(),)
+        )
+        self._disk_rows = self._db.execute("SELECT COUNT(*) FROM tool_cache").fetchone()[0]
+        self._trim_disk()
+        self._db.commit()
+
+    def _load_from_disk(self, key):
+        row = self._db.execute(
+            "SELECT value, expires, etag, last_modified FROM tool_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE tool_cache SET used = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        return {"value": row[0], "expires": row[1], "etag": row[2], "last_modified": row[3]}
+
+    def _trim_disk(self):
+        """Delete the least recently stored/loaded rows over max_disk_entries"""
+        excess = self._disk_rows - self.max_disk_entries
+        if excess <= 0:
+            return
+        # Rows still held in memory are in use - skip them. There are at most
+        # max_entries of those, so the oldest excess + len(memory) rows always
+        # hold enough others.
+        oldest = self._db.execute(
+            "SELECT key FROM tool_cache ORDER BY used LIMIT ?", (excess + len(self._entries),)
+        ).fetchall()
+        victims = [(key,) for (key,) in oldest if key not in self._entries][:excess]
+        self._db.executemany("DELETE FROM tool_cache WHERE key = ?", victims)
+        self._disk_rows -= len(victims)
+        self.stats["disk_evictions"] += len(victims)
+
+
+def cache_key(tool_name, *args, case_sensitive=False):
+    """Normalized key: tool name + whitespace (and case) insensitive arguments"""
+    normalized = [" ".join(str(arg).split()) for arg in args]
+    if not case_sensitive:
+        normalized = [arg.lower() for arg in normalized]
+    return json.dumps([tool_name] + normalized)
+
+
+def ttl_from_headers(headers, default_ttl):
+    """TTL from Cache-Control; 0 means revalidate every time, None means don't store"""
+    cache_control = (headers.get("Cache-Control") or "").lower()
+    if "no-store" in cache_control or "private" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0
+    match = _MAX_AGE.search(cache_control)
+    if match:
+        return int(match.group(1))
+    return default_ttl
+
+
+def conditional_headers(entry):
+    """If-None-Match / If-Modified-Since headers for revalidating an entry"""
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def cached_tool(tool_name):
+    """Cache a tool's successful results for TOOL_TTLS[tool_name] seconds.
+
+    Works for plain and async tool functions; results starting with
+    "Error" are never cached.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = cache_key(tool_name, *args, *(kwargs[k] for k in sorted(kwargs)))
+                value = tool_cache.get(key)
+                if value is not None:
+                    return value
+                value = await func(*args, **kwargs)
+                if not value.startswith("Error"):
+                    tool_cache.set(key, value, TOOL_TTLS[tool_name])
+                return value
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = cache_key(tool_name, *args, *(kwargs[k] for k in sorted(kwargs)))
+            value = tool_cache.get(key)
+            if value is not None:
+                return value
+            value = func(*args, **kwargs)
+            if not value.startswith("Error"):
+                tool_cache.set(key, value, TOOL_TTLS[tool_name])
+            return value
+        return wrapper
+    return decorator
+
+
+# Process-wide cache shared by the sync and async tools.
+# Set TASKTREK_TOOL_CACHE_DB to a file path to keep results across restarts.
+tool_cache = ToolCache(
+    max_entries=int(os.getenv("TASKTREK_TOOL_CACHE_SIZE", "256")),
+    disk_path=os.getenv("TASKTREK_TOOL_CACHE_DB") or None,
+    max_disk_entries=int(os.getenv("TASKTREK_TOOL_CACHE_DB_SIZE", "4096"))
+)
@@ -0,0 +1,105 @@
+# executor.py
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import threading
+import time
+from registry import registry
+from tools import handle_tool_call
+from tracing import tracer
+
+# Seconds a single call may take before we stop waiting for it, unless the
+# tool's registry entry sets its own timeout
+DEFAULT_TIMEOUT = 20.0
+
+
+def tool_timeout(name, overrides=None, default=DEFAULT_TIMEOUT):
+    """Per-call timeout: explicit override, then registry metadata, then default"""
+    if overrides and name in overrides:
+        return overrides[name]
+    spec = registry.get(name)
+    return spec.timeout if spec is not None and spec.timeout else default
+
+
+class ToolExecutor:
+    """Runs the tool calls of one assistant message concurrently.
+
+    Results come back in the same order as the calls, each with its wall
+    time, so a multi-tool turn costs about as long as its slowest call.
+    Concurrency limits and timeouts come from each tool's registry entry;
+    tools that aren't side-effect free run one at a time.
+    """
+
+    def __init__(self, max_workers=8, concurrency=None, timeout=DEFAULT_TIMEOUT,
+                 tool_timeouts=None, call_tool=handle_tool_call):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.tool_timeouts = dict(tool_timeouts or {})
+        self.call_tool = call_tool
+        self.concurrency = dict(concurrency or {})
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._limits = {}
+        self._limits_lock = threading.Lock()
+        self._side_effect_lock = threading.Lock()
+
+    def run(self, tool_calls, prefetched=None):
+        """Execute tool calls in parallel; returns [(tool_call, result, seconds)].
+        
+        prefetched (a PrefetchTurn) supplies calls that are already running.
+        """
+        started = time.perf_counter()
+        futures = []
+        for tool_call in tool_calls:
+            future = prefetched.claim(tool_call) if prefetched is not None else None
+            futures.append(future or self.submit(tool_call))
+
+        results = []
+        for tool_call, future in zip(tool_calls, futures):
+            name = tool_call["function"]["name"]
+            timeout = tool_timeout(name, self.tool_timeouts, self.timeout)
+            remaining = max(0.0, started + timeout - time.perf_counter())
+            try:
+                result, elapsed = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                future.cancel()
+                result, elapsed = f"Error: {name} timed out after {timeout:.0f}s", timeout
+            except Exception as e:
+                result, elapsed = f"Error running {name}: {e}", time.perf_counter() - started
+            results.append((tool_call, result, elapsed))
+        return results
+
+    def submit(self, tool_call):
+        """Start one tool call in the pool; the future yields (result, seconds)"""
+        # Worker threads don't inherit the caller's span - hand it over
+        return self._pool.submit(self._timed_call, tool_call, tracer.current())
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _limit_for(self, name):
+        """Semaphore for a tool's max concurrency (None if unlimited)"""
+        with self._limits_lock:
+            if name not in self._limits:
+                spec = registry.get(name)
+                limit = self.concurrency.get(name, spec.max_concurrency if spec else None)
+                self._limits[name] = threading.BoundedSemaphore(limit) if limit else None
+            return self._limits[name]
+
+    def _timed_call(self, tool_call, parent=None):
+        name = tool_call["function"]["name"]
+        spec = registry.get(name)
+        locks = [self._limit_for(name)]
+        if spec is not None and not spec.side_effect_free:
+            locks.append(self._side_effect_lock)
+        locks = [lock for lock in locks if lock is not None]
+
+        queued = time.perf_counter()
+        for lock in locks:
+            lock.acquire()
+        try:
+            start = time.perf_counter()
+            with tracer.span(f"tool.{name}", parent=parent, wait_ms=round((start - queued) * 1000, 3)):
+                result = self.call_tool(tool_call)
+            return result, time.perf_counter() - start
+        finally:
+            for lock in reversed(locks):
+                lock.release()
@@ -0,0 +1,308 @@
+# extract.py
+
+import codecs
+from html.parser import HTMLParser
+import os
+import re
+
+# Bytes read from a page before giving up on the rest of it
+MAX_PAGE_BYTES = int(os.getenv("TASKTREK_MAX_PAGE_BYTES", str(2 * 1024 * 1024)))
+# Characters of page text kept in a url_content summary
+SUMMARY_CHARS = int(os.getenv("TASKTREK_SUMMARY_CHARS", "500"))
+# Read size when streaming a page
+CHUNK_SIZE = 16 * 1024
+# Pages with no <article>/<main>/content div stop after this many summaries' worth of body text
+BODY_TEXT_FACTOR = 4
+
+SKIP_TAGS = frozenset({"script", "style", "nav", "footer", "aside", "header", "noscript", "template"})
+AD_CLASSES = frozenset({"ad", "advertisement", "sidebar", "menu", "navigation"})
+CONTENT_CLASSES = frozenset({"content", "main-content", "post-content"})
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"
+})
+
+_WHITESPACE = re.compile(r"\s+")
+_HEADER_CHARSET = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+_META_CHARSET = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+_HTML_START = re.compile(rb"^\s*(?:<!--.*?-->\s*)*<(?:!doctype\s+html|html|head|body|meta|title|div|p)\b",
+                         re.IGNORECASE | re.DOTALL)
+_BINARY_MAGIC = (b"%PDF", b"\x89PNG", b"GIF8", b"\xff\xd8\xff", b"PK\x03\x04", b"\x1f\x8b", b"RIFF", b"OggS")
+_TEXT_TYPES = ("application/json", "application/xml", "application/javascript", "application/x-yaml")
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+_backend = None
+
+
+def parser_backend():
+    """"lxml" if installed (TASKTREK_HTML_PARSER=html.parser forces the stdlib)"""
+    global _backend
+    if _backend is None:
+        _backend = os.getenv("TASKTREK_HTML_PARSER", "").lower() or "lxml"
+        if _backend == "lxml":
+            try:
+                import lxml.etree  # noqa: F401 - optional, much faster tokenizer
+            except ImportError:
+                _backend = "html.parser"
+    return _backend
+
+
+def sniff_content_type(header, head):
+    """"html", "text" or "binary" from the Content-Type header and the first bytes"""
+    mime = (header or "").split(";")[0].strip().lower()
+    if mime in ("text/html", "application/xhtml+xml"):
+        return "html"
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            # UTF-16 text is full of NUL bytes - sniff the decoded text instead
+            head = head.decode(encoding, "ignore").encode("ascii", "replace")
+            break
+    looks_binary = head.startswith(_BINARY_MAGIC) or b"\x00" in head[:512]
+    if mime.startswith("text/") or mime in _TEXT_TYPES or mime.endswith(("+json", "+xml")):
+        return "binary" if looks_binary else "text"
+    if mime and mime not in ("application/octet-stream", "binary/octet-stream"):
+        return "binary"
+    # Missing or generic type - decide from the bytes
+    if looks_binary:
+        return "binary"
+    return "html" if _HTML_START.match(head) else "text"
+
+
+def sniff_charset(header, head):
+    """Encoding from a BOM, the Content-Type charset or a <meta> tag; utf-8 otherwise"""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    for match in (_HEADER_CHARSET.search(header or ""), _META_CHARSET.search(head[:2048])):
+        if match:
+            name = match.group(1)
+            name = name.decode("ascii", "ignore") if isinstance(name, bytes) else name
+            try:
+                return codecs.lookup(name).name
+            except LookupError:
+                pass
+    return "utf-8"
+
+
+class MainTextCollector:
+    """Parser target that keeps the text of a page's main content.
+
+    Mirrors the old BeautifulSoup rules - drop scripts, styles, navigation,
+    headers/footers and ad/sidebar/menu classes, then prefer the first
+    <article>, then <main>, then a div.content / .main-content /
+    .post-content, then the whole body - but works on a stream of start /
+    end / data events and only keeps max_chars of each candidate, so it can
+    tell the caller when it has seen enough. The interface (start, end,
+    data, close) is lxml's parser target protocol.
+    """
+
+    CANDIDATES = ("article", "main", "content")
+
+    def __init__(self, max_chars=SUMMARY_CHARS):
+        self.max_chars = max_chars
+        self.texts = {"article": [], "main": [], "content": [], "body": []}
+        self.sizes = dict.fromkeys(self.texts, 0)
+        self.limits = dict.fromkeys(self.texts, max_chars + 1)
+        self.limits["body"] = max_chars * BODY_TEXT_FACTOR + 1
+        self.seen = set()
+        self.active = []     # Candidates currently open
+        self.stack = []      # (tag, candidate or None, skipped)
+        self.skip_depth = 0
+        self.in_head = False
+        self._pending = []   # Text since the last tag - a chunk boundary can split a word
+
+    @property
+    def enough(self):
+        """True once more of the page can't change the result"""
+        sizes, limits = self.sizes, self.limits
+        if sizes["article"] >= limits["article"]:
+            return True
+        if "article" not in self.seen and (sizes["main"] >= limits["main"] or sizes["content"] >= limits["content"]):
+            return True
+        return not self.seen and sizes["body"] >= limits["body"]
+
+    def start(self, tag, attrs):
+        self._flush()
+        tag = tag.lower()
+        if tag in VOID_TAGS:
+            return
+        if tag == "body":
+            self.in_head = False  # Pages that never close <head>
+        classes = (attrs.get("class") or "").split()
+        skipped = tag in SKIP_TAGS or not AD_CLASSES.isdisjoint(classes)
+        candidate = None
+        if not skipped and not self.skip_depth:
+            if tag == "div":
+                if "content" not in self.seen and not CONTENT_CLASSES.isdisjoint(classes):
+                    candidate = "content"
+            elif tag in ("article", "main") and tag not in self.seen:
+                candidate = tag
+            elif tag == "head":
+                self.in_head = True
+        self.stack.append((tag, candidate, skipped))
+        if skipped:
+            self.skip_depth += 1
+        if candidate:
+            self.seen.add(candidate)
+            self.active.append(candidate)
+
+    def end(self, tag):
+        self._flush()
+        tag = tag.lower()
+        if tag == "head":
+            self.in_head = False
+        if not any(entry[0] == tag for entry in self.stack):
+            return  # Stray or void end tag
+        while self.stack:
+            open_tag, candidate, skipped = self.stack.pop()
+            if skipped:
+                self.skip_depth -= 1
+            if candidate:
+                self.active.remove(candidate)
+            if open_tag == tag:
+                break
+
+    def data(self, data):
+        if not self.skip_depth and not self.in_head:
+            self._pending.append(data)
+
+    def close(self):
+        """Best candidate's text (may be longer than max_chars)"""
+        self._flush()
+        for name in self.CANDIDATES + ("body",):
+            if self.texts[name]:
+                return " ".join(self.texts[name])
+        return ""
+
+
+    def _flush(self):
+        if not self._pending:
+            return
+        text = _WHITESPACE.sub(" ", "".join(self._pending)).strip()
+        self._pending = []
+        if not text:
+            return
+        for name in self.active + ["body"]:
+            if self.sizes[name] < self.limits[name]:
+                self.texts[name].append(text)
+                self.sizes[name] += len(text) + 1
+
+
+class _StdlibParser(HTMLParser):
+    """html.parser front end feeding a MainTextCollector"""
+
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, {name: value or "" for name, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+class PageExtractor:
+    """Incremental url_content extraction: feed() raw body chunks as they
+    arrive and stop reading as soon as it returns True.
+
+    The first chunk decides the content type (header, then byte sniffing)
+    and encoding. HTML goes through MainTextCollector on the lxml tokenizer
+    when available (html.parser otherwise); plain text and JSON are kept
+    as-is; binary bodies are rejected. Reading stops at max_bytes or when
+    the collector has enough main-content text.
+    """
+
+    def __init__(self, content_type=None, max_chars=SUMMARY_CHARS, max_bytes=MAX_PAGE_BYTES):
+        self.content_type = content_type
+        self.max_chars = max_chars
+        self.max_bytes = max_bytes
+        self.kind = None
+        self.bytes_read = 0
+        self.truncated = False
+        self.done = False
+        self._decoder = None
+        self._parser = None
+        self._collector = None
+        self._text = []
+        self._text_size = 0
+
+    def feed(self, chunk):
+        """Process one chunk of the body; True means stop reading"""
+        if self.done or not chunk:
+            return self.done
+        if self.kind is None:
+            self._start(chunk)
+            if self.done:
+                return True
+        room = self.max_bytes - self.bytes_read
+        if len(chunk) >= room:
+            chunk = chunk[:room]
+            self.truncated = self.done = True
+        self.bytes_read += len(chunk)
+
+        text = self._decoder.decode(chunk)
+        if self.kind == "html":
+            self._parser.feed(text)
+            if self._collector.enough:
+                self.done = True
+        else:
+            self._text.append(text)
+            self._text_size += len(text)
+            if self._text_size > self.max_chars * 2:
+                self.done = True  # Whitespace collapses - keep a margin
+        return self.done
+
+    def text(self):
+        """Extracted text, whitespace-collapsed, at most max_chars + 1 characters"""
+        if self.kind == "html":
+            self._parser.feed(self._decoder.decode(b"", final=True))
+            self._parser.close()
+            text = self._collector.close()
+        elif self.kind == "text":
+            text = _WHITESPACE.sub(" ", "".join(self._text) + self._decoder.decode(b"", final=True)).strip()
+        else:
+            text = ""
+        return text[:self.max_chars + 1]
+
+    def summary(self, url):
+        """url_content's result for the page"""
+        if self.kind == "binary":
+            mime = (self.content_type or "unknown type").split(";")[0]
+            return f"Error: {url} is not a text page ({mime})"
+        text = self.text()
+        if not text:
+            return f"Error: Could not find main content in {url}"
+        if len(text) > self.max_chars:
+            return f"Content from {url}: {text[:self.max_chars]}..."
+        return f"Content from {url}: {text}"
+
+    def _start(self, head):
+        self.kind = sniff_content_type(self.content_type, head)
+        if self.kind == "binary":
+            self.done = True
+            return
+        self._decoder = codecs.getincrementaldecoder(sniff_charset(self.content_type, head))(errors="replace")
+        if self.kind == "html":
+            self._collector = MainTextCollector(self.max_chars)
+            if parser_backend() == "lxml":
+                from lxml import etree
+                self._parser = etree.HTMLParser(target=self._collector)
+            else:
+                self._parser = _StdlibParser(self._collector)
+
+
+def summarize_html(url, html, max_chars=SUMMARY_CHARS):
+    """One-shot extraction for a page that's already in memory"""
+    extractor = PageExtractor("text/html; charset=utf-8", max_chars=max_chars, max_bytes=float("inf"))
+    data = html.encode("utf-8")
+    for offset in range(0, len(data), CHUNK_SIZE):
+        if extractor.feed(data[offset:offset + CHUNK_SIZE]):
+            break
+    return extractor.summary(url)
@@ -0,0 +1,253 @@
+# fileread.py
+
+from bisect import bisect_right
+from collections import OrderedDict
+import mmap
+import os
+import re
+import threading
+
+# Characters of file content a read/search result may return
+READ_MAX_CHARS = int(os.getenv("TASKTREK_READ_MAX_CHARS", "4000"))
+# Most lines one read_lines call returns
+MAX_LINES = 500
+# Bytes between line-index checkpoints
+INDEX_BLOCK = 1 << 20
+# Line indexes kept in memory (one per file)
+INDEX_CACHE_SIZE = 32
+# Longest line shown in a search result
+MAX_LINE_CHARS = 300
+
+_SAMPLE = 64  # Bytes compared to tell an appended-to file from a rewritten one
+
+
+class BinaryFileError(Exception):
+    """Raised instead of returning text decoded from a binary file"""
+
+
+class LineIndex:
+    """Sparse line-offset index: one (line, byte offset) checkpoint per
+    INDEX_BLOCK bytes, so finding line N seeks to the nearest checkpoint and
+    scans at most one block.
+
+    Built lazily - only as far as the lines asked for - and extended in
+    place when a file has only been appended to (logs).
+    """
+
+    def __init__(self):
+        self.lines = [0]     # 0-based line number at each checkpoint
+        self.offsets = [0]   # Byte offset where that line starts
+        self.size = 0        # File size the index describes
+        self.complete = False
+        self.total_lines = None
+        self.sample = b""
+        self._lock = threading.Lock()  # Tool calls on the same file run in parallel
+
+    def extend(self, mm, size, until_line=None):
+        """Scan from the last checkpoint until until_line is covered (or EOF)"""
+        with self._lock:
+            self._extend(mm, size, until_line)
+
+    def _extend(self, mm, size, until_line):
+        self.size = size
+        line, pos = self.lines[-1], self.offsets[-1]
+        while not self.complete:
+            if until_line is not None and line > until_line:
+                break
+            end = pos + INDEX_BLOCK
+            newline = mm.find(b"\n", end - 1) if end < size else -1
+            if newline == -1 or newline + 1 >= size:
+                self.total_lines = line + mm[pos:size].count(b"\n")
+                if size and mm[size - 1:size] != b"\n":
+                    self.total_lines += 1  # Last line has no newline
+                self.complete = True
+                break
+            line += mm[pos:newline + 1].count(b"\n")
+            pos = newline + 1
+            self.lines.append(line)
+            self.offsets.append(pos)
+        self.sample = mm[max(0, size - _SAMPLE):size]
+
+    def offset_of(self, mm, line):
+        """Byte offset where 0-based line starts, or None past the end"""
+        self.extend(mm, self.size, until_line=line)
+        with self._lock:
+            i = bisect_right(self.lines, line) - 1
+            first, pos = self.lines[i], self.offsets[i]
+        for _ in range(line - first):
+            newline = mm.find(b"\n", pos)
+            if newline == -1:
+                return None
+            pos = newline + 1
+        return pos if pos < self.size else None
+
+    def count_lines(self, mm):
+        self.extend(mm, self.size)
+        return self.total_lines
+
+
+class _IndexCache:
+    """LRU of LineIndex per path, valid for the (mtime, size) it was built at"""
+
+    def __init__(self, max_entries=INDEX_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "builds": 0, "appends": 0}
+
+    def get(self, path, stat_result, mm):
+        key = (stat_result.st_mtime_ns, stat_result.st_size)
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == key:
+                self._entries.move_to_end(path)
+                self.stats["hits"] += 1
+                return cached[1]
+            index = cached[1] if cached is not None else None
+            size = stat_result.st_size
+            if (index is not None and size > index.size
+                    and mm[max(0, index.size - _SAMPLE):index.size] == index.sample):
+                # Only appended to - keep the checkpoints we have
+                index.complete = False
+                index.size = size
+                self.stats["appends"] += 1
+            else:
+                index = LineIndex()
+                index.size = size
+                self.stats["builds"] += 1
+            self._entries[path] = (key, index)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return index
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, files=len(self._entries))
+
+
+line_indexes = _IndexCache()
+
+
+class MappedFile:
+    """Read-only memory map of a file (empty files map to b"")"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self._file = open(self.path, 'rb')
+        self.stat = os.fstat(self._file.fileno())
+        self.size = self.stat.st_size
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.size:
+            self.mm.close()
+        self._file.close()
+
+    def check_text(self):
+        if b"\x00" in self.mm[:8192]:
+            raise BinaryFileError(self.path)
+
+    def line_index(self):
+        return line_indexes.get(self.path, self.stat, self.mm)
+
+
+def decode(data):
+    return data.decode("utf-8", errors="replace")
+
+
+def count_newlines(mm, start, end):
+    """Newlines in mm[start:end], counted one INDEX_BLOCK slice at a time
+    so a long gap never copies more than a block"""
+    count = 0
+    while start < end:
+        stop = min(end, start + INDEX_BLOCK)
+        count += mm[start:stop].count(b"\n")
+        start = stop
+    return count
+
+
+def read_head(path, max_chars):
+    """(text, truncated) - the first max_chars characters without reading the rest"""
+    with MappedFile(path) as f:
+        f.check_text()
+        data = f.mm[:max_chars * 4 + 4]  # Enough bytes for max_chars of UTF-8
+        text = decode(data)
+        return text[:max_chars], f.size > len(data) or len(text) > max_chars
+
+
+def read_lines(path, start=1, count=50, max_chars=READ_MAX_CHARS):
+    """[(line number, text)] for count lines from 1-based start; a negative
+    start counts from the end (-20 = the last 20 lines). Returns (lines,
+    total lines or None if not counted, truncated)"""
+    with MappedFile(path) as f:
+        if not f.size:
+            return [], 0, False
+        f.check_text()
+        index = f.line_index()
+        total = None
+        if start < 0:
+            total = index.count_lines(f.mm)
+            start = max(1, total + start + 1)
+        start = max(1, start)
+        pos = index.offset_of(f.mm, start - 1)
+        lines, used, truncated = [], 0, False
+        number = start
+        while pos is not None and pos < f.size and len(lines) < count:
+            newline = f.mm.find(b"\n", pos)
+            end = f.size if newline == -1 else newline
+            text = decode(f.mm[pos:end]).rstrip("\r")
+            if used + len(text) > max_chars and lines:
+                truncated = True
+                break
+            lines.append((number, text[:max_chars]))
+            used += len(text) + 1
+            number += 1
+            pos = None if newline == -1 else newline + 1
+        if index.complete:
+            total = index.total_lines
+        return lines, total, truncated
+
+
+def read_bytes(path, offset=0, length=4096):
+    """(text, file size) for length bytes from offset (negative = from the end)"""
+    with MappedFile(path) as f:
+        f.check_text()
+        if offset < 0:
+            offset = max(0, f.size + offset)
+        return decode(f.mm[offset:offset + length]), f.size
+
+
+def grep(path, pattern, ignore_case=False, max_matches=50, max_chars=READ_MAX_CHARS):
+    """grep-style search: [(line number, line text)] of matching lines and
+    whether the search stopped early. Scans the map - nothing is loaded."""
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    regex = re.compile(pattern.encode("utf-8"), flags)
+    with MappedFile(path) as f:
+        if not f.size:
+            return [], False
+        f.check_text()
+        matches, used = [], 0
+        line, counted_to, last_line = 1, 0, None
+        for match in regex.finditer(f.mm):
+            start = match.start()
+            line += count_newlines(f.mm, counted_to, start)
+            counted_to = start
+            if line == last_line:
+                continue  # One result per line
+            last_line = line
+            line_start = f.mm.rfind(b"\n", 0, start) + 1
+            line_end = f.mm.find(b"\n", start)
+            if line_end == -1:
+                line_end = f.size
+            text = decode(f.mm[line_start:min(line_end, line_start + MAX_LINE_CHARS * 4)]).rstrip("\r")
+            if len(text) > MAX_LINE_CHARS:
+                text = text[:MAX_LINE_CHARS] + "..."
+            if len(matches) >= max_matches or (used + len(text) > max_chars and matches):
+                return matches, True
+            matches.append((line, text))
+            used += len(text) + 1
+        return matches, False
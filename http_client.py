@@ -0,0 +1,190 @@
+# http_client.py
+
+import os
+import threading
+import time
+from tracing import tracer
+
+# Timeouts are (connect, read) in seconds. "llm" covers Groq completions,
+# which can take a while to generate; "tool" covers the network tools.
+TIMEOUTS = {
+    "llm": (
+        float(os.getenv("TASKTREK_CONNECT_TIMEOUT", "5")),
+        float(os.getenv("TASKTREK_LLM_READ_TIMEOUT", "60"))
+    ),
+    "tool": (
+        float(os.getenv("TASKTREK_CONNECT_TIMEOUT", "5")),
+        float(os.getenv("TASKTREK_TOOL_READ_TIMEOUT", "10"))
+    )
+}
+POOL_CONNECTIONS = int(os.getenv("TASKTREK_POOL_CONNECTIONS", "10"))  # Distinct hosts kept
+POOL_MAXSIZE = int(os.getenv("TASKTREK_POOL_MAXSIZE", "10"))          # Sockets per host
+
+_lock = threading.Lock()
+_session = None
+_stats = {"requests": 0, "new_connections": 0}
+
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+
+_adapter_class = None
+
+
+def _get_adapter_class():
+    """Build PooledAdapter on first use so `requests` isn't imported at startup"""
+    global _adapter_class
+    if _adapter_class is not None:
+        return _adapter_class
+
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class _TimedHTTPConnection(HTTPConnection):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                super().connect()
+            finally:
+                _trace_connect(start, self.host)
+
+    class _TimedHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            # Includes the TLS handshake
+            start = time.perf_counter()
+            try:
+                super().connect()
+            finally:
+                _trace_connect(start, self.host)
+
+    class _CountingHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = _TimedHTTPConnection
+
+        def _new_conn(self):
+            _count("new_connections")
+            return super()._new_conn()
+
+    class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = _TimedHTTPSConnection
+
+        def _new_conn(self):
+            _count("new_connections")
+            return super()._new_conn()
+
+    class PooledAdapter(HTTPAdapter):
+        """HTTPAdapter that counts requests and freshly opened sockets"""
+
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": _CountingHTTPConnectionPool,
+                "https": _CountingHTTPSConnectionPool
+            }
+
+        def send(self, request, **kwargs):
+            _count("requests")
+            return super().send(request, **kwargs)
+
+    _adapter_class = PooledAdapter
+    return _adapter_class
+
+
+def configure(connect_timeout=None, llm_read_timeout=None, tool_read_timeout=None,
+              pool_connections=None, pool_maxsize=None):
+    """Change timeouts / pool sizes; pool changes apply to a fresh session"""
+    global POOL_CONNECTIONS, POOL_MAXSIZE
+    if connect_timeout is not None:
+        for kind in TIMEOUTS:
+            TIMEOUTS[kind] = (connect_timeout, TIMEOUTS[kind][1])
+    if llm_read_timeout is not None:
+        TIMEOUTS["llm"] = (TIMEOUTS["llm"][0], llm_read_timeout)
+    if tool_read_timeout is not None:
+        TIMEOUTS["tool"] = (TIMEOUTS["tool"][0], tool_read_timeout)
+    if pool_connections is not None or pool_maxsize is not None:
+        POOL_CONNECTIONS = pool_connections or POOL_CONNECTIONS
+        POOL_MAXSIZE = pool_maxsize or POOL_MAXSIZE
+        close()
+
+
+def get_session():
+    """Shared keep-alive session used by the agent and the network tools"""
+    global _session
+    if _session is None:
+        import requests
+        adapter_class = _get_adapter_class()
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = adapter_class(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _trace_connect(start, host):
+    end = time.perf_counter()
+    current = tracer.current()
+    tracer.add_span(f"{current.name}.connect" if current else "http.connect", start, end, host=host)
+    if current is not None:
+        current.set(connect_ms=round((end - start) * 1000, 3))
+
+
+def request(method, url, kind="tool", **kwargs):
+    """Send a request through the shared pool with the default timeout for kind.
+
+    Traced as an "http.<kind>" span split into .connect (new sockets only),
+    .ttfb (until the response headers) and, unless streaming, .body.
+    """
+    kwargs.setdefault("timeout", TIMEOUTS[kind])
+    name = f"http.{kind}"
+    with tracer.span(name, method=method) as span:
+        start = time.perf_counter()
+        response = get_session().request(method, url, **kwargs)
+        headers_at = start + response.elapsed.total_seconds()
+        span.set(status=response.status_code)
+        tracer.add_span(f"{name}.ttfb", start + span.attrs.get("connect_ms", 0) / 1000, headers_at)
+        if not kwargs.get("stream"):
+            tracer.add_span(f"{name}.body", headers_at, time.perf_counter())
+    return response
+
+
+def get(url, kind="tool", **kwargs):
+    return request("GET", url, kind=kind, **kwargs)
+
+
+def post(url, kind="tool", **kwargs):
+    return request("POST", url, kind=kind, **kwargs)
+
+
+def get_stats():
+    """Connection reuse counters for the shared pool"""
+    with _lock:
+        total = _stats["requests"]
+        opened = _stats["new_connections"]
+    return {
+        "requests": total,
+        "new_connections": opened,
+        "reused_connections": max(0, total - opened),
+        "reuse_rate": f"{(total - opened) / total * 100:.1f}%" if total else "0%",
+        "pool_maxsize": POOL_MAXSIZE,
+        "timeouts": dict(TIMEOUTS)
+    }
+
+
+def reset_stats():
+    with _lock:
+        _stats["requests"] = 0
+        _stats["new_connections"] = 0
+
+
+def close():
+    """Close every pooled socket (a new session is created on next use)"""
+    global _session
+    with _lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
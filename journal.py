@@ -0,0 +1,185 @@
+# journal.py
+
+from datetime import datetime
+import json
+import os
+
+AGENT_VERSION = "TaskTrek v1.0"
+
+# How hard append() pushes data towards the disk:
+#   none  - leave it in Python's buffer (written on close/compact)
+#   flush - hand it to the OS after every batch (survives a process crash)
+#   fsync - force it onto the device after every batch (survives power loss)
+DURABILITY_LEVELS = ("none", "flush", "fsync")
+
+
+class SessionJournal:
+    """Append-only JSONL journal for one conversation session.
+
+    Each message is written as a single line to ``<base>.jsonl`` and the
+    session metadata (``message_count``, ``last_updated``) lives in a small
+    ``<base>.meta.json`` sidecar, so saving a message costs O(1) instead of
+    re-reading and rewriting the whole session. ``compact()`` folds the
+    journal into the classic ``session_*.json`` format.
+    """
+
+    JOURNAL_SUFFIX = ".jsonl"
+    META_SUFFIX = ".meta.json"
+
+    def __init__(self, session_file, durability="flush"):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability level: {durability}")
+        # session_file is the final compacted path (conversations/session_*.json)
+        self.session_file = session_file
+        self.durability = durability
+        base = os.path.splitext(session_file)[0]
+        self.journal_file = base + self.JOURNAL_SUFFIX
+        self.meta_file = base + self.META_SUFFIX
+        self._handle = None
+
+        meta = self._read_meta()
+        if meta is None:
+            now = datetime.now().isoformat()
+            meta = {
+                "session_info": {
+                    "start_time": now,
+                    "agent_version": AGENT_VERSION,
+                    "session_file": session_file
+                },
+                "last_updated": now,
+                "message_count": 0
+            }
+            # Journal existed without a sidecar (crash mid-write) - recount lines
+            if os.path.exists(self.journal_file):
+                meta["message_count"] = len(self.read_messages(self.journal_file))
+        self.meta = meta
+
+    @classmethod
+    def from_journal_file(cls, journal_file, durability="flush"):
+        """Open an existing journal by its .jsonl path"""
+        base = journal_file[:-len(cls.JOURNAL_SUFFIX)] if journal_file.endswith(cls.JOURNAL_SUFFIX) else journal_file
+        return cls(base + ".json", durability)
+
+    @classmethod
+    def find_unfinished(cls, conversations_dir):
+        """List journals that were never compacted (e.g. after a crash)"""
+        if not os.path.isdir(conversations_dir):
+            return []
+        return sorted(
+            os.path.join(conversations_dir, name)
+            for name in os.listdir(conversations_dir)
+            if name.startswith("session_") and name.endswith(cls.JOURNAL_SUFFIX)
+        )
+
+    def append(self, message):
+        """Append one message as a single JSON line and bump the sidecar"""
+        self.append_batch([message])
+
+    def append_batch(self, messages):
+        """Append several messages with a single write and sidecar update"""
+        if not messages:
+            return
+        if self._handle is None:
+            self._repair_torn_tail()
+            self._handle = open(self.journal_file, 'a', encoding='utf-8')
+        self._handle.write("".join(json.dumps(m, ensure_ascii=False) + "\n" for m in messages))
+        if self.durability != "none":
+            self._handle.flush()
+            if self.durability == "fsync":
+                os.fsync(self._handle.fileno())
+
+        self.meta["message_count"] += len(messages)
+        self.meta["last_updated"] = datetime.now().isoformat()
+        self._write_meta()
+
+    def messages(self):
+        """Read back every message recorded in the journal"""
+        if self._handle is not None:
+            self._handle.flush()
+        return self.read_messages(self.journal_file)
+
+    @staticmethod
+    def read_messages(journal_file):
+        """Parse a journal, skipping a torn final line left by a crash"""
+        messages = []
+        if not os.path.exists(journal_file):
+            return messages
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    messages.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # Partial write - everything before it is intact
+        return messages
+
+    def close(self):
+        """Close the journal file handle without compacting"""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def compact(self):
+        """Write the journal out as session_*.json and remove journal files"""
+        messages = self.messages()
+        self.close()
+
+        session_data = {
+            "session_info": self.meta["session_info"],
+            "messages": messages,
+            "last_updated": self.meta["last_updated"],
+            "message_count": len(messages)
+        }
+
+        tmp_file = self.session_file + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(session_data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.session_file)
+
+        for path in (self.journal_file, self.meta_file):
+            if os.path.exists(path):
+                os.remove(path)
+        return self.session_file
+
+    def _repair_torn_tail(self):
+        """Drop a partial last line so new appends start on a clean line"""
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Walk back to the last complete line and cut everything after it
+            pos = size - 1
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                idx = chunk.rfind(b"\n")
+                if idx != -1:
+                    f.truncate(pos - step + idx + 1)
+                    return
+                pos -= step
+            f.truncate(0)
+
+    def _read_meta(self):
+        if not os.path.exists(self.meta_file):
+            return None
+        try:
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self):
+        # Write-then-rename so a crash never leaves a half-written sidecar
+        tmp_file = self.meta_file + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(tmp_file, self.meta_file)
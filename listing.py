@@ -0,0 +1,221 @@
+# listing.py
+
+from collections import OrderedDict, namedtuple
+import fnmatch
+import hashlib
+from operator import attrgetter
+import os
+import re
+import threading
+import time
+
+# Directories whose entries are kept in memory
+DIR_CACHE_SIZE = 256
+# A cached directory is re-scanned after this long even if its mtime is
+# unchanged - files rewritten in place change size without touching it
+DIR_CACHE_TTL = 60.0
+# Entries one list_files call returns
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_DEPTH = 10
+# A recursive walk stops after this many entries
+MAX_SCAN_ENTRIES = 200_000
+# Extensions shown in a listing's summary
+TOP_EXTENSIONS = 8
+# Sorted listings kept for paging through
+LISTING_CACHE_SIZE = 16
+# Listed, but a recursive walk doesn't descend into them
+NO_DESCEND = frozenset({"__pycache__", "node_modules"})
+
+SORT_KEYS = ("name", "size", "modified")
+
+# size and mtime are None for directories
+Entry = namedtuple("Entry", "path name is_dir size mtime")
+
+
+class _DirCache:
+    """LRU of one directory's scandir results, valid while the directory's
+    mtime is unchanged (adding, removing or renaming an entry changes it),
+    so listing it again costs a single stat"""
+
+    def __init__(self, max_entries=DIR_CACHE_SIZE, ttl=DIR_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "scans": 0, "evictions": 0}
+
+    def entries(self, path):
+        """[(name, is_dir, is_link, size, mtime)] for a directory"""
+        mtime = os.stat(path).st_mtime_ns
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == mtime and now - cached[1] < self.ttl:
+                self._entries.move_to_end(path)
+                self.stats["hits"] += 1
+                return cached[2]
+        entries = scan(path)
+        with self._lock:
+            self.stats["scans"] += 1
+            self._entries[path] = (mtime, now, entries)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return entries
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, directories=len(self._entries))
+
+
+def scan(path):
+    """One pass of os.scandir: the entry type comes from the dirent, so only
+    files need a stat (for size and mtime)"""
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+                is_link = entry.is_symlink()
+                if is_dir:
+                    entries.append((entry.name, True, is_link, None, None))
+                else:
+                    st = entry.stat()
+                    entries.append((entry.name, False, is_link, st.st_size, st.st_mtime))
+            except OSError:
+                # Broken symlink or entry removed mid-scan
+                entries.append((entry.name, False, True, 0, None))
+    return entries
+
+
+dir_cache = _DirCache()
+
+
+def walk(root, depth=1, pattern=None, limit=MAX_SCAN_ENTRIES):
+    """Entries under root down to depth levels (1 = root only), breadth
+    first. pattern is a glob matched against file names, or against the
+    relative path when it contains a "/"; with a pattern only files are
+    returned. Symlinked, hidden and NO_DESCEND directories are listed but
+    not descended into. Returns (entries, complete, scanned) where scanned
+    is [(directory, its cached entry list)]."""
+    results, scanned = [], []
+    if pattern is not None:
+        match = re.compile(fnmatch.translate(pattern)).match
+        by_path = "/" in pattern
+    queue = [("", root)]
+    level = 0
+    while queue and level < depth:
+        next_queue = []
+        for rel_dir, abs_dir in queue:
+            try:
+                entries = dir_cache.entries(abs_dir)
+            except (PermissionError, FileNotFoundError):
+                if not rel_dir:
+                    raise
+                continue  # Unreadable or vanished subdirectory
+            scanned.append((abs_dir, entries))
+            prefix = f"{rel_dir}/" if rel_dir else ""
+            descend = level + 1 < depth
+            for name, is_dir, is_link, size, mtime in entries:
+                rel = prefix + name
+                if descend and is_dir and not is_link and name[0] != "." and name not in NO_DESCEND:
+                    next_queue.append((rel, os.path.join(abs_dir, name)))
+                if pattern is None or (not is_dir and match(rel if by_path else name)):
+                    results.append(Entry(rel, name, is_dir, size, mtime))
+                    if len(results) >= limit:
+                        return results, False, scanned
+        queue = next_queue
+        level += 1
+    return results, True, scanned
+
+
+def sort_entries(entries, sort="name"):
+    """Directories first, by path; files by path, or largest / newest
+    first when sorting by size / modified"""
+    dirs = sorted((e for e in entries if e.is_dir), key=attrgetter("path"))
+    files = sorted((e for e in entries if not e.is_dir), key=attrgetter("path"))
+    if sort == "size":
+        files.sort(key=lambda e: e.size or 0, reverse=True)  # Stable - ties stay by path
+    elif sort == "modified":
+        files.sort(key=lambda e: e.mtime or 0, reverse=True)
+    return dirs + files
+
+
+def summarize(entries, top=TOP_EXTENSIONS):
+    """(directories, files, total bytes, [(extension, count, bytes)] largest count first)"""
+    dirs = files = total = 0
+    extensions = {}
+    for entry in entries:
+        if entry.is_dir:
+            dirs += 1
+            continue
+        files += 1
+        total += entry.size or 0
+        dot = entry.name.rfind(".")
+        ext = entry.name[dot:].lower() if dot > 0 else "(none)"  # Like splitext: ".bashrc" has none
+        count, size = extensions.get(ext, (0, 0))
+        extensions[ext] = (count + 1, size + (entry.size or 0))
+    ranked = sorted(extensions.items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+    return dirs, files, total, [(ext, count, size) for ext, (count, size) in ranked[:top]]
+
+
+class Listing:
+    """A sorted walk with its summary, reused while paging"""
+
+    def __init__(self, root, depth=1, pattern=None, sort="name"):
+        entries, self.complete, self.scanned = walk(root, depth, pattern)
+        self.entries = sort_entries(entries, sort)
+        self.dirs, self.files, self.total_size, self.extensions = summarize(self.entries)
+        # Changes whenever the listing does - page cursors carry it
+        self.version = format(hash(tuple(self.entries)) & 0xFFFFFFFF, "08x")
+
+    def is_current(self):
+        """True while no scanned directory has changed (one stat each)"""
+        try:
+            return all(dir_cache.entries(path) is entries for path, entries in self.scanned)
+        except OSError:
+            return False
+
+
+_listings = OrderedDict()
+_listings_lock = threading.Lock()
+
+
+def get_listing(root, depth=1, pattern=None, sort="name"):
+    """Listing for the arguments, rebuilt only when a directory in it changed"""
+    key = (root, depth, pattern, sort)
+    with _listings_lock:
+        cached = _listings.get(key)
+    if cached is not None and cached.is_current():
+        with _listings_lock:
+            _listings.move_to_end(key)
+        return cached
+    result = Listing(root, depth, pattern, sort)
+    with _listings_lock:
+        _listings[key] = result
+        _listings.move_to_end(key)
+        while len(_listings) > LISTING_CACHE_SIZE:
+            _listings.popitem(last=False)
+    return result
+
+
+def make_cursor(offset, *listing, version=""):
+    """Opaque page cursor: the offset, a fingerprint of the listing
+    arguments, so a cursor isn't silently reused for a different listing,
+    and the listing's version, so it isn't reused after the listing changed"""
+    fingerprint = hashlib.sha1(repr(listing).encode("utf-8")).hexdigest()[:8]
+    return f"{offset}-{fingerprint}-{version}"
+
+
+def parse_cursor(cursor, *listing, version=""):
+    """Offset from a cursor made by make_cursor; ValueError if it belongs to
+    another listing, is malformed or was made before the listing changed"""
+    offset, _, rest = cursor.partition("-")
+    cursor_version = rest.partition("-")[2]
+    if not offset.isdigit() or make_cursor(int(offset), *listing, version=cursor_version) != cursor:
+        raise ValueError(f"cursor '{cursor}' doesn't belong to this listing")
+    if cursor_version != version:
+        raise ValueError(f"the listing changed since cursor '{cursor}' was made - list again without a cursor")
+    return int(offset)
@@ -1,25 +1,56 @@
 # main.py
 
-from agent import TaskTrekAgent
+from agent import GROQ_BREAKER, TaskTrekAgent, load_config
+import http_client
+from cache import tool_cache
+import fileread
+import listing
+import mathexpr
+from response_cache import response_cache
+from ratelimit import groq_limiter
+from tracing import tracer
+from workspace import workspace_index
 
 def main():
+    if load_config() is None:
+        print("Error: Please set your GROQ_API_KEY in the .env file")
+        exit(1)
+
     print("TaskTrek Agent (Groq - Phase 3: Tool Integration)")
     print("Type 'exit' to quit.\n")
 
     agent = TaskTrekAgent()
 
+    try:
+        run_repl(agent)
+    except (KeyboardInterrupt, EOFError):
+        print()
+    finally:
+        # Drain pending writes, compact the session journal and show session info
+        session_file = agent.memory.close()
+        http_client.close()
+        tracer.close()
+        print(f"Session saved to: {session_file}")
+        print("Goodbye!")
+
+def run_repl(agent):
+    # find_files / search_files start the workspace index on first use. An
+    # explicitly configured workspace is loaded once, after the first task, so
+    # it never delays startup.
+    preload = workspace_index.preload
     while True:
         user_input = input("Task: ")
         if user_input.strip().lower() in ["exit", "quit"]:
-            # Show session info before exiting
-            print(f"Session saved to: {agent.memory.current_session_file}")
-            print("Goodbye!")
             break
+        if preload:
+            workspace_index.start()
+            preload = False
         
         # Memory debug commands
         if user_input.strip().lower() == "memory":
             stats = agent.memory.get_memory_stats()
             print(f"Memory Stats: {stats}")
+            print(f"Persistence: {agent.memory.get_persistence_stats()}")
             continue
         elif user_input.strip().lower() == "important":
             summary = agent.memory.get_important_summary()
@@ -27,15 +58,36 @@ def main():
             for item in summary:
                 print(f"  {item['reason']}: {item['preview']}")
             continue
+        elif user_input.strip().lower() == "http":
+            print(f"HTTP Pool: {http_client.get_stats()}")
+            print(f"Groq circuit breaker: {GROQ_BREAKER.get_stats()}")
+            print(f"Groq rate limiter: {groq_limiter.get_stats()}")
+            continue
+        elif user_input.strip().lower() == "cache":
+            print(f"Tool Cache: {tool_cache.get_stats()}")
+            print(f"Response Cache: {response_cache.get_stats()}")
+            print(f"Prefetch: {agent.prefetcher.get_stats()}")
+            print(f"Line indexes: {fileread.line_indexes.get_stats()}")
+            print(f"Directory cache: {listing.dir_cache.get_stats()}")
+            print(f"Workspace index: {workspace_index.get_stats()}")
+            print(f"Compiled expressions: {mathexpr.get_stats()}")
+            continue
+        elif user_input.strip().lower() == "stats":
+            print("Latency by stage (last 1000 spans each):")
+            print(tracer.format_stats())
+            continue
         elif user_input.strip().lower() == "session":
             print(f"Current session file: {agent.memory.current_session_file}")
             continue
         
         try:
-            response = agent.chat(user_input)
-            print("Agent:", response, "\n")
+            # Render tokens as they arrive instead of waiting for the full reply
+            print("Agent: ", end="", flush=True)
+            for token in agent.chat_stream(user_input):
+                print(token, end="", flush=True)
+            print("\n")
         except Exception as e:
-            print("Error:", e)
+            print("\nError:", e)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
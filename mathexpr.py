@@ -0,0 +1,471 @@
+# mathexpr.py
+
+import ast
+from decimal import Decimal, InvalidOperation, localcontext
+import decimal
+from fractions import Fraction
+import functools
+import math
+import operator
+
+# Longest expression accepted, and most AST nodes in it
+MAX_EXPRESSION_CHARS = 1000
+MAX_NODES = 300
+# Largest integer (or fraction numerator/denominator) an expression may
+# produce - about 10,000 digits. Exponentiation, multiplication, shifts and
+# factorial-like functions are checked *before* computing, which also
+# bounds the CPU an expression can use.
+MAX_INT_BITS = 33_220
+# Exact integers longer than this are shown in scientific notation
+MAX_EXACT_DIGITS = 1000
+# Characters of result text calculate returns
+MAX_RESULT_CHARS = 2000
+# pow(a, b, m): exponent bits x modulus bits
+MODPOW_BUDGET = 20_000_000
+# Significant digits in decimal mode
+DECIMAL_DIGITS = 50
+# Largest decimal-mode exponent: keeps decimals - and int(), floor(),
+# round()... of them - under the same ~10,000 digits as MAX_INT_BITS
+DECIMAL_MAX_EXPONENT = int(MAX_INT_BITS * math.log10(2)) - 1
+# Items in a list / tuple argument, e.g. sum([1, 2, 3])
+MAX_SEQUENCE_ITEMS = 256
+# Points one vectorized call may evaluate
+MAX_POINTS = 10_000
+# Sweeps at least this long use NumPy (float64) when it's installed
+NUMPY_MIN_POINTS = 64
+COMPILE_CACHE_SIZE = 256
+
+MODES = ("auto", "decimal", "fraction")
+VARIABLE = "x"
+
+_LOG2_10 = math.log2(10)
+_PI = Decimal("3.14159265358979323846264338327950288419716939937510582097494459")
+_TAU = Decimal("6.28318530717958647692528676655900576839433879875021164194988918")
+
+
+class ExpressionError(ValueError):
+    """An expression that isn't allowed or would be too expensive"""
+
+
+def _bits(value):
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, int):
+        return value.bit_length()
+    if isinstance(value, Fraction):
+        return max(value.numerator.bit_length(), value.denominator.bit_length())
+    if isinstance(value, Decimal) and value.is_finite() and value:
+        return max(0, int((value.adjusted() + 1) * _LOG2_10))  # Bits of its integer part, rounded up
+    return 0  # float overflows on its own
+
+
+def _number(value):
+    """Operands must be numbers - a list operand would let [0] * 10**10
+    allocate without any size check"""
+    if not isinstance(value, (int, float, Fraction, Decimal)):
+        raise ExpressionError(f"operators only work on numbers, not {type(value).__name__}")
+    return value
+
+
+def _check_bits(bits):
+    if bits > MAX_INT_BITS:
+        raise ExpressionError(f"result too large (about {int(bits * 0.30103):,} digits; "
+                              f"the limit is {int(MAX_INT_BITS * 0.30103):,})")
+
+
+def _pow(base, exponent, modulus=None):
+    if modulus is not None:
+        if not all(isinstance(v, int) for v in (base, exponent, modulus)):
+            raise ExpressionError("pow() with a modulus needs integers")
+        if exponent.bit_length() * max(modulus.bit_length(), 64) > MODPOW_BUDGET:
+            raise ExpressionError("modular pow too expensive")
+        return pow(base, exponent, modulus)
+    whole = exponent
+    if isinstance(exponent, Fraction) and exponent.denominator == 1:
+        whole = exponent.numerator
+    if isinstance(whole, int) and isinstance(base, (int, Fraction)):
+        if isinstance(base, int) and whole < 0:
+            return base ** exponent  # A float - under/overflows on its own
+        # Bits of the result's numerator / denominator: |exponent| x log2 of the base's
+        parts = (base.numerator, base.denominator) if isinstance(base, Fraction) else (base,)
+        size = max(math.log2(abs(part)) if part else 0 for part in parts)
+        _check_bits(int(abs(whole) * size) + 1)
+    return base ** exponent
+
+
+def _mul(a, b):
+    _check_bits(_bits(a) + _bits(b))
+    return a * b
+
+
+def _exact_div(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return Fraction(a, b)
+    return a / b
+
+
+def _exact_pow(base, exponent, modulus=None):
+    if isinstance(base, int) and isinstance(exponent, int) and exponent < 0 and modulus is None:
+        base = Fraction(base)
+    return _pow(base, exponent, modulus)
+
+
+def _lshift(a, b):
+    if isinstance(b, int):
+        _check_bits(_bits(a) + b)
+    return a << b
+
+
+def _round(value, ndigits=None):
+    """round() with ndigits capped - for ints and fractions it builds
+    10**|ndigits|"""
+    if ndigits is None:
+        return round(value)
+    if isinstance(ndigits, Decimal) and ndigits == ndigits.to_integral_value():
+        ndigits = int(ndigits)  # Decimal mode's literals
+    if isinstance(ndigits, int) and abs(ndigits) > DECIMAL_MAX_EXPONENT:
+        raise ExpressionError(f"round() takes at most {DECIMAL_MAX_EXPONENT:,} digits either way")
+    return round(value, ndigits)
+
+
+def _gamma_bits(n):
+    """Bits of n! (0 for small n)"""
+    return math.lgamma(n + 1) / math.log(2) if n > 20 else 0
+
+
+def _factorial(n):
+    if isinstance(n, int) and n > 0:
+        _check_bits(_gamma_bits(n))
+    return math.factorial(n)
+
+
+def _comb(n, k):
+    if isinstance(n, int) and isinstance(k, int) and 0 <= k <= n:
+        _check_bits(_gamma_bits(n) - _gamma_bits(k) - _gamma_bits(n - k))
+    return math.comb(n, k)
+
+
+def _perm(n, k=None):
+    if isinstance(n, int) and n >= 0 and (k is None or isinstance(k, int) and 0 <= k <= n):
+        _check_bits(_gamma_bits(n) - (_gamma_bits(n - k) if k is not None else 0))
+    return math.perm(n, k)
+
+
+def _prod(values, start=1):
+    result = start
+    for value in values:
+        result = _mul(result, value)
+    return result
+
+
+def _lcm(*values):
+    result = 1
+    for value in values:
+        _check_bits(_bits(result) + _bits(value))
+        result = math.lcm(result, value)
+    return result
+
+
+_BINARY = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: _mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: _pow,
+    ast.LShift: _lshift, ast.RShift: operator.rshift,
+    ast.BitAnd: operator.and_, ast.BitOr: operator.or_, ast.BitXor: operator.xor
+}
+_UNARY = {ast.UAdd: operator.pos, ast.USub: operator.neg, ast.Invert: operator.invert, ast.Not: operator.not_}
+_COMPARE = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt,
+    ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge
+}
+_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.BoolOp, ast.IfExp, ast.Call,
+    ast.Name, ast.Load, ast.Constant, ast.Tuple, ast.List, ast.And, ast.Or,
+    *_BINARY, *_UNARY, *_COMPARE
+)
+
+
+def _math_functions():
+    functions = {
+        name: value for name, value in vars(math).items()
+        if not name.startswith("_") and callable(value)
+    }
+    functions.update({
+        "factorial": _factorial, "comb": _comb, "perm": _perm, "prod": _prod, "lcm": _lcm,
+        "pow": _pow, "abs": abs, "round": _round, "min": min, "max": max, "sum": sum,
+        "int": int, "float": float, "ln": math.log
+    })
+    return functions
+
+
+def _decimal_log(x, base=None):
+    x = Decimal(x)
+    return x.ln() if base is None else x.ln() / Decimal(base).ln()
+
+
+_DECIMAL_FUNCTIONS = {
+    "sqrt": lambda x: Decimal(x).sqrt(), "exp": lambda x: Decimal(x).exp(),
+    "ln": lambda x: Decimal(x).ln(), "log": _decimal_log, "log10": lambda x: Decimal(x).log10(),
+    "floor": math.floor, "ceil": math.ceil, "trunc": math.trunc, "fabs": lambda x: abs(Decimal(x)),
+    "abs": abs, "round": _round, "min": min, "max": max, "sum": sum, "pow": _pow,
+    "int": int, "factorial": _factorial, "comb": _comb, "perm": _perm, "gcd": math.gcd,
+    "isqrt": math.isqrt
+}
+
+_NAMESPACES = {
+    "auto": (_math_functions(), {"pi": math.pi, "e": math.e, "tau": math.tau, "inf": math.inf, "nan": math.nan}),
+    "fraction": (dict(_math_functions(), pow=_exact_pow), {"pi": math.pi, "e": math.e, "tau": math.tau}),
+    "decimal": (_DECIMAL_FUNCTIONS, {"pi": _PI, "tau": _TAU}),
+}
+
+
+def _literal(value, mode):
+    if isinstance(value, bool) or mode == "auto" or isinstance(value, int) and mode == "fraction":
+        return value
+    if mode == "decimal":
+        return Decimal(repr(value))  # repr is the shortest exact spelling: 0.1 -> "0.1"
+    return Fraction(repr(value))
+
+
+class _Compiler:
+    """Turns a validated AST into nested closures: each node is looked up
+    and type-checked once, so re-evaluating (per point in a sweep) is just
+    function calls"""
+
+    def __init__(self, mode, variables):
+        self.mode = mode
+        self.functions, self.constants = _NAMESPACES[mode]
+        self.variables = variables
+
+    def compile(self, node):
+        method = getattr(self, f"_{type(node).__name__}", None)
+        if method is None:
+            raise ExpressionError(f"{type(node).__name__} isn't allowed")
+        return method(node)
+
+    def _Expression(self, node):
+        return self.compile(node.body)
+
+    def _Constant(self, node):
+        if not isinstance(node.value, (int, float)):
+            raise ExpressionError(f"only numbers are allowed, not {node.value!r}")
+        value = _literal(node.value, self.mode)
+        return lambda env: value
+
+    def _Name(self, node):
+        name = node.id
+        if name in self.variables:
+            return lambda env: env[name]
+        if name in self.constants:
+            value = self.constants[name]
+            if isinstance(value, Decimal):
+                return lambda env: +value  # Rounds to the evaluation's precision
+            return lambda env: value
+        if name == "e" and self.mode == "decimal":
+            return lambda env: Decimal(1).exp()  # Needs the evaluation's precision
+        if name in self.functions:
+            raise ExpressionError(f"{name} is a function - call it like {name}(...)")
+        raise ExpressionError(f"unknown name '{name}'")
+
+    def _BinOp(self, node):
+        op, left, right = _BINARY[type(node.op)], self.compile(node.left), self.compile(node.right)
+        if self.mode == "fraction":
+            op = {operator.truediv: _exact_div, _pow: _exact_pow}.get(op, op)
+        return lambda env: op(_number(left(env)), _number(right(env)))
+
+    def _UnaryOp(self, node):
+        op, operand = _UNARY[type(node.op)], self.compile(node.operand)
+        return lambda env: op(_number(operand(env)))
+
+    def _Compare(self, node):
+        ops = [_COMPARE[type(op)] for op in node.ops]
+        operands = [self.compile(node.left)] + [self.compile(c) for c in node.comparators]
+
+        def compare(env):
+            values = [_number(operand(env)) for operand in operands]
+            return all(op(a, b) for op, a, b in zip(ops, values, values[1:]))
+        return compare
+
+    def _BoolOp(self, node):
+        values = [self.compile(value) for value in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda env: all(value(env) for value in values)
+        return lambda env: any(value(env) for value in values)
+
+    def _IfExp(self, node):
+        test, body, orelse = self.compile(node.test), self.compile(node.body), self.compile(node.orelse)
+        return lambda env: body(env) if test(env) else orelse(env)
+
+    def _Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in self.functions:
+            name = node.func.id if isinstance(node.func, ast.Name) else ast.unparse(node.func)
+            suffix = f" in {self.mode} mode" if self.mode != "auto" else ""
+            raise ExpressionError(f"unknown function '{name}'{suffix}")
+        if node.keywords:
+            raise ExpressionError("keyword arguments aren't supported")
+        function = self.functions[node.func.id]
+        args = [self._sequence(arg) if isinstance(arg, (ast.List, ast.Tuple)) else self.compile(arg)
+                for arg in node.args]
+        return lambda env: function(*[arg(env) for arg in args])
+
+    def _sequence(self, node):
+        if len(node.elts) > MAX_SEQUENCE_ITEMS:
+            raise ExpressionError(f"lists may have at most {MAX_SEQUENCE_ITEMS} items")
+        items = [self.compile(item) for item in node.elts]
+        return lambda env: [item(env) for item in items]
+
+    def _Tuple(self, node):
+        raise ExpressionError("lists are only allowed as function arguments, e.g. sum([1, 2, 3])")
+
+    _List = _Tuple
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_expression(expression, mode="auto", variables=()):
+    """Parse, whitelist and compile an expression (cached); returns a
+    function of an {variable: value} dict"""
+    if mode not in MODES:
+        raise ExpressionError(f"mode must be one of {', '.join(MODES)}")
+    if len(expression) > MAX_EXPRESSION_CHARS:
+        raise ExpressionError(f"expression longer than {MAX_EXPRESSION_CHARS} characters")
+    try:
+        tree = ast.parse(expression.strip().replace("^", "**"), mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"invalid expression: {e.msg}") from None
+    nodes = list(ast.walk(tree))
+    if len(nodes) > MAX_NODES:
+        raise ExpressionError(f"expression has more than {MAX_NODES} parts")
+    for node in nodes:
+        if not isinstance(node, _NODES):
+            raise ExpressionError(f"{type(node).__name__} isn't allowed")
+    return _Compiler(mode, variables).compile(tree)
+
+
+def evaluate(expression, mode="auto", variables=None):
+    """Value of an expression; raises ExpressionError (or the arithmetic
+    error, e.g. ZeroDivisionError) if it can't be computed"""
+    names = tuple(sorted(variables)) if variables else ()
+    function = compile_expression(expression, mode, names)
+    return _run(function, mode, variables or {})
+
+
+def _run(function, mode, env):
+    if mode != "decimal":
+        return function(env)
+    with localcontext() as context:
+        context.prec = DECIMAL_DIGITS
+        context.Emax, context.Emin = DECIMAL_MAX_EXPONENT, -999_999
+        try:
+            return function(env)
+        except decimal.Overflow:
+            raise ExpressionError(f"result too large (the limit is {DECIMAL_MAX_EXPONENT + 1:,} digits)") from None
+        except InvalidOperation:
+            raise ExpressionError("invalid decimal operation (e.g. sqrt of a negative number)") from None
+
+
+def format_number(value):
+    """Result text: exact integers up to MAX_EXACT_DIGITS digits, fractions
+    with a decimal approximation"""
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, int):
+        if value.bit_length() > MAX_EXACT_DIGITS * 3.33:
+            digits = int(math.log10(abs(value))) + 1
+            leading = abs(value) // 10 ** (digits - 16)
+            sign = "-" if value < 0 else ""
+            return f"{sign}{leading / 10 ** 15:.15f}e+{digits - 1} ({digits:,} digits)"
+        return str(value)
+    if isinstance(value, Fraction):
+        if value.denominator == 1:
+            return format_number(value.numerator)
+        try:
+            approx = f"{float(value):.15g}"
+        except OverflowError:
+            approx = "too large for a float"
+        return f"{format_number(value.numerator)}/{format_number(value.denominator)} (≈ {approx})"
+    if isinstance(value, Decimal):
+        return str(value.normalize()) if value == value.to_integral_value() else str(value)
+    return str(value)
+
+
+def parse_range(text):
+    """'start:stop' or 'start:stop:step' (stop included) -> list of values"""
+    parts = text.split(":")
+    if len(parts) not in (2, 3):
+        raise ExpressionError("value_range must look like 'start:stop' or 'start:stop:step'")
+    try:
+        numbers = [float(part) if any(c in part for c in ".eE") else int(part) for part in parts]
+    except ValueError:
+        raise ExpressionError(f"value_range '{text}' isn't made of numbers") from None
+    start, stop = numbers[0], numbers[1]
+    step = numbers[2] if len(numbers) == 3 else 1
+    if step == 0 or (stop - start) / step < 0:
+        raise ExpressionError("value_range step must move from start towards stop")
+    count = int(math.floor((stop - start) / step + 1e-9)) + 1
+    if count > MAX_POINTS:
+        raise ExpressionError(f"value_range has {count:,} points (at most {MAX_POINTS:,})")
+    if isinstance(step, int) and isinstance(start, int):
+        return list(range(start, start + step * count, step))
+    return [start + i * step for i in range(count)]
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _numpy_function(expression):
+    """Compile the expression for NumPy arrays, or None if it can't be"""
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+    tree = ast.parse(expression.strip().replace("^", "**"), mode="eval")
+    names = {
+        "sqrt": np.sqrt, "exp": np.exp, "log": np.log, "ln": np.log, "log10": np.log10, "log2": np.log2,
+        "sin": np.sin, "cos": np.cos, "tan": np.tan, "asin": np.arcsin, "acos": np.arccos,
+        "atan": np.arctan, "atan2": np.arctan2, "sinh": np.sinh, "cosh": np.cosh, "tanh": np.tanh,
+        "floor": np.floor, "ceil": np.ceil, "fabs": np.fabs, "abs": np.abs, "hypot": np.hypot,
+        "degrees": np.degrees, "radians": np.radians, "pow": np.power,
+        "pi": np.pi, "e": np.e, "tau": 2 * np.pi
+    }
+    allowed = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+               ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod, ast.UAdd, ast.USub)
+    for node in ast.walk(tree):
+        if not isinstance(node, allowed):
+            return None  # Comparisons, integer-only functions... - evaluate point by point
+        if isinstance(node, ast.Name) and node.id != VARIABLE and node.id not in names:
+            return None
+        if isinstance(node, ast.Call) and (not isinstance(node.func, ast.Name) or node.keywords):
+            return None
+    code = compile(tree, "<calculate>", "eval")
+
+    def run(values):
+        x = np.asarray(values, dtype=np.float64)
+        with np.errstate(all="ignore"):
+            result = eval(code, {"__builtins__": {}}, dict(names, x=x))  # Names checked above
+        return np.broadcast_to(result, x.shape).tolist()
+    return run
+
+
+def evaluate_many(expression, values, mode="auto"):
+    """Evaluate over many values of x: ([(x, result or error text)], used NumPy).
+    Long sweeps in auto mode run vectorized in NumPy when it's installed."""
+    if len(values) > MAX_POINTS:
+        raise ExpressionError(f"at most {MAX_POINTS:,} values")
+    function = compile_expression(expression, mode, (VARIABLE,))  # Validates the expression
+    if mode == "auto" and len(values) >= NUMPY_MIN_POINTS:
+        vectorized = _numpy_function(expression)
+        if vectorized is not None:
+            return list(zip(values, vectorized(values))), True
+    if mode == "decimal":
+        values = [Decimal(repr(v)) for v in values]
+    elif mode == "fraction":
+        values = [Fraction(repr(v)) for v in values]
+    results = []
+    for value in values:
+        try:
+            results.append((value, _run(function, mode, {VARIABLE: value})))
+        except (ArithmeticError, ValueError, TypeError) as e:
+            results.append((value, f"error: {e}"))
+    return results, False
+
+
+def get_stats():
+    info = compile_expression.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "compiled": info.currsize}
@@ -1,21 +1,125 @@
 # memory.py
 
 from datetime import datetime
+import hashlib
 import json
 import os
+import threading
+from journal import SessionJournal
+from persistence import PersistenceWorker
+from tokenizer import (
+    MESSAGE_OVERHEAD, REPLY_PRIMING, count_message_tokens, tokenizer_name, truncate_to_tokens
+)
+
+class ContextMessage(dict):
+    """Read-only {"role", "content"} dict handed out by Memory.get_history"""
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Memory history is read-only; copy it with dict(msg) to modify")
+    
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+# Session file names handed out in this process (guards same-second starts)
+_claimed_sessions = set()
+_claimed_lock = threading.Lock()
+
+def _content_key(role, content):
+    """Stable digest of a message, computed once when it is recorded"""
+    digest = hashlib.blake2b(role.encode("utf-8"), digest_size=16)
+    digest.update(b"\0")
+    digest.update(content.encode("utf-8"))
+    return digest.digest()
 
 class Memory:
-    def __init__(self, system_prompt, recent_limit=10, important_limit=5):
+    def __init__(self, system_prompt, recent_limit=10, important_limit=5, storage="journal",
+                 write_behind=True, durability="flush", flush_interval=0.2, max_queue=1000,
+                 token_budget=None, session_id=None, persistence=None, conversations_dir="conversations"):
         self.system_prompt = system_prompt
         self.recent_history = []      # Last N messages for immediate context
         self.important_history = []   # Key messages worth preserving longer
         self.recent_limit = recent_limit
         self.important_limit = important_limit
         
-        # Auto-save setup
-        self.conversations_dir = "conversations"
-        self._ensure_conversations_dir()
-        self.current_session_file = self._get_session_filename()
+        # Token-budget mode: pack important + recent messages into this many
+        # prompt tokens instead of relying on the message-count limits alone
+        self.token_budget = token_budget
+        
+        # (key, ContextMessage, tokens) entries kept in step with the two history
+        # lists, so get_history never re-copies, re-hashes or re-counts bodies
+        self._recent_entries = []
+        self._important_entries = []
+        self._context_cache = None
+        self._context_system_prompt = None
+        self._system_tokens = 0
+        self.context_tokens = 0        # Estimated size of the last built context
+        self.last_usage = None         # Exact usage reported by the API last turn
+        
+        # Auto-save setup. Nothing touches the disk until the first save: the
+        # session file name, journal and conversations dir are set up lazily.
+        self.conversations_dir = conversations_dir
+        self.session_id = session_id
+        self._started_at = datetime.now()
+        self._session_file = None
+        self._dir_ready = False
+        self._storage_lock = threading.Lock()
+        
+        # "journal" appends one line per message; "json" rewrites the session file;
+        # "none" keeps the conversation in memory only (e.g. batch runs)
+        self.storage = storage
+        self.durability = durability
+        self._journal = None
+        
+        # Write-behind: saves happen on a background thread, off the chat turn.
+        # A worker passed in is shared with other sessions and not ours to close.
+        self.persistence = persistence if storage != "none" else None
+        self._owns_persistence = False
+        if persistence is None and write_behind and storage != "none":
+            self._owns_persistence = True
+            self.persistence = PersistenceWorker(
+                self._write_batch, max_queue=max_queue, flush_interval=flush_interval
+            )
+    
+    @property
+    def current_session_file(self):
+        """Path of this session's file (claimed on first use)"""
+        with self._storage_lock:
+            if self._session_file is None:
+                self._session_file = self._get_session_filename(self.session_id)
+            return self._session_file
+    
+    @current_session_file.setter
+    def current_session_file(self, path):
+        self._session_file = path
+    
+    @property
+    def journal(self):
+        """SessionJournal for journal storage (None for legacy json storage)"""
+        if self.storage != "journal":
+            return None
+        if self._journal is None:
+            session_file = self.current_session_file
+            with self._storage_lock:
+                if self._journal is None:
+                    self._journal = SessionJournal(session_file, self.durability)
+        return self._journal
+    
+    @journal.setter
+    def journal(self, journal):
+        self._journal = journal
+    
+    @classmethod
+    def from_journal(cls, journal_file, system_prompt, recent_limit=10, important_limit=5, **kwargs):
+        """Rebuild a Memory from a session journal (e.g. after a crash)"""
+        memory = cls(system_prompt, recent_limit, important_limit, storage="journal", **kwargs)
+        memory.journal = SessionJournal.from_journal_file(journal_file, memory.durability)
+        memory.current_session_file = memory.journal.session_file
+        memory._dir_ready = True
+        
+        # Replay without re-saving - the messages are already on disk
+        for message in memory.journal.messages():
+            memory._record_message(message)
+        return memory
     
     def add_user_message(self, content):
         message = {
@@ -23,8 +127,7 @@ class Memory:
             "content": content,
             "timestamp": datetime.now().isoformat()
         }
-        self.recent_history.append(message)
-        self._trim_recent()
+        self._record_message(message)
         self._auto_save_message(message)
     
     def add_agent_message(self, content):
@@ -33,17 +136,29 @@ class Memory:
             "content": content,
             "timestamp": datetime.now().isoformat()
         }
+        self._record_message(message)
+        self._auto_save_message(message)
+    
+    def _record_message(self, message):
+        """Place a message into recent (and, if relevant, important) history"""
+        entry = (
+            _content_key(message["role"], message["content"]),
+            ContextMessage(role=message["role"], content=message["content"]),
+            count_message_tokens(message["role"], message["content"])
+        )
         self.recent_history.append(message)
+        self._recent_entries.append(entry)
         
-        # Check if this message should be preserved as important
-        if self._is_important_message(content):
+        # Check if assistant message should be preserved as important
+        if message["role"] == "assistant" and self._is_important_message(message["content"]):
             important_msg = message.copy()
-            important_msg["reason"] = self._get_importance_reason(content)
+            important_msg["reason"] = self._get_importance_reason(message["content"])
             self.important_history.append(important_msg)
+            self._important_entries.append(entry)
             self._trim_important()
         
         self._trim_recent()
-        self._auto_save_message(message)
+        self._context_cache = None
     
     def _is_important_message(self, content):
         """Determine if a message should be preserved as important"""
@@ -74,54 +189,98 @@ class Memory:
         """Keep only the most recent messages"""
         if len(self.recent_history) > self.recent_limit:
             self.recent_history = self.recent_history[-self.recent_limit:]
+            self._recent_entries = self._recent_entries[-self.recent_limit:]
+            self._context_cache = None
     
     def _trim_important(self):
         """Keep only the most important messages"""
         if len(self.important_history) > self.important_limit:
             # Keep the most recent important messages
             self.important_history = self.important_history[-self.important_limit:]
+            self._important_entries = self._important_entries[-self.important_limit:]
+            self._context_cache = None
     
     def get_history(self):
-        """Get combined history for API calls"""
-        # Start with system prompt
-        history = [{"role": "system", "content": self.system_prompt}]
-        
-        # Add important messages (without metadata)
-        for msg in self.important_history:
-            history.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
+        """Get combined history for API calls (cached, read-only)"""
+        if self._context_cache is not None and self._context_system_prompt is self.system_prompt:
+            return self._context_cache
         
-        # Add recent messages (without metadata)
-        for msg in self.recent_history:
-            history.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
+        if self._context_system_prompt is not self.system_prompt:
+            self._system_tokens = count_message_tokens("system", self.system_prompt)
         
-        # Remove duplicates while preserving order
+        # Remove duplicates while preserving order, using the precomputed keys
         seen = set()
-        unique_history = []
-        for msg in history:
-            msg_key = (msg["role"], msg["content"])
-            if msg_key not in seen:
-                seen.add(msg_key)
-                unique_history.append(msg)
+        entries = []
+        for entry in self._important_entries + self._recent_entries:
+            if entry[0] not in seen:
+                seen.add(entry[0])
+                entries.append(entry)
         
-        return unique_history
+        if self.token_budget is not None:
+            entries = self._pack_to_budget(entries)
+        
+        # Start with system prompt, then important and recent messages
+        history = [ContextMessage(role="system", content=self.system_prompt)]
+        history.extend(msg for _, msg, _ in entries)
+        
+        self.context_tokens = REPLY_PRIMING + self._system_tokens + sum(tokens for _, _, tokens in entries)
+        self._context_cache = tuple(history)
+        self._context_system_prompt = self.system_prompt
+        return self._context_cache
+    
+    def _pack_to_budget(self, entries):
+        """Select the entries that fit in token_budget, keeping their order"""
+        remaining = self.token_budget - REPLY_PRIMING - self._system_tokens
+        chosen = {}
+        
+        # Newest recent messages first, stopping at the first that doesn't fit
+        # so the conversation tail stays contiguous
+        for entry in reversed(self._recent_entries):
+            key, msg, tokens = entry
+            if key in chosen:
+                continue
+            if tokens <= remaining:
+                chosen[key] = entry
+                remaining -= tokens
+            elif not chosen:
+                # The latest message alone is too big (huge tool result) - shrink it
+                content = truncate_to_tokens(msg["content"], remaining - MESSAGE_OVERHEAD - 8)
+                if content:
+                    content += "...[truncated]"
+                    shrunk = ContextMessage(role=msg["role"], content=content)
+                    chosen[key] = (key, shrunk, count_message_tokens(msg["role"], content))
+                    remaining -= chosen[key][2]
+                break
+            else:
+                break
+        
+        # Then fill leftover room with important messages, newest first
+        important_keys = {entry[0] for entry in self._important_entries}
+        for entry in reversed(entries):
+            key, _, tokens = entry
+            if key in important_keys and key not in chosen and tokens <= remaining:
+                chosen[key] = entry
+                remaining -= tokens
+        
+        return [chosen[entry[0]] for entry in entries if entry[0] in chosen]
+    
+    def record_usage(self, usage):
+        """Remember the exact token usage the API reported for the last call"""
+        if usage:
+            self.last_usage = dict(usage)
     
     def get_memory_stats(self):
         """Get memory usage statistics"""
-        total_messages = len(self.recent_history) + len(self.important_history)
         history = self.get_history()
-        estimated_tokens = sum(len(msg["content"].split()) for msg in history)
         
         return {
             "recent_messages": len(self.recent_history),
             "important_messages": len(self.important_history),
             "total_unique_messages": len(history) - 1,  # Exclude system prompt
-            "estimated_tokens": estimated_tokens,
+            "estimated_tokens": self.context_tokens,
+            "last_prompt_tokens": self.last_usage.get("prompt_tokens") if self.last_usage else None,
+            "token_budget": self.token_budget,
+            "tokenizer": tokenizer_name(),
             "recent_limit": self.recent_limit,
             "important_limit": self.important_limit
         }
@@ -140,35 +299,64 @@ class Memory:
     
     def _ensure_conversations_dir(self):
         """Create conversations directory if it doesn't exist"""
+        if self._dir_ready:
+            return
         if not os.path.exists(self.conversations_dir):
-            os.makedirs(self.conversations_dir)
+            os.makedirs(self.conversations_dir, exist_ok=True)
+        self._dir_ready = True
     
-    def _get_session_filename(self):
-        """Generate filename for current session"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return os.path.join(self.conversations_dir, f"session_{timestamp}.json")
+    def _get_session_filename(self, session_id=None):
+        """Generate a unique filename for current session"""
+        timestamp = self._started_at.strftime("%Y%m%d_%H%M%S")
+        base = f"session_{timestamp}_{session_id}" if session_id else f"session_{timestamp}"
+        
+        # Several sessions can start within the same second (batch / async hosting)
+        with _claimed_lock:
+            name, suffix = base, 1
+            while name in _claimed_sessions or any(
+                os.path.exists(os.path.join(self.conversations_dir, name + ext))
+                for ext in (".json", SessionJournal.JOURNAL_SUFFIX)
+            ):
+                suffix += 1
+                name = f"{base}_{suffix}"
+            _claimed_sessions.add(name)
+        return os.path.join(self.conversations_dir, f"{name}.json")
     
     def _auto_save_message(self, message):
-        """Auto-save each message immediately to prevent data loss"""
+        """Auto-save each message to prevent data loss"""
+        if self.storage == "none":
+            return
+        if self.persistence is not None:
+            self.persistence.submit(message, self._write_batch)
+            return
+        
         try:
-            # Load existing session data or create new
-            session_data = self._load_or_create_session()
-            
-            # Add new message
-            session_data["messages"].append(message)
-            
-            # Update session metadata
-            session_data["last_updated"] = datetime.now().isoformat()
-            session_data["message_count"] = len(session_data["messages"])
-            
-            # Save back to file
-            with open(self.current_session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, indent=2, ensure_ascii=False)
-                
+            self._write_batch([message])
         except Exception as e:
             # Don't crash the program if save fails, just print warning
             print(f"Warning: Failed to auto-save message: {e}")
     
+    def _write_batch(self, messages):
+        """Persist a batch of messages to the session storage"""
+        self._ensure_conversations_dir()
+        if self.journal is not None:
+            self.journal.append_batch(messages)
+            return
+        
+        # Load existing session data or create new
+        session_data = self._load_or_create_session()
+        
+        # Add new messages
+        session_data["messages"].extend(messages)
+        
+        # Update session metadata
+        session_data["last_updated"] = datetime.now().isoformat()
+        session_data["message_count"] = len(session_data["messages"])
+        
+        # Save back to file
+        with open(self.current_session_file, 'w', encoding='utf-8') as f:
+            json.dump(session_data, f, indent=2, ensure_ascii=False)
+    
     def _load_or_create_session(self):
         """Load existing session file or create new session structure"""
         if os.path.exists(self.current_session_file):
@@ -190,6 +378,43 @@ class Memory:
             "message_count": 0
         }
     
+    def flush(self):
+        """Wait until every queued message has been written"""
+        if self.persistence is not None:
+            self.persistence.flush()
+    
+    def get_persistence_stats(self):
+        """Get write-behind queue depth and flush latency (for debugging)"""
+        if self.persistence is None:
+            return {"write_behind": False, "storage": self.storage}
+        stats = self.persistence.get_stats()
+        stats["write_behind"] = True
+        stats["storage"] = self.storage
+        if self.journal is not None:
+            stats["durability"] = self.journal.durability
+        return stats
+    
+    def close(self):
+        """Finish the session, compacting the journal into session_*.json"""
+        # Drain pending writes before the journal is folded up
+        if self.persistence is not None:
+            if self._owns_persistence:
+                self.persistence.close()
+            else:
+                self.persistence.flush()
+        if self.storage == "none":
+            return None
+        if self.journal is None:
+            return self.current_session_file
+        try:
+            if self.journal.meta["message_count"] or os.path.exists(self.journal.journal_file):
+                self.journal.compact()
+            else:
+                self.journal.close()
+        except Exception as e:
+            print(f"Warning: Failed to compact session journal: {e}")
+        return self.current_session_file
+    
     def save_conversation_to_file(self, filename=None):
         """Save the entire conversation to a text file"""
         if filename is None:
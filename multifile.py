@@ -0,0 +1,78 @@
+# multifile.py
+
+from concurrent.futures import ThreadPoolExecutor
+import glob
+from itertools import islice
+import os
+import threading
+
+# Files one batch call covers
+MAX_BATCH_FILES = 50
+# Characters of file content one read_files call returns in total
+BATCH_MAX_CHARS = int(os.getenv("TASKTREK_BATCH_MAX_CHARS", "12000"))
+# Content shown per file even when the budget is spread thin
+MIN_FILE_CHARS = 200
+# Threads stat'ing / reading the files of one call
+WORKERS = 8
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="files")
+        return _pool
+
+
+def expand_paths(filenames=None, pattern="", limit=MAX_BATCH_FILES):
+    """Paths from an explicit list and/or a glob ("**" recurses), without
+    duplicates: the list in order, then the glob's matches sorted. The glob
+    stops one match past the limit instead of walking the whole tree.
+    Returns (paths, whether more were left out)."""
+    unique = dict.fromkeys(filenames or [])
+    if pattern:
+        matches = (path for path in glob.iglob(os.path.expanduser(pattern), recursive=True)
+                   if path not in unique and not os.path.isdir(path))
+        unique.update(dict.fromkeys(sorted(islice(matches, max(0, limit + 1 - len(unique))))))
+    paths = list(unique)
+    return paths[:limit], len(paths) > limit
+
+
+def map_files(function, paths):
+    """[(path, result or None, exception or None)] with function run on the
+    paths concurrently, in the order given"""
+    if len(paths) <= 1:
+        futures = None
+    else:
+        pool = _get_pool()
+        futures = [pool.submit(function, path) for path in paths]
+    results = []
+    for i, path in enumerate(paths):
+        try:
+            value = futures[i].result() if futures else function(path)
+            results.append((path, value, None))
+        except Exception as e:
+            results.append((path, None, e))
+    return results
+
+
+def share_budget(sizes, budget, minimum=MIN_FILE_CHARS):
+    """Split a character budget over files of the given sizes: small files
+    get all they need, the rest share what's left evenly (water-filling).
+    A file gets at least min(size, minimum) or nothing - once the budget
+    can't cover that, the remaining (largest) files get 0 and are left out,
+    so the shares never add up to more than the budget."""
+    shares = [0] * len(sizes)
+    remaining = budget
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    for position, i in enumerate(order):
+        fair = remaining // (len(order) - position)
+        share = min(sizes[i], max(minimum, fair))
+        if share > remaining:
+            share = 0  # Over budget - omitted
+        shares[i] = share
+        remaining -= share
+    return shares
@@ -0,0 +1,168 @@
+# persistence.py
+
+import queue
+import threading
+import time
+from tracing import tracer
+
+_STOP = object()
+
+
+class PersistenceWorker:
+    """Background write-behind thread that saves messages in batches.
+
+    Messages are queued by the chat turn and written by ``write_batch`` on a
+    daemon thread, so disk latency never lands inside ``TaskTrekAgent.chat``.
+    The queue is bounded: if the disk falls far behind, ``submit`` blocks
+    instead of growing memory without limit. One worker can be shared by
+    many Memory objects by passing each one's ``write_batch`` to ``submit``.
+    """
+
+    def __init__(self, write_batch=None, max_queue=1000, batch_size=50, flush_interval=0.2):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        # Groups whose write failed, retried with the next batch and on close
+        self._failed = {}
+        self.max_retained = max_queue
+
+        # Stats for the `memory` debug command
+        self._lock = threading.Lock()
+        self.batches_written = 0
+        self.messages_written = 0
+        self.last_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.errors = 0
+        self.pending_retry = 0
+
+        self._thread = threading.Thread(target=self._run, name="memory-persistence", daemon=True)
+        self._thread.start()
+
+    def submit(self, message, write_batch=None):
+        """Queue a message for writing (blocks only if the queue is full)"""
+        if self._closed:
+            raise RuntimeError("Persistence worker is closed")
+        self._queue.put((write_batch or self.write_batch, message))
+
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        self._queue.join()
+
+    def close(self, timeout=5.0):
+        """Drain the queue and stop the worker thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def get_stats(self):
+        """Get queue depth and flush latency statistics"""
+        with self._lock:
+            avg_ms = self.total_flush_ms / self.batches_written if self.batches_written else 0.0
+            return {
+                "queue_depth": self.queue_depth(),
+                "batches_written": self.batches_written,
+                "messages_written": self.messages_written,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "avg_flush_ms": round(avg_ms, 3),
+                "max_flush_ms": round(self.max_flush_ms, 3),
+                "errors": self.errors,
+                "pending_retry": self.pending_retry
+            }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            taken = 1
+            batch = []
+            if item is _STOP:
+                stopping = True
+            else:
+                batch.append(item)
+
+            # Linger up to flush_interval so bursts land in one batch
+            deadline = time.monotonic() + self.flush_interval
+            while not stopping and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                self._write(batch)
+            for _ in range(taken):
+                self._queue.task_done()
+
+        # Anything submitted right before close still gets written
+        leftovers = []
+        taken = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            taken += 1
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers or self._failed:
+            self._write(leftovers)
+        if self._failed:
+            print(f"Warning: {self.pending_retry} message(s) could not be saved")
+        for _ in range(taken):
+            self._queue.task_done()
+
+    def _write(self, batch):
+        # Group by destination, keeping each destination's messages in order.
+        # Messages from a group that failed earlier go first, so a retry
+        # never reorders a session's journal.
+        groups = {}
+        for write_batch, messages in self._failed.items():
+            groups[write_batch] = list(messages)
+        self._failed = {}
+        for write_batch, message in batch:
+            groups.setdefault(write_batch, []).append(message)
+
+        start = time.perf_counter()
+        written = 0
+        for write_batch, messages in groups.items():
+            try:
+                write_batch(messages)
+            except Exception as e:
+                # Don't crash the program or drop other sessions' messages if
+                # one save fails - keep this group for the next batch or close
+                with self._lock:
+                    self.errors += 1
+                if len(messages) > self.max_retained:
+                    print(f"Warning: Dropping {len(messages) - self.max_retained} unsaved message(s)")
+                    messages = messages[-self.max_retained:]
+                self._failed[write_batch] = messages
+                print(f"Warning: Failed to auto-save {len(messages)} message(s), will retry: {e}")
+                continue
+            written += len(messages)
+        end = time.perf_counter()
+        with self._lock:
+            self.pending_retry = sum(len(m) for m in self._failed.values())
+        if not written:
+            return
+        elapsed_ms = (end - start) * 1000
+        tracer.add_span("memory.persist", start, end, messages=written)
+        with self._lock:
+            self.batches_written += 1
+            self.messages_written += written
+            self.last_flush_ms = elapsed_ms
+            self.total_flush_ms += elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
@@ -1,8 +1,18 @@
 # planner.py
 import json
+import re
 from datetime import datetime
 from typing import List, Dict, Optional
-from tools import function_defs
+import tools  # Registers the built-in tools
+from registry import registry
+
+# "all the files", "each file", "every .py file", "these 5 files" ...
+_MANY_FILES = re.compile(
+    r"\b(all|each|every|these|those|multiple|several|\d+)\b(\s+\S+){0,3}?\s+files?\b", re.IGNORECASE
+)
+
+# Batch tools the planner prefers over one step per file
+BATCH_TOOLS = {"read_file": "read_files", "file_info": "file_info_many"}
 
 class SmartTaskPlanner:
     def __init__(self, agent):
@@ -17,15 +27,12 @@ class SmartTaskPlanner:
         self.planning_history = []
     
     def get_available_tools(self) -> List[str]:
-        """Dynamically extract tools from function_defs"""
-        return [
-            f"{tool_def['function']['name']} - {tool_def['function']['description']}"
-            for tool_def in function_defs
-        ]
+        """Tool catalog from the registry (built once, not rescanned per call)"""
+        return registry.catalog()
     
     def get_tool_names(self) -> List[str]:
         """Get just the tool names for validation"""
-        return [tool_def["function"]["name"] for tool_def in function_defs]
+        return registry.names()
     
     def should_create_plan(self, user_request: str) -> bool:
         """Hybrid approach: LLM decision with heuristic fallback"""
@@ -148,7 +155,7 @@ Rules:
 - Keep descriptions clear and actionable
 - Aim for 2-6 steps maximum
 - Each step should build logically on previous steps
-- Focus on the essential steps only
+- Focus on the essential steps only{self._batch_rule(user_request)}
 
 Return ONLY the JSON, no other text."""
 
@@ -181,6 +188,17 @@ Return ONLY the JSON, no other text."""
             print(f"[PLANNER] Planning failed: {e}")
             return None
     
+    def _batch_rule(self, user_request: str) -> str:
+        """Extra planning rule for requests about many files"""
+        if not _MANY_FILES.search(user_request):
+            return ""
+        names = self.get_tool_names()
+        available = [batch for batch in BATCH_TOOLS.values() if batch in names]
+        if not available:
+            return ""
+        return (f"\n- This request covers many files: read or inspect them in ONE step with "
+                f"{' / '.join(available)} (a list of paths or a glob like '*.py'), never one step per file")
+    
     def _validate_plan(self, plan: Dict) -> bool:
         """Validate plan structure and tool names"""
         # Check required keys
@@ -0,0 +1,144 @@
+# prefetch.py
+
+import json
+import os
+import re
+import threading
+import time
+from registry import registry
+
+_URL = re.compile(r"https?://[^\s<>\"'`)\]]+")
+_WEATHER = re.compile(
+    r"\b(?:weather|temperature|forecast)\b(?:\s+(?:like|forecast|today|now|currently))*"
+    r"\s+(?:in|for|at)\s+([a-z][\w .'-]*?)"
+    r"(?=\s*(?:[?.!,;]|$|\b(?:today|now|tomorrow|tonight|right now|this|currently|please)\b))",
+    re.IGNORECASE
+)
+_PATH = re.compile(r"(?<![\w/:.~-])((?:~|\.{1,2})?/?[\w.-]+(?:/[\w.-]+)*\.\w{1,10}|(?:~|\.{1,2})?/[\w.-]+(?:/[\w.-]+)+)")
+_INFO_WORDS = re.compile(r"\b(size|big|large|info|information|modified|created|type|metadata|details)\b", re.IGNORECASE)
+_TRAILING = ".,;:!?"
+
+
+def detect_tool_calls(user_input, max_calls=4):
+    """Tool calls a prompt will very likely need: pasted URLs -> url_content,
+    "weather in X" -> get_weather, existing file paths -> read_file / file_info"""
+    calls = []
+    for url in _URL.findall(user_input):
+        calls.append(("url_content", {"url": url.rstrip(_TRAILING)}))
+    for city in _WEATHER.findall(user_input):
+        city = city.strip(" '-")
+        if city:
+            calls.append(("get_weather", {"city": city}))
+    file_tool = "file_info" if _INFO_WORDS.search(user_input) else "read_file"
+    without_urls = _URL.sub(" ", user_input)
+    for path in _PATH.findall(without_urls):
+        path = path.rstrip(_TRAILING)
+        if os.path.isfile(os.path.expanduser(path)):
+            calls.append((file_tool, {"filename": path}))
+
+    unique = {}
+    for name, args in calls:
+        spec = registry.get(name)
+        if spec is not None and spec.side_effect_free:
+            unique.setdefault(match_key(name, args), (name, args))
+    return list(unique.values())[:max_calls]
+
+
+def match_key(name, args):
+    """Identity used to match a prefetch with the model's later call, forgiving
+    differences the tool itself ignores (case of a city, ./ in a path)"""
+    args = dict(args)
+    if name == "get_weather" and isinstance(args.get("city"), str):
+        args["city"] = " ".join(args["city"].lower().split())
+    elif name in ("read_file", "file_info") and isinstance(args.get("filename"), str):
+        args["filename"] = os.path.normpath(os.path.expanduser(args["filename"]))
+    elif name == "url_content" and isinstance(args.get("url"), str):
+        args["url"] = args["url"].strip().rstrip(_TRAILING)
+    return (name, json.dumps(args, sort_keys=True))
+
+
+class PrefetchTurn:
+    """Prefetched tool calls for one user turn"""
+
+    def __init__(self, prefetcher):
+        self.prefetcher = prefetcher
+        self.pending = {}  # match_key -> (future, started)
+
+    def claim(self, tool_call):
+        """Future already running for this call, or None"""
+        if not self.pending:
+            return None
+        raw = tool_call["function"].get("arguments") or "{}"
+        try:
+            args = json.loads(raw) if isinstance(raw, str) else raw
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(args, dict):
+            return None
+        entry = self.pending.pop(match_key(tool_call["function"]["name"], args), None)
+        if entry is None:
+            return None
+        future, started = entry
+        self.prefetcher._record_use(future, time.perf_counter() - started)
+        return future
+
+    def finish(self):
+        """Cancel prefetches the model never asked for"""
+        for future, _ in self.pending.values():
+            self.prefetcher._record_unused(future.cancel())
+        self.pending.clear()
+
+
+class Prefetcher:
+    """Speculatively starts obvious tool calls while the first Groq request
+    is in flight.
+
+    Calls come from detect_tool_calls and run on the agent's ToolExecutor
+    (same limits and spans as real calls). When the model then asks for
+    the same call, the executor takes the already-running future instead of
+    starting the tool again; cacheable tools also warm the tool cache.
+    Unclaimed prefetches are cancelled at the end of the turn - ones
+    already running finish in the background.
+    """
+
+    def __init__(self, executor, enabled=True, max_calls=4):
+        self.executor = executor
+        self.enabled = enabled
+        self.max_calls = max_calls
+        self._lock = threading.Lock()
+        self.stats = {"started": 0, "used": 0, "cancelled": 0, "wasted": 0, "saved_s": 0.0}
+
+    def start(self, user_input):
+        turn = PrefetchTurn(self)
+        if not self.enabled:
+            return turn
+        for name, args in detect_tool_calls(user_input, self.max_calls):
+            tool_call = {"function": {"name": name, "arguments": json.dumps(args)}}
+            future = self.executor.submit(tool_call)
+            turn.pending[match_key(name, args)] = (future, time.perf_counter())
+            print(f"[TOOL] Prefetching {name}({json.dumps(args)})")
+        with self._lock:
+            self.stats["started"] += len(turn.pending)
+        return turn
+
+    def get_stats(self):
+        with self._lock:
+            started = self.stats["started"]
+            return dict(
+                self.stats,
+                saved_s=round(self.stats["saved_s"], 2),
+                hit_rate=f"{self.stats['used'] / started * 100:.1f}%" if started else "0%"
+            )
+
+    def _record_use(self, future, age):
+        # Time saved = how far the tool got before the model asked for it
+        saved = age
+        if future.done() and future.exception() is None:
+            saved = min(age, future.result()[1])
+        with self._lock:
+            self.stats["used"] += 1
+            self.stats["saved_s"] += saved
+
+    def _record_unused(self, cancelled):
+        with self._lock:
+            self.stats["cancelled" if cancelled else "wasted"] += 1
@@ -0,0 +1,282 @@
+# ratelimit.py
+
+from collections import deque
+import contextlib
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from tracing import tracer
+
+try:
+    import fcntl
+except ImportError:  # Windows - cross-process sharing isn't available
+    fcntl = None
+
+# Tokens set aside for the reply when estimating a request's cost
+COMPLETION_RESERVE = 512
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 per second up to capacity"""
+
+    def __init__(self, per_minute, capacity=None):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = float(self.capacity)
+        self.updated = time.time()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount):
+        """Seconds until amount is available (0 if it is now)"""
+        amount = min(amount, self.capacity)  # Oversized requests wait for a full bucket
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Client-side request and token budget for one API, shared by every agent.
+
+    Each request waits for one unit from the requests-per-minute bucket and
+    its estimated tokens from the tokens-per-minute bucket. Waiters are
+    served by priority (lower first), FIFO within a priority. With
+    state_file set the bucket levels live in that file under an exclusive
+    lock, so several processes (e.g. parallel batch runs) share one budget.
+    """
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=12000, state_file=None, poll_interval=0.05):
+        self.buckets = {}
+        if requests_per_minute:
+            self.buckets["requests"] = TokenBucket(requests_per_minute)
+        if tokens_per_minute:
+            self.buckets["tokens"] = TokenBucket(tokens_per_minute)
+        self.state_file = state_file if fcntl is not None else None
+        self.poll_interval = poll_interval
+        self._queue = []           # Heap of (priority, seq) tickets
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._waits = deque(maxlen=1000)
+        self.requests = 0
+        self.throttled = 0
+
+    @property
+    def enabled(self):
+        return bool(self.buckets)
+
+    @property
+    def limits_tokens(self):
+        """False when there's no token budget, so callers can skip estimating"""
+        return "tokens" in self.buckets
+
+    def acquire(self, tokens=0, priority=0):
+        """Block until the request may be sent; returns seconds waited"""
+        if not self.enabled:
+            return 0.0
+        start = time.perf_counter()
+        with self._cond:
+            ticket = self._enqueue(priority)
+            try:
+                while True:
+                    wait = self._try_take(ticket, tokens)
+                    if wait == 0:
+                        break
+                    self._cond.wait(wait)
+            except BaseException:
+                # Interrupted (e.g. Ctrl-C) - a stale ticket would block everyone behind it
+                self._drop(ticket)
+                raise
+        return self._record_wait(start)
+
+    async def acquire_async(self, tokens=0, priority=0):
+        """acquire() for coroutines - sleeps on the event loop instead of a thread"""
+        import asyncio  # Kept off the sync startup path
+        if not self.enabled:
+            return 0.0
+        start = time.perf_counter()
+        with self._cond:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait = await self._off_loop(self._poll, ticket, tokens)
+                if wait == 0:
+                    break
+                await asyncio.sleep(wait)
+        except BaseException:  # Cancelled, or the loop is being torn down
+            with self._cond:
+                self._drop(ticket)
+            raise
+        return self._record_wait(start)
+
+    def settle(self, estimated, actual):
+        """Correct the token bucket once the API reports what a request really used"""
+        if not actual or "tokens" not in self.buckets:
+            return
+        with self._cond, self._state() as buckets:
+            bucket = buckets["tokens"]
+            bucket.level = min(bucket.capacity, bucket.level + estimated - actual)
+            self._cond.notify_all()
+
+    async def settle_async(self, estimated, actual):
+        """settle() for coroutines"""
+        await self._off_loop(self.settle, estimated, actual)
+
+    def observe_headers(self, headers):
+        """Lower our levels to the server's x-ratelimit-remaining-* if it has less left"""
+        remaining = {
+            name: headers.get(f"x-ratelimit-remaining-{name}")
+            for name in ("requests", "tokens")
+        }
+        remaining = {name: value for name, value in remaining.items() if value and name in self.buckets}
+        if not remaining:
+            return
+        with self._cond, self._state() as buckets:
+            for name, value in remaining.items():
+                try:
+                    buckets[name].level = min(buckets[name].level, float(value))
+                except ValueError:
+                    pass
+
+    async def observe_headers_async(self, headers):
+        """observe_headers() for coroutines"""
+        await self._off_loop(self.observe_headers, headers)
+
+    def current_wait(self, tokens=0):
+        """Estimated seconds a new request would queue right now"""
+        if not self.enabled:
+            return 0.0
+        with self._cond, self._state() as buckets:
+            ahead = len(self._queue) + 1
+            needs = {"requests": ahead, "tokens": tokens * ahead}
+            return round(max(bucket.wait_for(needs[name]) for name, bucket in buckets.items()), 3)
+
+    def get_stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            stats = {
+                "queue_depth": len(self._queue),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "avg_wait_s": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "max_wait_s": round(waits[-1], 3) if waits else 0.0,
+                "shared_file": self.state_file
+            }
+        stats["current_wait_s"] = self.current_wait()
+        with self._cond, self._state() as buckets:
+            for name, bucket in buckets.items():
+                stats[f"{name}_available"] = f"{bucket.level:.0f}/{bucket.capacity}"
+        return stats
+
+    def _enqueue(self, priority):
+        ticket = (priority, next(self._seq))
+        heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _drop(self, ticket):
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            self._cond.notify_all()
+
+    async def _off_loop(self, func, *args):
+        """Run func on a thread when it touches the shared state file: that
+        takes a blocking flock, which would stall every coroutine while
+        another process holds it"""
+        if self.state_file is None:
+            return func(*args)
+        import asyncio
+        return await asyncio.to_thread(func, *args)
+
+    def _poll(self, ticket, tokens):
+        with self._cond:
+            return self._try_take(ticket, tokens)
+
+    def _try_take(self, ticket, tokens):
+        """Take capacity if ticket is first in line; else seconds to wait (cond held)"""
+        if self._queue[0] != ticket:
+            return self.poll_interval
+        needs = {"requests": 1, "tokens": tokens}
+        with self._state() as buckets:
+            wait = max(bucket.wait_for(needs[name]) for name, bucket in buckets.items())
+            if wait == 0:
+                for name, bucket in buckets.items():
+                    bucket.take(needs[name])
+        if wait:
+            return max(wait, 0.001)
+        heapq.heappop(self._queue)
+        self._cond.notify_all()
+        return 0
+
+    def _record_wait(self, start):
+        waited = time.perf_counter() - start
+        with self._cond:
+            self.requests += 1
+            if waited >= 0.01:
+                self.throttled += 1
+            self._waits.append(waited)
+        if waited >= 0.01:
+            tracer.add_span("ratelimit.wait", start, start + waited)
+        return waited
+
+    @contextlib.contextmanager
+    def _state(self):
+        """Refilled buckets; read from / written back to state_file when shared"""
+        now = time.time()
+        if self.state_file is None:
+            for bucket in self.buckets.values():
+                bucket.refill(now)
+            yield self.buckets
+            return
+
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.state_file, 'a+', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                saved = json.loads(f.read() or "{}")
+            except json.JSONDecodeError:
+                saved = {}
+            for name, bucket in self.buckets.items():
+                if name in saved:
+                    bucket.level, bucket.updated = saved[name]
+                bucket.refill(now)
+            yield self.buckets
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps({name: [bucket.level, bucket.updated] for name, bucket in self.buckets.items()}))
+            f.flush()
+
+
+def estimate_request_tokens(messages, history_tokens=0, tools_tokens=0, reserve=COMPLETION_RESERVE):
+    """Prompt + reply tokens a chat request will likely use.
+
+    history_tokens is Memory.context_tokens for messages that came from
+    Memory.get_history (already counted there); messages are the ones the
+    turn added on top - the user message, tool calls and tool results.
+    """
+    from tokenizer import MESSAGE_OVERHEAD, count_message_tokens
+    tokens = history_tokens + tools_tokens + reserve
+    for message in messages:
+        content = message.get("content") or ""
+        if message.get("tool_calls"):
+            content += json.dumps(message["tool_calls"])
+        tokens += count_message_tokens(message["role"], content) if content else MESSAGE_OVERHEAD
+    return tokens
+
+
+# Process-wide Groq limiter. TASKTREK_GROQ_RPM / TASKTREK_GROQ_TPM set the
+# budget (0 disables a limit); TASKTREK_RATE_LIMIT_FILE shares it across processes.
+groq_limiter = RateLimiter(
+    requests_per_minute=int(os.getenv("TASKTREK_GROQ_RPM", "30")),
+    tokens_per_minute=int(os.getenv("TASKTREK_GROQ_TPM", "12000")),
+    state_file=os.getenv("TASKTREK_RATE_LIMIT_FILE") or None
+)
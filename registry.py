@@ -0,0 +1,214 @@
+# registry.py
+
+import importlib
+import inspect
+import json
+import threading
+import typing
+
+# Python annotation -> JSON schema type
+_JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    dict: "object"
+}
+
+_TYPE_CHECKS = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict)
+}
+
+
+class ToolSpec:
+    """Everything the agent needs to know about one tool"""
+
+    def __init__(self, name, description, parameters, func=None, module=None,
+                 cache=None, side_effect_free=True, max_concurrency=None, timeout=None,
+                 time_sensitive=False):
+        self.name = name
+        self.description = description
+        self.parameters = parameters      # JSON schema "parameters" object
+        self.func = func                  # None until a lazy plug-in is loaded
+        self.module = module              # Import path for lazy plug-in tools
+        self.async_func = None            # Optional native coroutine version
+        self.cache = cache                # None, "ttl" (registry caches) or "http" (tool revalidates)
+        self.side_effect_free = side_effect_free
+        self.time_sensitive = time_sensitive  # Result depends on when it runs - never cache replies using it
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.schema = {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": description,
+                "parameters": parameters
+            }
+        }
+
+    @property
+    def cacheable(self):
+        return self.cache is not None
+
+    def resolve(self):
+        """Import a lazy plug-in tool on first use"""
+        if self.func is None:
+            module = importlib.import_module(self.module)
+            self.func = getattr(module, self.name)
+        return self.func
+
+
+class ToolRegistry:
+    """Decorator-based tool registry.
+
+    Schemas, the dispatch table, argument validation and the planner's tool
+    catalog are built once as tools register, so dispatch is a dict lookup.
+    """
+
+    def __init__(self):
+        self.tools = {}
+        self.function_defs = []   # Updated in place - safe to import by name
+        self._catalog = None
+        self._lock = threading.Lock()
+
+    def tool(self, description, params=None, name=None, cache=None, side_effect_free=True,
+             max_concurrency=None, timeout=None, time_sensitive=False):
+        """Register a function as a tool; its schema comes from its signature.
+
+        params maps argument names to their descriptions.
+        """
+        def decorator(func):
+            tool_name = name or func.__name__
+            parameters = build_parameters(func, params or {})
+            spec = ToolSpec(
+                tool_name, description, parameters, func=func, cache=cache,
+                side_effect_free=side_effect_free, max_concurrency=max_concurrency, timeout=timeout,
+                time_sensitive=time_sensitive
+            )
+            if cache == "ttl":
+                from cache import cached_tool
+                spec.func = cached_tool(tool_name)(func)
+            self._add(spec)
+            return func
+        return decorator
+
+    def lazy_tool(self, module, name, description, parameters, **metadata):
+        """Register a plug-in tool whose module is only imported when first called"""
+        self._add(ToolSpec(name, description, parameters, module=module, **metadata))
+
+    def async_impl(self, name):
+        """Attach a native coroutine implementation to an already registered tool"""
+        def decorator(coroutine):
+            spec = self.tools[name]
+            spec.async_func = coroutine
+            if spec.cache == "ttl":
+                from cache import cached_tool
+                spec.async_func = cached_tool(name)(coroutine)
+            return coroutine
+        return decorator
+
+    def get(self, name):
+        return self.tools.get(name)
+
+    def names(self):
+        return list(self.tools)
+
+    def catalog(self):
+        """'name - description' lines for the planner (built once)"""
+        if self._catalog is None:
+            self._catalog = [f"{spec.name} - {spec.description}" for spec in self.tools.values()]
+        return self._catalog
+
+    def parse_call(self, tool_call):
+        """Look up and validate a tool call; returns (spec, args) or (None, error)"""
+        name = tool_call["function"]["name"]
+        spec = self.tools.get(name)
+        if spec is None:
+            return None, f"Unknown tool: {name}"
+
+        raw = tool_call["function"].get("arguments") or "{}"
+        try:
+            args = json.loads(raw) if isinstance(raw, str) else raw
+        except json.JSONDecodeError as e:
+            return None, f"Error: invalid JSON arguments for {name}: {e}"
+        if args is None:
+            args = {}
+
+        error = validate_arguments(spec.parameters, args)
+        if error:
+            return None, f"Error: invalid arguments for {name}: {error}"
+        # Models sometimes add extra arguments - drop them rather than fail
+        properties = spec.parameters.get("properties", {})
+        return spec, {key: value for key, value in args.items() if key in properties}
+
+    def dispatch(self, tool_call):
+        """Run a tool call: O(1) lookup, validation, then the tool itself"""
+        spec, args = self.parse_call(tool_call)
+        if spec is None:
+            return args
+        return spec.resolve()(**args)
+
+    def _add(self, spec):
+        with self._lock:
+            if spec.name in self.tools:
+                self.function_defs.remove(self.tools[spec.name].schema)
+            self.tools[spec.name] = spec
+            self.function_defs.append(spec.schema)
+            self._catalog = None
+
+
+def build_parameters(func, descriptions):
+    """JSON schema 'parameters' object from a function signature"""
+    properties = {}
+    required = []
+    for param in inspect.signature(func).parameters.values():
+        prop = json_type(param.annotation)
+        if param.name in descriptions:
+            prop["description"] = descriptions[param.name]
+        if param.default is inspect.Parameter.empty:
+            required.append(param.name)
+        elif param.default is not None:
+            prop["default"] = param.default
+        properties[param.name] = prop
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def json_type(annotation):
+    """JSON schema for an annotation; list[str] becomes an array of strings"""
+    if typing.get_origin(annotation) is list:
+        item_args = typing.get_args(annotation)
+        item = json_type(item_args[0]) if item_args else {"type": "string"}
+        return {"type": "array", "items": item}
+    return {"type": _JSON_TYPES.get(annotation, "string")}
+
+
+def validate_arguments(parameters, args):
+    """Return an error message if args don't match the schema, else None"""
+    if not isinstance(args, dict):
+        return "arguments must be a JSON object"
+    properties = parameters.get("properties", {})
+    missing = [key for key in parameters.get("required", []) if key not in args]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    for key, value in args.items():
+        expected = properties.get(key, {}).get("type")
+        check = _TYPE_CHECKS.get(expected)
+        if check and not check(value):
+            article = "an" if expected[0] in "aeiou" else "a"
+            return f"{key} must be {article} {expected}"
+        item_type = properties.get(key, {}).get("items", {}).get("type")
+        item_check = _TYPE_CHECKS.get(item_type)
+        if item_check and expected == "array" and not all(item_check(item) for item in value):
+            return f"{key} must be an array of {item_type}s"
+    return None
+
+
+# Process-wide registry used by tools.py, the agents and the planner
+registry = ToolRegistry()
+tool = registry.tool
@@ -0,0 +1,217 @@
+# response_cache.py
+
+from collections import Counter, OrderedDict
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_TRAILING_PUNCTUATION = " ?!.,;:"
+
+
+def normalize_prompt(text):
+    """Case, whitespace and trailing-punctuation insensitive form of a prompt"""
+    return " ".join(str(text).lower().split()).rstrip(_TRAILING_PUNCTUATION)
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _cosine(a, norm_a, b, norm_b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(count * b.get(gram, 0) for gram, count in a.items()) / (norm_a * norm_b)
+
+
+class ResponseCache:
+    """Opt-in LRU cache of Groq replies keyed on the request's context.
+
+    The key hashes the model, tool schema version, tool_choice, system
+    prompt and the last context_messages messages (prompts normalized with
+    normalize_prompt), so an exact repeat is one dict lookup. With
+    similarity set (0-1), a new user prompt may also reuse the reply to an
+    earlier prompt with the same preceding context whose character-trigram
+    cosine similarity reaches that threshold and which mentions the same
+    numbers. Requests whose context or reply calls a time-sensitive tool
+    are never cached.
+    """
+
+    def __init__(self, enabled=False, max_entries=512, ttl=3600, similarity=None, context_messages=6):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity or None
+        self.context_messages = context_messages
+        self._entries = OrderedDict()  # key -> entry, least recently used first
+        self._by_prefix = {}           # prefix hash -> {key: (trigrams, norm, numbers)}
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0, "similar_hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evictions": 0,
+            "saved_latency_s": 0.0, "saved_tokens": 0
+        }
+
+    def get(self, payload):
+        """Cached assistant message for a chat payload, or None"""
+        if not self.enabled:
+            return None
+        request = self._request_key(payload)
+        with self._lock:
+            if request is None:
+                self.stats["bypassed"] += 1
+                return None
+            prefix, prompt, key = request
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires"] <= time.time():
+                self._remove(key)
+                entry = None
+            kind = "hits"
+            if entry is None and self.similarity and prompt is not None:
+                key = self._find_similar(prefix, prompt)
+                entry = self._entries.get(key) if key else None
+                kind = "similar_hits"
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats[kind] += 1
+            self.stats["saved_latency_s"] += entry["latency"]
+            self.stats["saved_tokens"] += entry["tokens"]
+            return json.loads(entry["message"])
+
+    def put(self, payload, message, latency, usage=None):
+        """Store the reply to payload (latency in seconds, usage as reported)"""
+        if not self.enabled or _calls_time_sensitive(message):
+            return
+        request = self._request_key(payload)
+        if request is None:
+            return
+        prefix, prompt, key = request
+        entry = {
+            "message": json.dumps(message),
+            "expires": time.time() + self.ttl,
+            "latency": latency,
+            "tokens": (usage or {}).get("total_tokens") or 0,
+            "prefix": prefix
+        }
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            if self.similarity and prompt is not None:
+                vector = _trigrams(prompt)
+                norm = math.sqrt(sum(count * count for count in vector.values()))
+                self._by_prefix.setdefault(prefix, {})[key] = (vector, norm, _NUMBER.findall(prompt))
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_prefix.clear()
+
+    def get_stats(self):
+        with self._lock:
+            hits = self.stats["hits"] + self.stats["similar_hits"]
+            lookups = hits + self.stats["misses"]
+            return dict(
+                self.stats,
+                saved_latency_s=round(self.stats["saved_latency_s"], 2),
+                enabled=self.enabled,
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                hit_rate=f"{hits / lookups * 100:.1f}%" if lookups else "0%"
+            )
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            similar = self._by_prefix.get(entry["prefix"])
+            if similar is not None:
+                similar.pop(key, None)
+                if not similar:
+                    del self._by_prefix[entry["prefix"]]
+
+    def _find_similar(self, prefix, prompt):
+        candidates = self._by_prefix.get(prefix)
+        if not candidates:
+            return None
+        vector = _trigrams(prompt)
+        norm = math.sqrt(sum(count * count for count in vector.values()))
+        numbers = _NUMBER.findall(prompt)
+        best_key, best_score = None, self.similarity
+        for key, (other, other_norm, other_numbers) in candidates.items():
+            if other_numbers != numbers:
+                continue  # "2+2" must never answer "2+3"
+            score = _cosine(vector, norm, other, other_norm)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def _schema_version(self, tools):
+        # Hashed on every request: the schemas are small, and an edited
+        # description or parameter must change the key even when the number
+        # of tools stays the same
+        return hashlib.blake2b(json.dumps(tools, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+    def _request_key(self, payload):
+        """(prefix hash, normalized last user prompt or None, key), or None to bypass"""
+        messages = payload["messages"]
+        system = [m["content"] for m in messages[:1] if m["role"] == "system"]
+        recent = messages[len(system):][-self.context_messages:]
+        if any(_calls_time_sensitive(m) for m in recent):
+            return None
+        tools = payload.get("tools")
+        context = [
+            payload.get("model"),
+            self._schema_version(tools) if tools else None,
+            payload.get("tool_choice"),
+            system
+        ]
+        for message in recent[:-1]:
+            context.append(_message_key(message))
+        prefix = hashlib.blake2b(json.dumps(context).encode(), digest_size=16).hexdigest()
+
+        last = recent[-1] if recent else {"role": None}
+        prompt = normalize_prompt(last.get("content") or "") if last["role"] == "user" else None
+        last_key = json.dumps(prompt if prompt is not None else _message_key(last))
+        key = hashlib.blake2b((prefix + last_key).encode(), digest_size=16).hexdigest()
+        return prefix, prompt, key
+
+
+def _message_key(message):
+    content = message.get("content") or ""
+    if message["role"] == "user":
+        content = normalize_prompt(content)
+    calls = [
+        (call["function"]["name"], call["function"].get("arguments"))
+        for call in message.get("tool_calls") or []
+    ]
+    return [message["role"], content, calls]
+
+
+def _calls_time_sensitive(message):
+    """True if an assistant message calls a tool whose result depends on when it runs"""
+    from registry import registry
+    for call in message.get("tool_calls") or []:
+        spec = registry.get(call["function"]["name"])
+        if spec is not None and spec.time_sensitive:
+            return True
+    return False
+
+
+# Process-wide response cache, off unless TASKTREK_RESPONSE_CACHE=1.
+# TASKTREK_RESPONSE_CACHE_SIMILARITY=0.9 also serves near-duplicate prompts.
+response_cache = ResponseCache(
+    enabled=os.getenv("TASKTREK_RESPONSE_CACHE", "").lower() in ("1", "true", "yes", "on"),
+    max_entries=int(os.getenv("TASKTREK_RESPONSE_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("TASKTREK_RESPONSE_CACHE_TTL", "3600")),
+    similarity=float(os.getenv("TASKTREK_RESPONSE_CACHE_SIMILARITY", "0")) or None,
+    context_messages=int(os.getenv("TASKTREK_RESPONSE_CACHE_CONTEXT", "6"))
+)
@@ -0,0 +1,242 @@
+# retry.py
+
+from email.utils import parsedate_to_datetime
+import random
+import re
+import threading
+import time
+from tracing import tracer
+
+# Error classes and whether they're worth retrying
+RETRYABLE = {"rate_limit", "server", "timeout", "connection"}
+
+# Exception class names (requests / httpx / builtins) that mean the network failed
+_CONNECTION_WORDS = ("connect", "network", "protocol", "chunked", "readerror", "writeerror", "disconnected")
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the API while the circuit breaker is open"""
+
+
+def classify(response=None, error=None):
+    """Sort a failed call into rate_limit / server / timeout / connection / client"""
+    if error is not None:
+        name = type(error).__name__.lower()
+        module = type(error).__module__
+        if "timeout" in name:
+            return "timeout"
+        if any(word in name for word in _CONNECTION_WORDS) or module.startswith(("socket", "ssl")):
+            return "connection"
+        return "client"
+    status = response.status_code
+    if status == 429:
+        return "rate_limit"
+    if status in (408, 425):
+        return "timeout"
+    if status >= 500:
+        return "server"
+    return "client"
+
+
+def parse_duration(value):
+    """Seconds from Groq's rate-limit reset format ("2m59.56s", "7.66s", "250ms")"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNIT_SECONDS[unit] for amount, unit in parts)
+
+
+def server_delay(headers):
+    """Seconds the server asked us to wait (Retry-After or rate-limit reset), if any"""
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        seconds = parse_duration(retry_after)
+        if seconds is None:
+            try:
+                seconds = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                seconds = None
+        if seconds is not None:
+            return max(0.0, seconds)
+    resets = [
+        parse_duration(headers.get(name))
+        for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+    ]
+    resets = [seconds for seconds in resets if seconds is not None]
+    return max(resets) if resets else None
+
+
+class RetryPolicy:
+    """How many times and how long to wait before retrying one HTTP call.
+
+    Backoff is exponential with full jitter (uniform in [0, base * 2**n],
+    capped at max_delay). A server-supplied Retry-After / rate-limit reset
+    wins over the backoff; if it asks for more than max_server_delay we
+    give up instead of blocking the user that long.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=20.0, max_server_delay=60.0,
+                 retry_on=RETRYABLE):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_server_delay = max_server_delay
+        self.retry_on = set(retry_on)
+
+    def backoff(self, attempt):
+        """Jittered delay before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def next_delay(self, attempt, category, response=None):
+        """Seconds to wait before the next attempt, or None to stop retrying"""
+        if category not in self.retry_on or attempt >= self.max_attempts:
+            return None
+        requested = server_delay(response.headers) if response is not None else None
+        if requested is None:
+            return self.backoff(attempt)
+        if requested > self.max_server_delay:
+            return None
+        return requested + random.uniform(0, self.base_delay)  # Don't all wake at once
+
+
+class CircuitBreaker:
+    """Fail fast while an API is down.
+
+    After failure_threshold consecutive server/timeout/connection failures
+    the circuit opens and calls raise CircuitOpenError for reset_timeout
+    seconds. Then one trial call is let through (half-open): success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(f"{self.name} unavailable - failing fast for another {remaining:.0f}s")
+                self.state = "half_open"
+                self._trial_running = False
+            if self.state == "half_open":
+                if self._trial_running:
+                    raise CircuitOpenError(f"{self.name} unavailable - waiting on a trial request")
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self, category):
+        with self._lock:
+            self._trial_running = False
+            if category in ("rate_limit", "client"):
+                # The service answered - it isn't down
+                self.failures = 0
+                if self.state == "half_open":
+                    self.state = "closed"
+                return
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened
+            }
+
+
+def _attempt_failed(policy, breaker, attempt, response=None, error=None):
+    """Record a failed attempt; returns (category, delay or None)"""
+    category = classify(response, error)
+    if breaker is not None:
+        breaker.record_failure(category)
+    delay = policy.next_delay(attempt, category, response)
+    if delay is not None:
+        status = response.status_code if response is not None else type(error).__name__
+        print(f"[LLM] {category} error ({status}) - retry {attempt}/{policy.max_attempts - 1} in {delay:.1f}s")
+    return category, delay
+
+
+def call_with_retry(send, policy, breaker=None, sleep=time.sleep):
+    """Call send() (one HTTP request) until it returns a 2xx response.
+
+    Non-retryable or exhausted failures are returned / raised to the
+    caller as-is; discarded responses are closed before retrying.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            response = send()
+        except Exception as e:
+            _, delay = _attempt_failed(policy, breaker, attempt, error=e)
+            if delay is None:
+                raise
+        else:
+            if response.status_code < 400:
+                if breaker is not None:
+                    breaker.record_success()
+                return response
+            _, delay = _attempt_failed(policy, breaker, attempt, response=response)
+            if delay is None:
+                return response
+            response.close()
+        with tracer.span("retry.wait", attempt=attempt):
+            sleep(delay)
+
+
+async def async_call_with_retry(send, policy, breaker=None):
+    """call_with_retry for a coroutine function send()"""
+    import asyncio  # Only needed by async agents
+    attempt = 0
+    while True:
+        attempt += 1
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            response = await send()
+        except Exception as e:
+            _, delay = _attempt_failed(policy, breaker, attempt, error=e)
+            if delay is None:
+                raise
+        else:
+            if response.status_code < 400:
+                if breaker is not None:
+                    breaker.record_success()
+                return response
+            _, delay = _attempt_failed(policy, breaker, attempt, response=response)
+            if delay is None:
+                return response
+            await response.aclose()
+        with tracer.span("retry.wait", attempt=attempt):
+            await asyncio.sleep(delay)
@@ -0,0 +1,206 @@
+# test_agent.py
+
+import json
+
+import pytest
+
+import agent
+from agent import TaskTrekAgent
+
+
+class FakeResponse:
+    """Stands in for a streamed requests.Response"""
+
+    def __init__(self, lines=(), status_code=200, headers=None, body=None):
+        self.lines = list(lines)
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = ""
+        self.closed = False
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+    def json(self):
+        return self.body
+
+    def close(self):
+        self.closed = True
+
+
+def sse(*events):
+    """SSE lines for chunks whose choices[0].delta is each event"""
+    lines = []
+    for event in events:
+        if isinstance(event, str):
+            lines.append(event)
+        else:
+            lines.extend([f"data: {json.dumps(event)}", ""])
+    return lines
+
+
+def delta(**fields):
+    return {"choices": [{"index": 0, "delta": fields}]}
+
+
+@pytest.fixture
+def make_agent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Session files land in a temporary conversations/
+    monkeypatch.setattr(agent, "GROQ_API_KEY", "test-key")
+    monkeypatch.setenv("TASKTREK_PREFETCH", "0")
+    agents = []
+
+    def make(**kwargs):
+        instance = TaskTrekAgent(**kwargs)
+        agents.append(instance)
+        return instance
+
+    yield make
+    for instance in agents:
+        instance.memory.close()
+
+
+def run_stream(generator):
+    """(yielded text chunks, return value) of a streaming generator"""
+    chunks = []
+    try:
+        while True:
+            chunks.append(next(generator))
+    except StopIteration as stop:
+        return chunks, stop.value
+
+
+def test_stream_stitches_fragmented_tool_calls(make_agent):
+    bot = make_agent()
+    response = FakeResponse(sse(
+        ": keep-alive",
+        delta(role="assistant", content="Let me "),
+        # Call 0 starts without its id; call 1 arrives interleaved with it
+        delta(tool_calls=[{"index": 0, "type": "function", "function": {"name": "get_"}}]),
+        delta(tool_calls=[{"index": 1, "id": "call_b", "function": {"name": "calculate", "arguments": '{"expr'}}]),
+        delta(tool_calls=[{"index": 0, "id": "call_a", "function": {"name": "weather", "arguments": '{"city":'}}]),
+        delta(content="check."),
+        delta(tool_calls=[{"index": 1, "function": {"arguments": 'ession": "2+2"}'}}]),
+        delta(tool_calls=[{"index": 0, "function": {"arguments": ' "Paris"}'}}]),
+        {"choices": [], "x_groq": {"usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}}},
+        "data: [DONE]",
+        delta(content="never read"),
+    ))
+    bot._post_groq = lambda payload, stream=False, history=None: response
+
+    chunks, message = run_stream(bot._stream_groq_with_tools([{"role": "user", "content": "hi"}]))
+
+    assert chunks == ["Let me ", "check."]
+    assert message == {
+        "role": "assistant",
+        "content": "Let me check.",
+        "tool_calls": [
+            {"id": "call_a", "type": "function",
+             "function": {"name": "get_weather", "arguments": '{"city": "Paris"}'}},
+            {"id": "call_b", "type": "function",
+             "function": {"name": "calculate", "arguments": '{"expression": "2+2"}'}},
+        ]
+    }
+    assert json.loads(message["tool_calls"][0]["function"]["arguments"]) == {"city": "Paris"}
+    assert bot._last_usage["total_tokens"] == 15
+    assert response.closed
+
+
+def test_stream_without_tool_calls(make_agent):
+    bot = make_agent()
+    response = FakeResponse(sse(delta(content="Hello"), delta(content=" world"), "data: [DONE]"))
+    bot._post_groq = lambda payload, stream=False, history=None: response
+
+    chunks, message = run_stream(bot._stream_groq_with_tools([{"role": "user", "content": "hi"}]))
+    assert chunks == ["Hello", " world"]
+    assert message == {"role": "assistant", "content": "Hello world"}
+
+
+def test_stream_error_status_closes_response(make_agent):
+    bot = make_agent()
+    response = FakeResponse(status_code=500)
+    bot._post_groq = lambda payload, stream=False, history=None: response
+
+    with pytest.raises(Exception, match="Groq API error 500"):
+        run_stream(bot._stream_groq_with_tools([{"role": "user", "content": "hi"}]))
+    assert response.closed
+
+
+class ScriptedGroq:
+    """_post_groq stand-in: reply(payload, round) -> assistant message.
+    Records a copy of every payload it was sent."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.payloads = []
+
+    def __call__(self, payload, stream=False, history=None):
+        self.payloads.append(json.loads(json.dumps(payload)))
+        message = self.reply(payload, len(self.payloads))
+        usage = {"prompt_tokens": 50, "completion_tokens": 10, "total_tokens": 60}
+        return FakeResponse(body={"choices": [{"index": 0, "message": message}], "usage": usage})
+
+
+def tool_message(*expressions):
+    return {"role": "assistant", "content": None, "tool_calls": [
+        {"type": "function", "function": {"name": "calculate", "arguments": json.dumps({"expression": e})}}
+        for e in expressions
+    ]}
+
+
+def test_tool_loop_stops_after_max_rounds(make_agent):
+    bot = make_agent(max_tool_rounds=3)
+
+    def reply(payload, round):
+        # Asks for a new calculation every round, even when tools are off
+        message = tool_message(f"{round} + 1")
+        if payload["tool_choice"] == "none":
+            message["content"] = "Final answer."
+        return message
+
+    bot._post_groq = groq = ScriptedGroq(reply)
+    response = bot.chat("keep calculating")
+
+    assert [p["tool_choice"] for p in groq.payloads] == ["auto", "auto", "auto", "none"]
+    assert bot.last_turn_stats["llm_round_trips"] == 4
+    assert bot.last_turn_stats["tool_calls"] == 3
+    assert response.startswith("[TOOL] Used 3 tool(s): calculate: 2")
+    assert response.endswith("\nFinal answer.")
+
+    # The last request carries every round's tool_calls message and tool result
+    final = groq.payloads[-1]["messages"]
+    assert [m["role"] for m in final[-6:]] == ["assistant", "tool"] * 3
+    assert [m["content"] for m in final if m["role"] == "tool"] == ["2", "3", "4"]
+    assert bot.memory.recent_history[-1]["content"] == response
+
+
+def test_tool_loop_stops_when_model_repeats_calls(make_agent):
+    bot = make_agent()
+
+    def reply(payload, round):
+        if payload["tool_choice"] == "none":
+            return {"role": "assistant", "content": "It is 4."}
+        return tool_message("2+2")
+
+    bot._post_groq = groq = ScriptedGroq(reply)
+    response = bot.chat("what is 2+2")
+
+    assert [p["tool_choice"] for p in groq.payloads] == ["auto", "auto", "none"]
+    assert bot.last_turn_stats == {
+        "llm_round_trips": 3, "tool_calls": 1, "repeated_tool_calls": 1, "tokens": 180
+    }
+    # The repeated call was answered from the first result, not run again
+    tool_results = [m for m in groq.payloads[-1]["messages"] if m["role"] == "tool"]
+    assert [m["content"] for m in tool_results] == ["4", "4"]
+    assert tool_results[0]["tool_call_id"] != tool_results[1]["tool_call_id"]
+    assert response == "[TOOL] Used 1 tool(s): calculate: 4\nIt is 4."
+
+
+def test_direct_answer_takes_one_round_trip(make_agent):
+    bot = make_agent()
+    bot._post_groq = groq = ScriptedGroq(lambda payload, round: {"role": "assistant", "content": "Hello!"})
+
+    assert bot.chat("hi") == "Hello!"
+    assert len(groq.payloads) == 1
+    assert bot.last_turn_stats["tool_calls"] == 0
@@ -0,0 +1,218 @@
+# test_async_agent.py
+
+import asyncio
+import json
+
+import pytest
+
+import async_agent
+import async_tools
+import cache
+from async_agent import AsyncTaskTrekAgent
+from async_tools import close_async_client, handle_tool_call_async
+from cache import ToolCache
+from ratelimit import RateLimiter
+from registry import ToolSpec, build_parameters, registry
+from response_cache import ResponseCache
+import tools
+
+GROQ_PATH = "/openai/v1/chat/completions"
+WEATHER = {"current_condition": [{
+    "temp_C": "20", "temp_F": "68", "humidity": "50", "weatherDesc": [{"value": "Sunny"}]
+}]}
+
+
+def call(name, arguments, call_id=None):
+    tool_call = {"type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+    if call_id:
+        tool_call["id"] = call_id
+    return tool_call
+
+
+def completion(content=None, tool_calls=None, tokens=10):
+    message = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    return {"choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": tokens, "completion_tokens": 0, "total_tokens": tokens}}
+
+
+class FakeGroq:
+    """Chat completions endpoint on the stub server answering from a script
+    (one reply per request, or a function of the request payload)"""
+
+    def __init__(self, stub_server):
+        self.replies = []
+        self.payloads = []
+        stub_server.routes[GROQ_PATH] = self
+
+    def __call__(self, request):
+        payload = json.loads(request.body)
+        self.payloads.append(payload)
+        reply = self.replies.pop(0) if self.replies else completion("done")
+        if callable(reply):
+            reply = reply(payload)
+        return 200, {"Content-Type": "application/json"}, json.dumps(reply).encode()
+
+
+@pytest.fixture
+def groq(stub_server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Session files land in a temporary conversations/
+    monkeypatch.setattr(async_agent, "load_config", lambda: "test-key")
+    monkeypatch.setattr(async_agent, "GROQ_API_URL", stub_server.url(GROQ_PATH))
+    monkeypatch.setattr(async_agent, "groq_limiter", RateLimiter(requests_per_minute=0, tokens_per_minute=0))
+    monkeypatch.setattr(async_agent, "response_cache", ResponseCache(enabled=False))
+    monkeypatch.setattr(async_agent, "_shared_persistence", None)
+    monkeypatch.setattr(tools, "WEATHER_URL", stub_server.url(""))
+    tool_cache = ToolCache()
+    for module in (cache, tools, async_tools):
+        monkeypatch.setattr(module, "tool_cache", tool_cache)
+    stub_server.routes["/Paris"] = lambda request: (
+        200, {"Content-Type": "application/json"}, json.dumps(WEATHER).encode())
+    yield FakeGroq(stub_server)
+    if async_agent._shared_persistence is not None:
+        async_agent._shared_persistence.close()
+
+
+def run(coroutine):
+    """asyncio.run that also closes the loop's pooled client"""
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await close_async_client()
+    return asyncio.run(main())
+
+
+def test_tool_loop_runs_new_calls_once_and_answers(groq, stub_server):
+    groq.replies = [
+        completion(tool_calls=[
+            call("get_weather", {"city": "Paris"}, "a"),
+            call("get_weather", {"city": "Paris"}, "b"),   # Same call - reuses the result
+            call("count_words", {"text": "one two three"}),  # No id - one is made up
+        ]),
+        completion("It is sunny in Paris."),
+    ]
+
+    async def main():
+        bot = AsyncTaskTrekAgent(storage="none")
+        return bot, await bot.chat("Weather in Paris? And count 'one two three'")
+
+    bot, answer = run(main())
+    assert answer.startswith("[TOOL] Used 2 tool(s): get_weather: Weather in Paris: Sunny")
+    assert "count_words: 3 words" in answer
+    assert answer.endswith("\nIt is sunny in Paris.")
+    assert bot.last_turn_stats == {"llm_round_trips": 2, "tool_calls": 2, "repeated_tool_calls": 1, "tokens": 20}
+    assert [path.split("?")[0] for path, _ in stub_server.requests].count("/Paris") == 1
+
+    # The second request carries the assistant's calls and one result per call id
+    messages = groq.payloads[1]["messages"]
+    results = {m["tool_call_id"]: m["content"] for m in messages if m["role"] == "tool"}
+    assert set(results) == {"a", "b", "call_1_2"}
+    assert results["a"] == results["b"]
+    assert results["call_1_2"] == "3 words"
+    assert groq.payloads[1]["tool_choice"] == "auto"
+
+
+def test_tool_rounds_are_capped(groq):
+    looping = completion(tool_calls=[call("count_words", {"text": "again"})])
+    groq.replies = [looping, completion(tool_calls=[call("count_words", {"text": "more"})]), completion("stop")]
+
+    async def main():
+        bot = AsyncTaskTrekAgent(storage="none", max_tool_rounds=2)
+        await bot.chat("loop")
+        return bot
+
+    bot = run(main())
+    assert [p["tool_choice"] for p in groq.payloads] == ["auto", "auto", "none"]
+    assert bot.last_turn_stats["llm_round_trips"] == 3
+
+
+@pytest.fixture
+def probe_tool(monkeypatch):
+    """A registered tool with max_concurrency=2 that records how many run at once"""
+    state = {"running": 0, "peak": 0}
+
+    async def probe(n: int) -> str:
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.02)
+        state["running"] -= 1
+        return f"probe {n}"
+
+    spec = ToolSpec("probe", "Test probe", build_parameters(probe, {}), func=probe, max_concurrency=2)
+    spec.async_func = probe
+    monkeypatch.setitem(registry.tools, "probe", spec)
+    return state
+
+
+def test_per_tool_concurrency_limit_is_shared_by_sessions(groq, probe_tool):
+    async def main():
+        bots = [AsyncTaskTrekAgent(storage="none") for _ in range(3)]
+        calls = [bot._run_tool(call("probe", {"n": i})) for i, bot in enumerate(bots * 2)]
+        return await asyncio.gather(*calls)
+
+    assert run(main()) == [f"probe {i}" for i in range(6)]
+    assert probe_tool["peak"] == 2
+
+
+def test_tool_limits_of_closed_loops_are_dropped(groq, probe_tool):
+    async def main():
+        bot = AsyncTaskTrekAgent(storage="none")
+        await asyncio.gather(*(bot._run_tool(call("probe", {"n": i})) for i in range(4)))
+        return asyncio.get_running_loop()
+
+    first = run(main())
+    assert first in AsyncTaskTrekAgent._tool_limits
+    second = run(main())
+    assert first not in AsyncTaskTrekAgent._tool_limits
+    assert list(AsyncTaskTrekAgent._tool_limits) == [second]
+
+
+def test_sessions_share_one_persistence_worker(groq):
+    groq.replies = [lambda payload: completion(f"echo {payload['messages'][-1]['content']}")] * 2
+
+    async def main():
+        first, second = AsyncTaskTrekAgent(), AsyncTaskTrekAgent()
+        await asyncio.gather(first.chat("hello"), second.chat("world"))
+        files = await asyncio.gather(first.aclose(), second.aclose())
+        return first, second, files
+
+    first, second, files = run(main())
+    worker = async_agent._shared_persistence
+    assert first.memory.persistence is second.memory.persistence is worker
+    assert worker.get_stats()["messages_written"] == 4
+    worker.submit({"role": "user", "content": "still open"}, write_batch=lambda batch: None)  # Not closed by aclose
+
+    saved = []
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            saved.append([(m["role"], m["content"]) for m in json.load(f)["messages"]])
+    assert sorted(saved) == [[("user", "hello"), ("assistant", "echo hello")],
+                             [("user", "world"), ("assistant", "echo world")]]
+
+
+def test_async_url_content_streams_and_caches(groq, stub_server):
+    stub_server.routes["/page"] = lambda request: (
+        200, {"Content-Type": "text/html", "Cache-Control": "max-age=60"},
+        b"<html><body><nav>Menu</nav><article>Async article text.</article></body></html>")
+    url = stub_server.url("/page")
+    tool_call = call("url_content", {"url": url})
+
+    async def main():
+        return [await handle_tool_call_async(tool_call) for _ in range(2)]
+
+    first, second = run(main())
+    assert first == f"Content from {url}: Async article text."
+    assert second == first
+    assert [path for path, _ in stub_server.requests].count("/page") == 1
+
+
+def test_async_dispatch_reports_bad_calls(groq):
+    async def main():
+        return (await handle_tool_call_async(call("nope", {})),
+                await handle_tool_call_async(call("count_words", {})))
+
+    unknown, invalid = run(main())
+    assert unknown == "Unknown tool: nope"
+    assert invalid == "Error: invalid arguments for count_words: missing text"
@@ -0,0 +1,93 @@
+# test_batch.py
+
+import asyncio
+import io
+import json
+import threading
+
+import pytest
+
+import batch
+from batch import BatchRunner, prepare_resume
+
+
+async def echo_task(self, task_id, prompt):
+    """run_task stand-in: no agent, no network"""
+    await asyncio.sleep(0)
+    return {"id": task_id, "status": "ok", "response": prompt.upper(), "tokens": 1, "tool_calls": 0}
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(BatchRunner, "run_task", echo_task)
+    monkeypatch.setattr(batch, "load_config", lambda: "test-key")
+
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_resume_from_partially_written_output(tmp_path):
+    tasks = tmp_path / "tasks.jsonl"
+    tasks.write_text("".join(json.dumps({"id": str(i), "prompt": f"task {i}"}) + "\n" for i in range(1, 6)))
+    output = tmp_path / "results.jsonl"
+    output.write_text(
+        json.dumps({"id": "1", "status": "ok", "response": "TASK 1"}) + "\n"
+        + json.dumps({"id": "2", "status": "error", "error": "timeout"}) + "\n"
+        + json.dumps({"id": "3", "status": "ok", "response": "TASK 3"}) + "\n"
+        + '{"id": "4", "status": "ok", "resp'  # Killed mid-write
+    )
+
+    assert batch.main([str(tasks), "-o", str(output), "--resume"]) == 0
+
+    results = read_results(output)
+    assert sorted(r["id"] for r in results) == ["1", "2", "3", "4", "5"]
+    assert all(r["status"] == "ok" for r in results)
+    assert {r["id"]: r["response"] for r in results}["2"] == "TASK 2"
+
+    # A second resume finds everything done and leaves the file alone
+    before = output.read_text()
+    assert prepare_resume(str(output)) == {"1", "2", "3", "4", "5"}
+    assert batch.main([str(tasks), "-o", str(output), "--resume"]) == 0
+    assert output.read_text() == before
+
+
+def test_prepare_resume_keeps_clean_file_untouched(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text(json.dumps({"id": 7, "status": "ok"}) + "\n")
+    mtime = output.stat().st_mtime_ns
+    assert prepare_resume(str(output)) == {"7"}
+    assert output.stat().st_mtime_ns == mtime
+    assert prepare_resume(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_input_is_read_off_the_event_loop():
+    first_done = threading.Event()
+
+    def slow_source():
+        yield json.dumps({"id": "a", "prompt": "first"})
+        # If this read blocked the loop, task "a" could never finish
+        assert first_done.wait(5)
+        yield json.dumps({"id": "b", "prompt": "second"})
+
+    class Output(io.StringIO):
+        def write(self, text):
+            first_done.set()
+            return super().write(text)
+
+    out = Output()
+    stats = asyncio.run(BatchRunner(workers=1, out=out).run(slow_source()))
+    assert stats["ok"] == 2
+    assert [json.loads(line)["id"] for line in out.getvalue().splitlines()] == ["a", "b"]
+
+
+def test_bad_lines_are_reported_and_skipped_ids_counted():
+    out = io.StringIO()
+    lines = ["", json.dumps({"id": "x"}), "plain text task", json.dumps({"id": "done", "prompt": "p"})]
+    stats = asyncio.run(BatchRunner(out=out).run(lines, skip_ids={"done"}))
+
+    results = {r["id"]: r for r in map(json.loads, out.getvalue().splitlines())}
+    assert results["2"]["status"] == "error" and "no prompt field" in results["2"]["error"]
+    assert results["3"]["response"] == "PLAIN TEXT TASK"
+    assert stats["skipped"] == 1
@@ -0,0 +1,156 @@
+# test_cache.py
+
+import json
+
+import pytest
+
+import cache
+from cache import ToolCache
+import tools
+from registry import registry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    """Empty two-entry cache in place of the process-wide one"""
+    tool_cache = ToolCache(max_entries=2)
+    monkeypatch.setattr(cache, "tool_cache", tool_cache)
+    monkeypatch.setattr(tools, "tool_cache", tool_cache)
+    return tool_cache
+
+
+@pytest.fixture
+def weather(stub_server, monkeypatch):
+    """get_weather against the stub server; returns the paths it requested"""
+    def respond(request):
+        data = {"current_condition": [{
+            "temp_C": "20", "temp_F": "68", "humidity": "50", "weatherDesc": [{"value": "Sunny"}]
+        }]}
+        return 200, {"Content-Type": "application/json"}, json.dumps(data).encode()
+
+    for city in ("Paris", "Rome", "Oslo"):
+        stub_server.routes[f"/{city}"] = respond
+    monkeypatch.setattr(tools, "WEATHER_URL", stub_server.url(""))
+    get_weather = registry.get("get_weather").func
+    return get_weather, lambda: [path.split("?")[0] for path, _ in stub_server.requests]
+
+
+def test_ttl_expiry(fresh_cache, clock, weather):
+    get_weather, requested = weather
+    first = get_weather("Paris")
+    assert first.startswith("Weather in Paris: Sunny")
+
+    clock.now += cache.TOOL_TTLS["get_weather"] - 1
+    assert get_weather("Paris") == first
+    assert requested() == ["/Paris"]
+
+    clock.now += 2
+    assert get_weather("Paris") == first
+    assert requested() == ["/Paris", "/Paris"]
+
+
+def test_lru_eviction(fresh_cache, clock, weather):
+    get_weather, requested = weather
+    get_weather("Paris")
+    get_weather("Rome")
+    get_weather("Paris")  # Hit - Paris is now the most recently used
+    get_weather("Oslo")   # Evicts Rome
+    assert requested() == ["/Paris", "/Rome", "/Oslo"]
+    assert fresh_cache.get_stats()["evictions"] == 1
+
+    get_weather("Paris")
+    assert requested() == ["/Paris", "/Rome", "/Oslo"]
+    get_weather("Rome")
+    assert requested() == ["/Paris", "/Rome", "/Oslo", "/Rome"]
+
+
+def test_etag_revalidation(fresh_cache, clock, stub_server):
+    bodies_sent = []
+
+    def page(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"', "Cache-Control": "max-age=60"}, b""
+        bodies_sent.append(request.path)
+        html = b"<html><head><title>Stub</title></head><body><main><p>Hello from the stub page.</p></main></body></html>"
+        return 200, {"Content-Type": "text/html", "ETag": '"v1"', "Cache-Control": "no-cache"}, html
+
+    stub_server.routes["/page"] = page
+    url = stub_server.url("/page")
+
+    first = tools.url_content(url)
+    assert "Hello from the stub page" in first
+    key = cache.cache_key("url_content", url, case_sensitive=True)
+    assert fresh_cache.get(key) is None  # no-cache: stored stale, revalidated on next use
+
+    assert tools.url_content(url) == first
+    assert stub_server.requests[-1][1].get("If-None-Match") == '"v1"'
+    assert fresh_cache.get_stats()["revalidated"] == 1
+    assert len(bodies_sent) == 1
+
+    # The 304's max-age=60 made the entry fresh again: no request at all
+    assert tools.url_content(url) == first
+    assert len(stub_server.requests) == 2
+    clock.now += 61
+    assert fresh_cache.get(key) is None
+
+
+def test_304_after_eviction_refetches_unconditionally(fresh_cache, clock, stub_server):
+    html = b"<html><body><main><p>Fresh copy of the page.</p></main></body></html>"
+
+    def page(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            fresh_cache.clear()  # Evicted while the conditional request was in flight
+            return 304, {"ETag": '"v1"'}, b""
+        return 200, {"Content-Type": "text/html", "ETag": '"v1"', "Cache-Control": "no-cache"}, html
+
+    stub_server.routes["/page"] = page
+    url = stub_server.url("/page")
+
+    first = tools.url_content(url)
+    assert "Fresh copy of the page" in first
+    assert tools.url_content(url) == first
+    headers = [request_headers for _, request_headers in stub_server.requests]
+    assert len(headers) == 3
+    assert headers[1].get("If-None-Match") == '"v1"'
+    assert "If-None-Match" not in headers[2]
+
+
+def test_disk_tier_is_bounded(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    disk_cache = ToolCache(max_entries=2, disk_path=path, max_disk_entries=3)
+    for name in ("a", "b", "c"):
+        disk_cache.set(name, name.upper(), 60)
+        clock.now += 1
+
+    # "a" was evicted from memory; loading it back from disk counts as a
+    # use, so "b" is now the oldest row
+    assert disk_cache.get("a") == "A"
+    clock.now += 1
+    disk_cache.set("d", "D", 60)
+    clock.now += 1
+    disk_cache.set("e", "E", 60)
+
+    stats = disk_cache.get_stats()
+    assert stats["disk_entries"] == 3
+    assert stats["disk_evictions"] == 2
+
+    reopened = ToolCache(max_entries=10, disk_path=path, max_disk_entries=3)
+    assert [reopened.get(name) for name in "abcde"] == ["A", None, None, "D", "E"]
+
+    # A smaller cap on reopening trims the table straight away
+    assert ToolCache(max_entries=1, disk_path=path, max_disk_entries=1).get_stats()["disk_entries"] == 1
@@ -0,0 +1,103 @@
+# test_executor.py
+
+import threading
+import time
+
+import pytest
+
+from executor import ToolExecutor
+
+
+def call(name, arguments="{}"):
+    return {"id": f"call_{name}", "type": "function", "function": {"name": name, "arguments": arguments}}
+
+
+class FakeTools:
+    """call_tool stand-in: slow, fast, hanging and raising tools"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, tool_call):
+        name = tool_call["function"]["name"]
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            if name == "slow":
+                time.sleep(0.3)
+            elif name == "hang":
+                self.release.wait(5)
+            elif name == "boom":
+                raise RuntimeError("kaput")
+            elif name == "limited":
+                time.sleep(0.1)
+            return f"{name} done"
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+@pytest.fixture
+def tools():
+    tools = FakeTools()
+    yield tools
+    tools.release.set()
+
+
+@pytest.fixture
+def make_executor(tools):
+    executors = []
+
+    def make(**kwargs):
+        executor = ToolExecutor(call_tool=tools, **kwargs)
+        executors.append(executor)
+        return executor
+
+    yield make
+    for executor in executors:
+        executor.shutdown()
+
+
+def test_results_keep_call_order_and_run_concurrently(make_executor):
+    executor = make_executor()
+    calls = [call("slow"), call("fast"), call("slow", '{"n": 2}'), call("fast", '{"n": 2}')]
+
+    started = time.perf_counter()
+    results = executor.run(calls)
+    elapsed = time.perf_counter() - started
+
+    assert [tool_call for tool_call, _, _ in results] == calls
+    assert [result for _, result, _ in results] == ["slow done", "fast done", "slow done", "fast done"]
+    assert results[0][2] >= 0.3 > results[1][2]
+    assert elapsed < 0.55  # Both slow calls overlapped
+
+
+def test_timeout_is_isolated_to_one_call(make_executor, tools):
+    executor = make_executor(tool_timeouts={"hang": 0.2})
+    started = time.perf_counter()
+    results = executor.run([call("fast"), call("hang"), call("slow")])
+
+    assert results[0][1] == "fast done"
+    assert results[1][1].startswith("Error: hang timed out")
+    assert results[2][1] == "slow done"
+    assert time.perf_counter() - started < 1.0
+
+
+def test_exception_is_isolated_to_one_call(make_executor):
+    executor = make_executor()
+    results = executor.run([call("boom"), call("fast")])
+
+    assert results[0][1] == "Error running boom: kaput"
+    assert results[1][1] == "fast done"
+
+
+def test_concurrency_limit(make_executor, tools):
+    executor = make_executor(concurrency={"limited": 1})
+    results = executor.run([call("limited", f'{{"n": {i}}}') for i in range(3)])
+
+    assert [result for _, result, _ in results] == ["limited done"] * 3
+    assert tools.max_running == 1
@@ -0,0 +1,172 @@
+# test_extract.py
+
+import codecs
+import importlib.util
+
+import pytest
+
+import extract
+from extract import MainTextCollector, PageExtractor, sniff_charset, sniff_content_type, summarize_html
+
+needs_lxml = pytest.mark.skipif(importlib.util.find_spec("lxml") is None, reason="lxml not installed")
+BACKENDS = ["html.parser", pytest.param("lxml", marks=needs_lxml)]
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    monkeypatch.setattr(extract, "_backend", request.param)
+    return request.param
+
+
+def extract_text(html, chunk_size=7, **kwargs):
+    """Run html through a PageExtractor in small chunks"""
+    extractor = PageExtractor("text/html", **kwargs)
+    data = html.encode("utf-8") if isinstance(html, str) else html
+    for offset in range(0, len(data), chunk_size):
+        if extractor.feed(data[offset:offset + chunk_size]):
+            break
+    return extractor.text()
+
+
+PAGE = """<!doctype html><html><head><title>Title text</title></head><body>
+<header>Site header</header><nav>Home | About</nav>
+<div class="content">Content div text</div>
+<main>Main text <script>var x = 1;</script><div class="ad">Buy now</div></main>
+<article>Article text <aside>Related</aside>here</article>
+<footer>Footer</footer>
+</body></html>"""
+
+
+ARTICLE = "<article>Article text <aside>Related</aside>here</article>"
+MAIN = '<main>Main text <script>var x = 1;</script><div class="ad">Buy now</div></main>'
+CONTENT = '<div class="content">Content div text</div>'
+
+
+@pytest.mark.parametrize("remove, expected", [
+    ((), "Article text here"),
+    ((ARTICLE,), "Main text"),
+    ((ARTICLE, MAIN), "Content div text"),
+    ((ARTICLE, MAIN, CONTENT), "Body text"),
+])
+def test_candidate_precedence(backend, remove, expected):
+    page = PAGE.replace("<footer>", "<p>Body text</p><footer>")
+    for fragment in remove:
+        page = page.replace(fragment, "")
+    assert extract_text(page) == expected
+
+
+def test_first_of_each_candidate_wins(backend):
+    page = "<body><article>First</article><article>Second</article></body>"
+    assert extract_text(page) == "First"
+
+
+def test_stops_early_once_enough_text(backend):
+    article = "<article>" + "word " * 200 + "</article>"
+    page = ("<html><body>" + article + "<p>" + "tail " * 20000 + "</p></body></html>").encode()
+    extractor = PageExtractor("text/html", max_chars=100)
+    for offset in range(0, len(page), 256):
+        if extractor.feed(page[offset:offset + 256]):
+            break
+    assert extractor.done and not extractor.truncated
+    assert extractor.bytes_read < 2048
+    assert extractor.text() == ("word " * 200)[:101]
+
+
+def test_enough_waits_for_better_candidate():
+    collector = MainTextCollector(max_chars=10)
+    collector.start("main", {})
+    collector.data("x" * 50)
+    collector.end("main")
+    collector.start("p", {})  # Flushes the pending text
+    assert collector.enough  # No article seen, main is full
+
+    collector = MainTextCollector(max_chars=10)
+    collector.start("article", {})
+    collector.end("article")
+    collector.start("main", {})
+    collector.data("x" * 50)
+    collector.start("p", {})
+    assert not collector.enough  # An empty article still outranks main
+
+
+def test_byte_cap_truncates():
+    extractor = PageExtractor("text/html", max_bytes=100)
+    assert extractor.feed(b"<body><p>" + b"a " * 200)
+    assert extractor.truncated and extractor.bytes_read == 100
+
+
+def test_charset_sniffing():
+    assert sniff_charset(None, codecs.BOM_UTF8 + b"<html>") == "utf-8-sig"
+    assert sniff_charset("text/html; charset=utf-8", codecs.BOM_UTF16_LE + b"<") == "utf-16"
+    assert sniff_charset("text/html; charset=ISO-8859-1", b"<html>") == "iso8859-1"
+    assert sniff_charset("text/html", b'<meta charset="windows-1252">') == "cp1252"
+    assert sniff_charset("text/html; charset=bogus", b"<html>") == "utf-8"
+    assert sniff_charset(None, b"<html>") == "utf-8"
+
+
+@pytest.mark.parametrize("header, body", [
+    ("text/html; charset=iso-8859-1", "<body><p>Café crème</p></body>".encode("latin-1")),
+    ("text/html", '<meta charset="windows-1252"><body><p>Café crème</p>'.encode("cp1252")),
+    ("text/html", codecs.BOM_UTF8 + "<body><p>Café crème</p>".encode()),
+    (None, "<html><body><p>Café crème</p>".encode("utf-16")),
+])
+def test_decodes_declared_or_sniffed_charset(backend, header, body):
+    extractor = PageExtractor(header)
+    # The first chunk is sniffed (real reads are CHUNK_SIZE); later ones split multi-byte sequences
+    extractor.feed(body[:40])
+    for offset in range(40, len(body), 5):
+        extractor.feed(body[offset:offset + 5])
+    assert extractor.text() == "Café crème"
+
+
+@pytest.mark.parametrize("header, head, kind", [
+    ("text/html; charset=utf-8", b"whatever", "html"),
+    ("application/pdf", b"%PDF-1.7", "binary"),
+    ("text/plain", b"\x89PNG\r\n", "binary"),
+    ("application/json", b'{"a": 1}', "text"),
+    ("application/octet-stream", b"%PDF-1.7", "binary"),
+    (None, b"\x00\x01\x02", "binary"),
+    (None, b"  <!-- hi --><!DOCTYPE html><html>", "html"),
+    (None, b"just some words", "text"),
+    (None, "<!DOCTYPE html><html>".encode("utf-16"), "html"),
+    ("text/plain", "plain words".encode("utf-16"), "text"),
+])
+def test_content_type_sniffing(header, head, kind):
+    assert sniff_content_type(header, head) == kind
+
+
+def test_binary_is_rejected_without_reading_on():
+    extractor = PageExtractor("image/png")
+    assert extractor.feed(b"\x89PNG\r\n\x1a\n" + b"\x00" * 1000)
+    assert extractor.bytes_read == 0
+    assert extractor.summary("http://x/a.png") == "Error: http://x/a.png is not a text page (image/png)"
+
+    extractor = PageExtractor(None)
+    assert extractor.feed(b"%PDF-1.4 ...")
+    assert extractor.summary("http://x/doc").startswith("Error: http://x/doc is not a text page")
+
+
+def test_plain_text_is_kept():
+    extractor = PageExtractor("text/plain", max_chars=10)
+    extractor.feed(b"one  two\n\nthree four five")
+    assert extractor.summary("http://x/a.txt") == "Content from http://x/a.txt: one two th..."
+
+
+def test_summarize_html_messages():
+    assert summarize_html("u", "<body><p>Short</p></body>") == "Content from u: Short"
+    assert summarize_html("u", "<body><script>x</script></body>") == "Error: Could not find main content in u"
+
+
+@needs_lxml
+@pytest.mark.parametrize("page", [
+    PAGE,
+    "<html><body><div class='post-content'>A &amp; B<br>C</div><p>body</p>",
+    "<body><main>Unclosed <b>bold <i>italic</main><p>after</p>",
+    "<body><p>" + "long text " * 500 + "</p></body>",
+])
+def test_backends_agree(monkeypatch, page):
+    results = []
+    for name in ("lxml", "html.parser"):
+        monkeypatch.setattr(extract, "_backend", name)
+        results.append(extract_text(page, chunk_size=64))
+    assert results[0] == results[1]
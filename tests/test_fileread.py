@@ -0,0 +1,121 @@
+# test_fileread.py
+
+import pytest
+
+import fileread
+from fileread import LineIndex, _IndexCache, count_newlines, grep, read_bytes, read_lines
+
+
+class RecordingBuffer(bytes):
+    """bytes that remember the size of every slice taken"""
+
+    def __getitem__(self, key):
+        result = super().__getitem__(key)
+        if isinstance(key, slice):
+            self.slices.append(len(result))
+        return result
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(fileread, "INDEX_BLOCK", 64)
+
+
+def test_count_newlines_in_bounded_slices(small_blocks):
+    data = RecordingBuffer(b"line\n" * 1000)
+    data.slices = []
+    assert count_newlines(data, 0, len(data)) == 1000
+    assert count_newlines(data, 3, 3) == 0
+    assert count_newlines(data, 4, 15) == 3
+    assert max(data.slices) <= 64
+
+
+def test_grep_line_numbers_across_long_gaps(tmp_path, small_blocks):
+    lines = [f"filler {i}" for i in range(5000)]
+    for number in (1, 2, 777, 4000, 5000):
+        lines[number - 1] = f"needle at {number}"
+    path = tmp_path / "big.txt"
+    path.write_text("\n".join(lines))
+
+    matches, stopped = grep(str(path), r"needle")
+    assert matches == [(n, f"needle at {n}") for n in (1, 2, 777, 4000, 5000)]
+    assert not stopped
+
+
+def test_grep_one_result_per_line_and_limits(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("aaa\nbab\nccc\n" * 3)
+    matches, stopped = grep(str(path), "a")
+    assert [n for n, _ in matches] == [1, 2, 4, 5, 7, 8]
+    assert grep(str(path), "A", ignore_case=True)[0] == matches
+
+    matches, stopped = grep(str(path), "a", max_matches=2)
+    assert matches == [(1, "aaa"), (2, "bab")] and stopped
+    assert grep(str(tmp_path / "a.txt"), "zzz") == ([], False)
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("".join(f"line {i}\n" for i in range(1, 301)))
+    return path
+
+
+def test_offset_of_across_checkpoints(small_blocks):
+    data = b"".join(b"x" * (i % 7) + b"\n" for i in range(400))
+    starts = [0] + [i + 1 for i, byte in enumerate(data) if byte == ord("\n")][:-1]
+    index = LineIndex()
+    index.size = len(data)
+    assert index.offset_of(data, 10) == starts[10]
+    assert not index.complete  # Built only as far as asked
+    assert [index.offset_of(data, n) for n in range(len(starts))] == starts
+    assert len(index.lines) > 10
+    assert all(data[offset - 1:offset] == b"\n" for offset in index.offsets[1:])
+    assert index.offset_of(data, len(starts)) is None
+    assert index.count_lines(data) == 400
+
+
+def test_read_lines_from_start_and_end(log_file, small_blocks):
+    lines, total, truncated = read_lines(str(log_file), start=150, count=3)
+    assert lines == [(150, "line 150"), (151, "line 151"), (152, "line 152")]
+    assert total is None and not truncated  # Not counted - the index stopped early
+
+    lines, total, truncated = read_lines(str(log_file), start=-2, count=5)
+    assert lines == [(299, "line 299"), (300, "line 300")] and total == 300
+    assert read_lines(str(log_file), start=-1000, count=1)[0] == [(1, "line 1")]
+    assert read_lines(str(log_file), start=301)[0] == []
+
+    lines, _, truncated = read_lines(str(log_file), start=10, count=50, max_chars=20)
+    assert lines == [(10, "line 10"), (11, "line 11")] and truncated
+
+
+def test_read_bytes(log_file):
+    size = log_file.stat().st_size
+    assert read_bytes(str(log_file), offset=0, length=7) == ("line 1\n", size)
+    assert read_bytes(str(log_file), offset=-9, length=100) == ("line 300\n", size)
+    assert read_bytes(str(log_file), offset=size + 10) == ("", size)
+
+
+def test_appended_file_extends_index_in_place(log_file, small_blocks, monkeypatch):
+    monkeypatch.setattr(fileread, "line_indexes", _IndexCache())
+    assert read_lines(str(log_file), start=20, count=1)[0] == [(20, "line 20")]
+    checkpoints = len(fileread.line_indexes._entries[str(log_file)][1].lines)
+
+    with open(log_file, "a") as f:
+        f.write("".join(f"line {i}\n" for i in range(301, 311)))
+    lines, total, _ = read_lines(str(log_file), start=-2, count=2)
+    assert lines == [(309, "line 309"), (310, "line 310")] and total == 310
+    index = fileread.line_indexes._entries[str(log_file)][1]
+    assert len(index.lines) > checkpoints
+    assert fileread.line_indexes.get_stats() == {"hits": 0, "builds": 1, "appends": 1, "files": 1}
+
+    # Appending again after a complete scan only reads the new tail
+    with open(log_file, "a") as f:
+        f.write("line 311\n")
+    assert read_lines(str(log_file), start=-1, count=1)[:2] == ([(311, "line 311")], 311)
+    assert fileread.line_indexes.get_stats()["appends"] == 2
+
+    # A rewritten file gets a new index
+    log_file.write_text("rewritten\n" * 400)
+    assert read_lines(str(log_file), start=-1, count=1)[:2] == ([(400, "rewritten")], 400)
+    assert fileread.line_indexes.get_stats()["builds"] == 2
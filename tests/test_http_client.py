@@ -0,0 +1,17 @@
+# test_http_client.py
+
+import http_client
+
+
+def test_requests_reuse_one_connection(stub_server):
+    stub_server.routes["/ping"] = lambda request: (200, {"Content-Type": "text/plain"}, b"pong")
+    http_client.close()
+    http_client.reset_stats()
+
+    for _ in range(5):
+        assert http_client.get(stub_server.url("/ping")).text == "pong"
+
+    stats = http_client.get_stats()
+    assert stats["requests"] == 5
+    assert stats["new_connections"] == 1
+    http_client.close()
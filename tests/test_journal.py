@@ -0,0 +1,82 @@
+# test_journal.py
+
+import json
+import os
+
+from journal import SessionJournal
+
+
+def _messages(count):
+    return [{"role": "user", "content": f"message {i} - ünïcode"} for i in range(count)]
+
+
+def test_torn_tail_is_repaired(tmp_path):
+    session_file = str(tmp_path / "session_torn.json")
+    journal = SessionJournal(session_file)
+    journal.append_batch(_messages(5))
+    journal.close()
+
+    # Simulate a crash halfway through writing the sixth record
+    with open(journal.journal_file, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"role": "user", "content": "message 5"})[:12])
+
+    recovered = SessionJournal.from_journal_file(journal.journal_file)
+    assert recovered.messages() == _messages(5)
+    assert recovered.meta["message_count"] == 5
+
+    # The next append starts on a clean line instead of gluing onto the torn one
+    recovered.append({"role": "assistant", "content": "after the crash"})
+    recovered.close()
+    assert SessionJournal.read_messages(journal.journal_file) == _messages(5) + [
+        {"role": "assistant", "content": "after the crash"}
+    ]
+
+
+def test_torn_tail_without_any_complete_line(tmp_path):
+    session_file = str(tmp_path / "session_empty.json")
+    journal = SessionJournal(session_file)
+    with open(journal.journal_file, "w", encoding="utf-8") as f:
+        f.write('{"role": "us')
+
+    journal.append({"role": "user", "content": "first"})
+    journal.close()
+    assert journal.messages() == [{"role": "user", "content": "first"}]
+
+
+def test_missing_sidecar_recounts_journal(tmp_path):
+    session_file = str(tmp_path / "session_nometa.json")
+    journal = SessionJournal(session_file)
+    journal.append_batch(_messages(3))
+    journal.close()
+    os.remove(journal.meta_file)
+
+    assert SessionJournal(session_file).meta["message_count"] == 3
+
+
+def test_compact_round_trips(tmp_path):
+    session_file = str(tmp_path / "session_compact.json")
+    journal = SessionJournal(session_file, durability="none")
+    journal.append_batch(_messages(3))
+    journal.append({"role": "assistant", "content": "done"})
+
+    assert journal.compact() == session_file
+    assert not os.path.exists(journal.journal_file)
+    assert not os.path.exists(journal.meta_file)
+    assert SessionJournal.find_unfinished(str(tmp_path)) == []
+
+    with open(session_file, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["messages"] == _messages(3) + [{"role": "assistant", "content": "done"}]
+    assert data["message_count"] == 4
+    assert data["session_info"]["session_file"] == session_file
+
+
+def test_find_unfinished_lists_uncompacted_journals(tmp_path):
+    done = SessionJournal(str(tmp_path / "session_done.json"))
+    done.append({"role": "user", "content": "hi"})
+    done.compact()
+    crashed = SessionJournal(str(tmp_path / "session_crashed.json"))
+    crashed.append({"role": "user", "content": "hi"})
+    crashed.close()
+
+    assert SessionJournal.find_unfinished(str(tmp_path)) == [crashed.journal_file]
@@ -0,0 +1,131 @@
+# test_listing.py
+
+from collections import OrderedDict
+import os
+import re
+
+import pytest
+
+import listing
+from listing import _DirCache
+from tools import list_files
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    """Empty directory and listing caches on a fake clock"""
+    clock = FakeClock()
+    monkeypatch.setattr(listing, "time", clock)
+    monkeypatch.setattr(listing, "dir_cache", _DirCache())
+    monkeypatch.setattr(listing, "_listings", OrderedDict())
+    return clock
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for i in range(10):
+        (tmp_path / f"file{i}.txt").write_text("x" * i)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "deep.py").write_text("print()")
+    return tmp_path
+
+
+def touch_dir(path):
+    """Bump a directory's mtime - a new entry can land within its timestamp granularity"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def page_items(output):
+    return [line[2:] for line in output.splitlines() if line.startswith(("📁", "📄"))]
+
+
+def next_cursor(output):
+    match = re.search(r"cursor='([^']+)'", output)
+    return match.group(1) if match else None
+
+
+def test_pages_cover_listing_once(fresh, tree):
+    seen, cursor, pages = [], "", 0
+    while True:
+        output = list_files(str(tree), limit=3, cursor=cursor)
+        seen.extend(page_items(output))
+        pages += 1
+        cursor = next_cursor(output)
+        if cursor is None:
+            break
+    assert pages == 4
+    assert seen[0] == "sub/"
+    assert seen[1:] == [f"file{i}.txt ({i}B)" for i in range(10)]
+    # One scan; every later page cost a stat
+    assert listing.dir_cache.get_stats()["scans"] == 1
+
+
+def test_stale_cursor_is_rejected_after_change(fresh, tree):
+    cursor = next_cursor(list_files(str(tree), limit=3))
+    (tree / "file-new.txt").write_text("new")
+    touch_dir(tree)
+
+    output = list_files(str(tree), limit=3, cursor=cursor)
+    assert output.startswith("Error: the listing changed since cursor")
+    # Starting over sees the new file, and its cursors work again
+    output = list_files(str(tree), limit=3)
+    assert "file-new.txt (3B)" in page_items(output)
+    assert "Error" not in list_files(str(tree), limit=3, cursor=next_cursor(output))
+    assert listing.dir_cache.get_stats()["scans"] == 2
+
+
+def test_cursor_for_other_listing_is_rejected(fresh, tree):
+    cursor = next_cursor(list_files(str(tree), limit=3))
+    assert list_files(str(tree), limit=3, sort="size", cursor=cursor) == (
+        f"Error: cursor '{cursor}' doesn't belong to this listing")
+    assert list_files(str(tree), cursor="bogus").startswith("Error: cursor 'bogus'")
+
+
+def test_dir_cache_refreshes_on_mtime_change_and_ttl(fresh, tree):
+    cache = listing.dir_cache
+    first = cache.entries(str(tree))
+    assert cache.entries(str(tree)) is first
+    assert cache.get_stats()["hits"] == 1
+
+    (tree / "extra.txt").write_text("")
+    touch_dir(tree)
+    assert {e[0] for e in cache.entries(str(tree))} - {e[0] for e in first} == {"extra.txt"}
+
+    # Rewriting a file in place leaves the directory's mtime alone - the TTL catches it
+    (tree / "file1.txt").write_text("longer now")
+    sizes = {e[0]: e[3] for e in cache.entries(str(tree))}
+    assert sizes["file1.txt"] == 1
+    fresh.now += listing.DIR_CACHE_TTL
+    sizes = {e[0]: e[3] for e in cache.entries(str(tree))}
+    assert sizes["file1.txt"] == 10
+    assert cache.get_stats()["scans"] == 3
+
+
+def test_listing_rebuilt_only_when_a_directory_changes(fresh, tree):
+    first = listing.get_listing(str(tree), depth=2)
+    assert listing.get_listing(str(tree), depth=2) is first
+    (tree / "sub" / "another.py").write_text("")
+    touch_dir(tree / "sub")
+    second = listing.get_listing(str(tree), depth=2)
+    assert second is not first
+    assert second.version != first.version
+    assert "sub/another.py" in [e.path for e in second.entries]
+
+
+def test_cursor_round_trip():
+    args = ("/tmp", 1, "", "name")
+    cursor = listing.make_cursor(40, *args, version="abc")
+    assert listing.parse_cursor(cursor, *args, version="abc") == 40
+    with pytest.raises(ValueError, match="changed"):
+        listing.parse_cursor(cursor, *args, version="def")
+    with pytest.raises(ValueError, match="doesn't belong"):
+        listing.parse_cursor(cursor, "/other", 1, "", "name", version="abc")
@@ -0,0 +1,109 @@
+# test_mathexpr.py
+
+from decimal import Decimal
+from fractions import Fraction
+import time
+
+import pytest
+
+from mathexpr import MAX_INT_BITS, ExpressionError, _bits, evaluate
+from tools import calculate
+
+
+@pytest.mark.parametrize("expression", [
+    "int(10**999999)",
+    "floor(10**99999)",
+    "ceil(10**99999)",
+    "trunc(10**99999)",
+    "round(10**99999)",
+    "int(10**99999)",
+    "10**5000 * 10**5000",
+    "exp(30000)",
+    "int(10**9999) * int(10**9999)",
+])
+def test_decimal_mode_stops_at_the_size_limit(expression):
+    started = time.perf_counter()
+    result = calculate(expression, mode="decimal")
+    assert time.perf_counter() - started < 0.5
+    assert result.startswith("Error: result too large")
+    assert "10,000" in result
+
+
+def test_decimal_mode_allows_results_under_the_limit():
+    assert calculate("ceil(10**9999)", mode="decimal") == "1.000000000000000e+9999 (10,000 digits)"
+    value = evaluate("int(9.99 * 10**9998)", mode="decimal")
+    assert isinstance(value, int) and value.bit_length() <= MAX_INT_BITS
+    assert calculate("round(2.5) + floor(-1.5)", mode="decimal") == "0"
+    assert calculate("1.01**1000000", mode="decimal").startswith("2.3647358888701483")
+    assert calculate("sqrt(2)", mode="decimal") == "1.4142135623730950488016887242096980785696718753769"
+
+
+def test_bits_estimates():
+    assert _bits(True) == 1
+    assert _bits(2**100) == 101
+    assert _bits(Fraction(1, 2**64)) == 65
+    assert _bits(1e300) == 0
+    assert _bits(Decimal("1E+9999")) >= 10_000 * 3.32
+    assert _bits(Decimal("0.001")) == 0
+    assert _bits(Decimal(0)) == _bits(Decimal("Infinity")) == 0
+
+
+def test_integer_limits_in_other_modes():
+    with pytest.raises(ExpressionError, match="result too large"):
+        evaluate("2**40000")
+    with pytest.raises(ExpressionError, match="result too large"):
+        evaluate("factorial(5000)", mode="fraction")
+    assert evaluate("2**16000").bit_length() == 16001
+
+
+@pytest.mark.parametrize("expression, mode", [
+    ("round(1, -10**7)", "auto"),
+    ("round(7, -10**8)", "auto"),
+    ("round(1/3, 10**5)", "fraction"),
+    ("round(1.5, 10**6)", "decimal"),
+])
+def test_round_digits_are_capped(expression, mode):
+    started = time.perf_counter()
+    with pytest.raises(ExpressionError, match="round"):
+        evaluate(expression, mode=mode)
+    assert time.perf_counter() - started < 0.5
+
+
+def test_round_within_the_cap():
+    assert evaluate("round(1/3, 5)", mode="fraction") == Fraction(33333, 100000)
+    assert evaluate("round(2.567, 2)", mode="decimal") == Decimal("2.57")
+    assert evaluate("round(123456, -3)") == 123000
+    assert evaluate("round(1, -9999)") == 0
+
+
+@pytest.mark.parametrize("expression, mode, bits", [
+    ("10**9000", "auto", 29_898),       # 9,001 digits
+    ("10**9999", "auto", 33_216),       # 10,000 digits
+    ("2**33219", "auto", 33_220),
+    ("(-3)**20000", "auto", 31_700),
+    ("(2/3)**20000", "fraction", None),
+    ("2**-9000", "fraction", None),
+])
+def test_powers_just_under_the_limit(expression, mode, bits):
+    value = evaluate(expression, mode=mode)
+    if bits is None:
+        assert max(value.numerator.bit_length(), value.denominator.bit_length()) <= MAX_INT_BITS
+    else:
+        assert value.bit_length() == bits
+
+
+@pytest.mark.parametrize("expression, mode", [
+    ("10**10001", "auto"),
+    ("2**33220", "auto"),
+    ("(2/3)**21000", "fraction"),
+    ("2**-40000", "fraction"),
+    ("pow(10, 20000)", "auto"),
+])
+def test_powers_just_over_the_limit(expression, mode):
+    with pytest.raises(ExpressionError, match="result too large"):
+        evaluate(expression, mode=mode)
+
+
+def test_negative_int_powers_are_floats_in_auto_mode():
+    assert evaluate("2**-100000") == 0.0
+    assert evaluate("10**-3") == pytest.approx(0.001)
@@ -0,0 +1,154 @@
+# test_memory.py
+
+import pytest
+
+import agent
+from memory import ContextMessage, Memory
+from ratelimit import RateLimiter, estimate_request_tokens
+import tokenizer
+from tokenizer import REPLY_PRIMING, count_message_tokens
+
+
+@pytest.fixture
+def memory():
+    return Memory("You are a test agent.", storage="none")
+
+
+def test_history_is_cached_until_a_message_is_added(memory):
+    memory.add_user_message("hello")
+    first = memory.get_history()
+    assert memory.get_history() is first
+
+    memory.add_agent_message("hi there")
+    second = memory.get_history()
+    assert second is not first
+    assert [m["content"] for m in second] == ["You are a test agent.", "hello", "hi there"]
+    assert memory.get_history() is second
+
+
+def test_history_rebuilds_when_system_prompt_changes(memory):
+    memory.add_user_message("hello")
+    first = memory.get_history()
+    memory.system_prompt = "You are a different agent."
+    assert memory.get_history()[0]["content"] == "You are a different agent."
+    assert memory.get_history() is not first
+
+
+def test_trimming_invalidates_the_cache():
+    memory = Memory("system", recent_limit=2, storage="none")
+    for text in ("one", "two"):
+        memory.add_user_message(text)
+    assert [m["content"] for m in memory.get_history()] == ["system", "one", "two"]
+    memory.add_user_message("three")
+    assert [m["content"] for m in memory.get_history()] == ["system", "two", "three"]
+
+
+def test_history_rejects_mutation(memory):
+    memory.add_user_message("hello")
+    history = memory.get_history()
+    assert all(isinstance(m, ContextMessage) for m in history)
+
+    with pytest.raises(TypeError):
+        history[1]["content"] = "changed"
+    with pytest.raises(TypeError):
+        history[1].update(content="changed")
+    with pytest.raises(TypeError):
+        del history[1]["role"]
+    with pytest.raises(TypeError):
+        history[1] = {"role": "user", "content": "changed"}
+    assert memory.get_history()[1]["content"] == "hello"
+
+    # A copy is an ordinary dict that can be changed freely
+    copy = dict(history[1])
+    copy["content"] = "changed"
+    assert memory.get_history()[1]["content"] == "hello"
+
+
+def test_request_estimate_counts_history_once(memory, monkeypatch):
+    monkeypatch.setattr(agent, "groq_limiter", RateLimiter(tokens_per_minute=12000))
+    memory.add_user_message("earlier question")
+    memory.add_agent_message("earlier answer")
+    history = list(memory.get_history())
+    added = [{"role": "user", "content": "new question"}]
+    payload = {"messages": history + added, "max_tokens": 100}
+
+    estimate = agent.request_token_estimate(payload, len(history), memory.context_tokens)
+    assert estimate == estimate_request_tokens(added, memory.context_tokens, 0, 100)
+
+    # Plain dicts copied from the history still count as history
+    copied = {"messages": [dict(m) for m in history] + added, "max_tokens": 100}
+    assert agent.request_token_estimate(copied, len(history), memory.context_tokens) == estimate
+
+
+@pytest.fixture
+def estimator(monkeypatch):
+    """Use tokenizer.py's BPE estimate even when tiktoken is installed"""
+    monkeypatch.setattr(tokenizer, "_encoding", None)
+    monkeypatch.setattr(tokenizer, "_encoding_checked", True)
+
+
+def _budget_memory(budget):
+    return Memory("system", recent_limit=20, token_budget=budget, storage="none")
+
+
+def _fill(memory, count, extra=""):
+    for i in range(count):
+        memory.add_user_message(f"question number {i}{extra}")
+        memory.add_agent_message(f"answer number {i}{extra}")
+
+
+def _contents(memory):
+    return [m["content"] for m in memory.get_history()]
+
+
+def _cost(*messages):
+    return sum(count_message_tokens(role, content) for role, content in messages)
+
+
+def test_budget_keeps_system_prompt_and_newest_tail(estimator):
+    fixed = REPLY_PRIMING + _cost(("system", "system"))
+    tail = _cost(("user", "question number 2"), ("assistant", "answer number 2"))
+
+    memory = _budget_memory(fixed + tail)
+    _fill(memory, 3)
+    assert _contents(memory) == ["system", "question number 2", "answer number 2"]
+    assert memory.context_tokens == fixed + tail
+
+    # One token short: the older message of the pair no longer fits, and
+    # nothing older is pulled in around it
+    memory = _budget_memory(fixed + tail - 1)
+    _fill(memory, 3)
+    assert _contents(memory) == ["system", "answer number 2"]
+    assert memory.context_tokens <= fixed + tail - 1
+
+
+def test_budget_fills_leftover_room_with_important_messages(estimator):
+    # Room for the last exchange and the short important message, but not
+    # for the next-newest recent message
+    extra = " about the weather in Paris"
+    fixed = REPLY_PRIMING + _cost(("system", "system"))
+    tail = _cost(("user", "question number 3" + extra), ("assistant", "answer number 3" + extra))
+    important = _cost(("assistant", "[TOOL] done"))
+    assert important < _cost(("assistant", "answer number 2" + extra))
+
+    memory = _budget_memory(fixed + tail + important)
+    memory.add_user_message("read it")
+    memory.add_agent_message("[TOOL] done")
+    _fill(memory, 4, extra)
+
+    assert _contents(memory) == [
+        "system", "[TOOL] done", "question number 3" + extra, "answer number 3" + extra
+    ]
+    assert memory.context_tokens == fixed + tail + important
+
+
+def test_budget_truncates_oversized_latest_message(estimator):
+    memory = _budget_memory(200)
+    _fill(memory, 2)
+    memory.add_user_message("word " * 2000)
+
+    history = memory.get_history()
+    assert [m["content"] for m in history][0] == "system"
+    assert len(history) == 2
+    assert history[1]["content"].endswith("...[truncated]")
+    assert memory.context_tokens <= 200
@@ -0,0 +1,73 @@
+# test_multifile.py
+
+import os
+import re
+
+import pytest
+
+import multifile
+from multifile import expand_paths, share_budget
+from tools import read_files
+
+
+@pytest.mark.parametrize("sizes, budget, shares", [
+    ([100, 5000, 5000], 1000, [100, 450, 450]),    # Small files whole, the rest split evenly
+    ([10, 20, 30], 1000, [10, 20, 30]),
+    ([0, 5000], 1000, [0, 1000]),
+    ([5000] * 5, 600, [200, 200, 200, 0, 0]),      # The floor never pushes past the budget
+    ([150, 5000, 5000], 300, [150, 0, 0]),
+    ([], 1000, []),
+])
+def test_share_budget(sizes, budget, shares):
+    assert share_budget(sizes, budget) == shares
+
+
+def test_share_budget_never_exceeds_budget():
+    for count in (1, 7, 50):
+        for budget in (200, 1000, 12000):
+            shares = share_budget([10_000] * count, budget)
+            assert sum(shares) <= budget
+            assert all(share == 0 or share >= multifile.MIN_FILE_CHARS for share in shares)
+
+
+@pytest.fixture
+def many_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for i in range(60):
+        (tmp_path / f"f{i:02}.txt").write_text(f"{i:02}" + "y" * 998)
+    (tmp_path / "sub.txt").mkdir()  # Matches the glob but is a directory
+    return tmp_path
+
+
+def test_read_files_stays_within_budget(many_files):
+    output = read_files(pattern="*.txt", max_chars=1000)
+    sections = re.findall(r"^--- f\d\d\.txt .*?---\n(.*)$", output, re.MULTILINE)
+    assert len(sections) == 5
+    assert sum(len(content) for content in sections) <= 1000
+    assert "45 file(s) left out to stay within the budget: f05.txt, f06.txt" in output
+    assert output.endswith("... and more (at most 50 per call - narrow the pattern)")
+
+
+def test_expand_paths_dedupes_and_skips_directories(many_files):
+    paths, more = expand_paths(["f03.txt", "f01.txt"], "f0*.txt")
+    assert paths == ["f03.txt", "f01.txt", "f00.txt", "f02.txt"] + [f"f{i:02}.txt" for i in range(4, 10)]
+    assert not more
+    assert expand_paths(None, "sub*") == ([], False)
+
+
+def test_expand_paths_stops_the_glob_at_the_limit(many_files, monkeypatch):
+    real_iglob = multifile.glob.iglob
+    pulled = []
+
+    def counting_iglob(*args, **kwargs):
+        for path in real_iglob(*args, **kwargs):
+            pulled.append(path)
+            yield path
+
+    monkeypatch.setattr(multifile.glob, "iglob", counting_iglob)
+    paths, more = expand_paths(["extra.txt"], "*.txt", limit=10)
+    assert len(paths) == 10 and paths[0] == "extra.txt"
+    assert paths[1:] == sorted(paths[1:])
+    assert more
+    assert len(pulled) <= 11  # Never walked the other 50 matches
+    assert all(os.path.exists(path) for path in paths[1:])
@@ -0,0 +1,69 @@
+# test_persistence.py
+
+from persistence import PersistenceWorker
+
+
+class Destination:
+    """write_batch stand-in that records batches and can be made to fail"""
+
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.batches = []
+
+    def __call__(self, messages):
+        if self.broken:
+            raise OSError("disk full")
+        self.batches.append(list(messages))
+
+    @property
+    def messages(self):
+        return [m for batch in self.batches for m in batch]
+
+
+def test_close_drains_every_pending_group():
+    worker = PersistenceWorker(batch_size=1000, flush_interval=0.05)
+    destinations = [Destination() for _ in range(3)]
+    for i in range(30):
+        worker.submit(i, destinations[i % 3])
+    worker.close()
+
+    for offset, destination in enumerate(destinations):
+        assert destination.messages == list(range(offset, 30, 3))
+    assert worker.get_stats()["messages_written"] == 30
+
+
+def test_failed_group_does_not_drop_other_groups():
+    worker = PersistenceWorker(batch_size=1000, flush_interval=0.05)
+    failing, healthy, later = Destination(broken=True), Destination(), Destination()
+    for i in range(4):
+        worker.submit(i, failing)
+        worker.submit(i, healthy)
+        worker.submit(i, later)
+    worker.flush()
+
+    assert healthy.messages == [0, 1, 2, 3]
+    assert later.messages == [0, 1, 2, 3]
+    assert failing.messages == []
+    stats = worker.get_stats()
+    assert stats["errors"] >= 1
+    assert stats["pending_retry"] == 4
+
+    # The failed group is retried ahead of newer messages, keeping its order
+    failing.broken = False
+    worker.submit(4, failing)
+    worker.flush()
+    assert failing.messages == [0, 1, 2, 3, 4]
+    assert worker.get_stats()["pending_retry"] == 0
+    worker.close()
+
+
+def test_close_retries_failed_group():
+    worker = PersistenceWorker(batch_size=1000, flush_interval=0.05)
+    failing = Destination(broken=True)
+    worker.submit("message", failing)
+    worker.flush()
+    assert failing.messages == []
+
+    failing.broken = False
+    worker.close()
+    assert failing.messages == ["message"]
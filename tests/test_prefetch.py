@@ -0,0 +1,128 @@
+# test_prefetch.py
+
+import json
+import threading
+
+import pytest
+
+import cache
+from cache import ToolCache
+from executor import ToolExecutor
+from prefetch import Prefetcher, detect_tool_calls
+import tools
+
+
+@pytest.fixture
+def weather_api(stub_server, monkeypatch):
+    """get_weather against the stub server, with an empty tool cache"""
+    def respond(request):
+        data = {"current_condition": [{
+            "temp_C": "20", "temp_F": "68", "humidity": "50", "weatherDesc": [{"value": "Sunny"}]
+        }]}
+        return 200, {"Content-Type": "application/json"}, json.dumps(data).encode()
+
+    stub_server.routes["/Paris"] = respond
+    monkeypatch.setattr(tools, "WEATHER_URL", stub_server.url(""))
+    tool_cache = ToolCache()
+    monkeypatch.setattr(cache, "tool_cache", tool_cache)
+    monkeypatch.setattr(tools, "tool_cache", tool_cache)
+    return stub_server, tool_cache
+
+
+class GatedTools:
+    """call_tool that runs real tools but holds "block" calls until released"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.calls = []
+
+    def __call__(self, tool_call):
+        name = tool_call["function"]["name"]
+        self.calls.append(name)
+        if name == "block":
+            self.gate.wait(5)
+            return "unblocked"
+        return tools.handle_tool_call(tool_call)
+
+
+@pytest.fixture
+def gated():
+    gated = GatedTools()
+    executor = ToolExecutor(max_workers=1, call_tool=gated)
+    yield gated, executor
+    gated.gate.set()
+    executor.shutdown()
+
+
+def weather_call(city):
+    return {"id": "call_0", "type": "function",
+            "function": {"name": "get_weather", "arguments": json.dumps({"city": city})}}
+
+
+def test_detects_obvious_calls(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "notes.txt").write_text("hello")
+    assert detect_tool_calls("What's the weather in Paris today?") == [("get_weather", {"city": "Paris"})]
+    assert detect_tool_calls("Summarize https://example.com/a.html, please") == [
+        ("url_content", {"url": "https://example.com/a.html"})
+    ]
+    assert detect_tool_calls("How big is notes.txt?") == [("file_info", {"filename": "notes.txt"})]
+    assert detect_tool_calls("Read missing.txt") == []
+
+
+def test_prefetched_result_is_reused(weather_api, gated):
+    stub_server, tool_cache = weather_api
+    calls, executor = gated
+    calls.gate.set()
+    prefetcher = Prefetcher(executor)
+
+    turn = prefetcher.start("What's the weather in Paris?")
+    results = executor.run([weather_call("paris")], prefetched=turn)  # Case doesn't matter
+    turn.finish()
+
+    assert results[0][1].startswith("Weather in Paris: Sunny")
+    assert calls.calls == ["get_weather"]
+    assert len(stub_server.requests) == 1
+    stats = prefetcher.get_stats()
+    assert (stats["started"], stats["used"], stats["cancelled"], stats["wasted"]) == (1, 1, 0, 0)
+
+
+def test_cancelled_prefetch_never_runs_or_fills_cache(weather_api, gated):
+    stub_server, tool_cache = weather_api
+    calls, executor = gated
+    prefetcher = Prefetcher(executor)
+
+    # The only worker is busy, so the prefetch is still queued when the turn ends
+    blocker = executor.submit({"function": {"name": "block", "arguments": "{}"}})
+    turn = prefetcher.start("What's the weather in Paris?")
+    turn.finish()
+    calls.gate.set()
+    assert blocker.result(5)[0] == "unblocked"
+    # One worker runs in order, so anything queued before this has run by now
+    assert executor.submit({"function": {"name": "block", "arguments": "{}"}}).result(5)[0] == "unblocked"
+
+    assert calls.calls == ["block", "block"]
+    assert stub_server.requests == []
+    assert tool_cache.get_stats()["stores"] == 0
+    assert tool_cache.get(cache.cache_key("get_weather", "Paris")) is None
+    stats = prefetcher.get_stats()
+    assert (stats["started"], stats["used"], stats["cancelled"]) == (1, 0, 1)
+
+
+def test_unclaimed_prefetch_is_not_reused_next_turn(weather_api, gated):
+    calls, executor = gated
+    calls.gate.set()
+    prefetcher = Prefetcher(executor)
+
+    turn = prefetcher.start("What's the weather in Paris?")
+    assert turn.claim(weather_call("Rome")) is None
+    turn.finish()
+    assert turn.pending == {}
+    assert turn.claim(weather_call("Paris")) is None
+
+
+def test_disabled_prefetcher_starts_nothing(gated):
+    calls, executor = gated
+    turn = Prefetcher(executor, enabled=False).start("What's the weather in Paris?")
+    assert turn.pending == {}
+    assert calls.calls == []
@@ -0,0 +1,146 @@
+# test_ratelimit.py
+
+import asyncio
+import fcntl
+import threading
+import time
+
+import pytest
+
+from ratelimit import RateLimiter
+
+
+def drained(**kwargs):
+    """Limiter whose buckets start empty"""
+    limiter = RateLimiter(poll_interval=0.01, **kwargs)
+    for bucket in limiter.buckets.values():
+        bucket.level = 0.0
+    return limiter
+
+
+def test_priority_then_fifo_order():
+    limiter = drained(requests_per_minute=600, tokens_per_minute=0)  # One request per 0.1s
+    order = []
+
+    async def request(name, priority):
+        await limiter.acquire_async(priority=priority)
+        order.append(name)
+
+    async def main():
+        # Tasks enqueue in creation order: background first, then two urgent ones
+        await asyncio.gather(request("background", 1), request("first", 0), request("second", 0))
+
+    asyncio.run(main())
+    assert order == ["first", "second", "background"]
+    assert limiter.get_stats()["queue_depth"] == 0
+
+
+def test_waits_for_token_refill():
+    limiter = drained(requests_per_minute=0, tokens_per_minute=6000)  # 100 tokens/s
+    waited = limiter.acquire(tokens=50)
+    assert 0.4 <= waited < 1.0
+    assert limiter.get_stats()["throttled"] == 1
+
+    # Requests larger than the bucket wait for a full bucket, not forever
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=60)
+    assert limiter.acquire(tokens=10_000) < 0.1
+    assert limiter.buckets["tokens"].level == pytest.approx(0, abs=0.1)
+
+
+def test_settle_corrects_estimate():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=1000)
+    limiter.acquire(tokens=600)
+    tokens = limiter.buckets["tokens"]
+    assert tokens.level == pytest.approx(400, abs=1)
+
+    limiter.settle(600, 100)  # Used far less than estimated - give it back
+    assert tokens.level == pytest.approx(900, abs=1)
+    limiter.settle(100, 400)  # Used more - take the difference
+    assert tokens.level == pytest.approx(600, abs=1)
+    limiter.settle(600, 0)    # No usage reported - nothing to correct
+    assert tokens.level == pytest.approx(600, abs=1)
+    limiter.settle(5000, 1)
+    assert tokens.level == tokens.capacity
+
+
+def test_settle_wakes_waiters():
+    limiter = drained(requests_per_minute=0, tokens_per_minute=60)  # Would take minutes
+    threading.Timer(0.1, limiter.settle, args=(600, 50)).start()
+    assert limiter.acquire(tokens=500) < 1.0
+
+
+def test_shared_state_file_is_locked_off_the_event_loop(tmp_path):
+    state_file = str(tmp_path / "limits.json")
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=0, state_file=state_file)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        # Another "process" holds the state file lock for 0.3s
+        holder = open(state_file, "a+")
+        fcntl.flock(holder, fcntl.LOCK_EX)
+        threading.Timer(0.3, holder.close).start()
+
+        ticking = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        await limiter.acquire_async()
+        elapsed = time.perf_counter() - started
+        ticking.cancel()
+        return ticks, elapsed
+
+    ticks, elapsed = asyncio.run(main())
+    assert elapsed >= 0.25
+    assert ticks >= 10  # The loop kept running while acquire waited on the lock
+
+    with open(state_file) as f:
+        assert '"requests"' in f.read()
+
+
+class Interrupted(BaseException):
+    pass
+
+
+def test_interrupted_waiter_leaves_the_queue():
+    limiter = drained(requests_per_minute=600, tokens_per_minute=0)  # One request per 0.1s
+    wait = limiter._cond.wait
+
+    def interrupted_wait(timeout=None):
+        limiter._cond.wait = wait
+        raise KeyboardInterrupt
+
+    limiter._cond.wait = interrupted_wait
+    with pytest.raises(KeyboardInterrupt):
+        limiter.acquire()
+
+    # The next caller is first in line, not stuck behind the abandoned ticket
+    waited = []
+    worker = threading.Thread(target=lambda: waited.append(limiter.acquire()), daemon=True)
+    worker.start()
+    worker.join(2.0)
+    assert waited and waited[0] < 1.0
+    assert limiter.get_stats()["queue_depth"] == 0
+
+
+def test_interrupted_async_waiter_leaves_the_queue():
+    limiter = drained(requests_per_minute=600, tokens_per_minute=0)
+    poll = limiter._poll
+
+    def interrupted_poll(ticket, tokens):
+        limiter._poll = poll
+        raise Interrupted
+
+    limiter._poll = interrupted_poll
+
+    async def main():
+        with pytest.raises(Interrupted):
+            await limiter.acquire_async()
+        return await asyncio.wait_for(limiter.acquire_async(), 2.0)
+
+    assert asyncio.run(main()) < 1.0
+    assert limiter.get_stats()["queue_depth"] == 0
@@ -0,0 +1,128 @@
+# test_registry.py
+
+import json
+
+import pytest
+
+import tools  # Registers the built-in tools
+from registry import ToolRegistry, build_parameters, registry, validate_arguments
+
+
+def call(name, arguments):
+    if not isinstance(arguments, str):
+        arguments = json.dumps(arguments)
+    return {"id": "call_0", "type": "function", "function": {"name": name, "arguments": arguments}}
+
+
+@pytest.fixture
+def local():
+    """Private registry with one tool of every parameter type"""
+    local = ToolRegistry()
+
+    @local.tool("Echo its arguments", params={"text": "Text to echo"})
+    def echo(text: str, count: int = 1, scale: float = 1.0, loud: bool = False,
+             tags: list[str] = None, options: dict = None) -> str:
+        return json.dumps([text, count, scale, loud, tags, options])
+
+    return local
+
+
+def test_parameters_from_signature(local):
+    assert local.get("echo").parameters == {
+        "type": "object",
+        "properties": {
+            "text": {"type": "string", "description": "Text to echo"},
+            "count": {"type": "integer", "default": 1},
+            "scale": {"type": "number", "default": 1.0},
+            "loud": {"type": "boolean", "default": False},
+            "tags": {"type": "array", "items": {"type": "string"}},
+            "options": {"type": "object"}
+        },
+        "required": ["text"]
+    }
+
+
+def test_builtin_tool_schemas():
+    assert set(registry.names()) >= {
+        "calculate", "get_current_time", "days_between", "count_words", "web_search",
+        "get_weather", "url_content", "list_files", "read_file", "read_files", "file_info_many"
+    }
+    assert registry.function_defs == [registry.get(name).schema for name in registry.names()]
+
+    assert registry.get("get_current_time").parameters == {"type": "object", "properties": {}, "required": []}
+    assert registry.get("days_between").parameters["required"] == ["date1", "date2"]
+
+    calculate = registry.get("calculate").schema["function"]
+    assert calculate["name"] == "calculate"
+    assert calculate["parameters"]["required"] == ["expression"]
+    assert calculate["parameters"]["properties"]["mode"]["default"] == "auto"
+    assert calculate["parameters"]["properties"]["values"] == {
+        "type": "array", "items": {"type": "number"},
+        "description": "Evaluate the expression for each of these values of x"
+    }
+    # None defaults are optional but not advertised
+    assert "default" not in calculate["parameters"]["properties"]["values"]
+
+    read_files = registry.get("read_files").parameters
+    assert read_files["required"] == []
+    assert read_files["properties"]["filenames"]["items"] == {"type": "string"}
+    assert read_files["properties"]["max_chars"]["type"] == "integer"
+
+
+def test_missing_required_argument(local):
+    assert local.dispatch(call("echo", {"count": 2})) == "Error: invalid arguments for echo: missing text"
+    assert local.dispatch(call("echo", "")) == "Error: invalid arguments for echo: missing text"
+
+
+def test_unknown_tool_and_bad_json(local):
+    assert local.dispatch(call("nope", {})) == "Unknown tool: nope"
+    assert local.dispatch(call("echo", '{"text": ')).startswith("Error: invalid JSON arguments for echo")
+    assert local.dispatch(call("echo", "[1, 2]")) == "Error: invalid arguments for echo: arguments must be a JSON object"
+
+
+def test_unknown_arguments_are_dropped(local):
+    spec, args = local.parse_call(call("echo", {"text": "hi", "volume": 11}))
+    assert spec is local.get("echo")
+    assert args == {"text": "hi"}
+    assert json.loads(local.dispatch(call("echo", {"text": "hi", "volume": 11}))) == ["hi", 1, 1.0, False, None, None]
+
+
+@pytest.mark.parametrize("arguments, error", [
+    ({"text": 5}, "text must be a string"),
+    ({"text": "hi", "count": "2"}, "count must be an integer"),
+    ({"text": "hi", "count": 2.5}, "count must be an integer"),
+    ({"text": "hi", "count": True}, "count must be an integer"),
+    ({"text": "hi", "scale": "1.5"}, "scale must be a number"),
+    ({"text": "hi", "scale": False}, "scale must be a number"),
+    ({"text": "hi", "loud": "yes"}, "loud must be a boolean"),
+    ({"text": "hi", "loud": 1}, "loud must be a boolean"),
+    ({"text": "hi", "tags": "a,b"}, "tags must be an array"),
+    ({"text": "hi", "tags": ["a", 2]}, "tags must be an array of strings"),
+    ({"text": "hi", "options": []}, "options must be an object"),
+])
+def test_type_checks_reject_without_coercing(local, arguments, error):
+    # Strings are never converted to numbers and bools never pass as numbers,
+    # so the model gets told instead of the tool running on a guess
+    assert local.dispatch(call("echo", arguments)) == f"Error: invalid arguments for echo: {error}"
+
+
+def test_integers_are_accepted_as_numbers(local):
+    result = local.dispatch(call("echo", {"text": "hi", "scale": 2, "tags": [], "options": {"a": 1}}))
+    assert json.loads(result) == ["hi", 1, 2, False, [], {"a": 1}]
+    assert validate_arguments(registry.get("calculate").parameters, {"expression": "x", "values": [1, 2.5]}) is None
+
+
+def test_dispatch_runs_builtin_tools():
+    assert registry.dispatch(call("count_words", {"text": "one two three"})) == "3 words"
+    assert registry.dispatch(call("calculate", {"expression": "2 + 3 * 4"})) == "14"
+
+
+def test_reregistering_replaces_the_schema(local):
+    @local.tool("Second echo", name="echo")
+    def echo_again(text: str) -> str:
+        return text
+
+    assert len(local.function_defs) == 1
+    assert local.function_defs[0]["function"]["description"] == "Second echo"
+    assert local.catalog() == ["echo - Second echo"]
+    assert build_parameters(echo_again, {})["properties"] == {"text": {"type": "string"}}
@@ -0,0 +1,81 @@
+# test_response_cache.py
+
+import copy
+
+import pytest
+
+from registry import registry
+from response_cache import ResponseCache
+import tools  # Registers the built-in tools
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(enabled=True)
+
+
+def payload(prompt, tool_defs=None, history=()):
+    return {
+        "model": "test-model",
+        "messages": [{"role": "system", "content": "You are a test agent."}, *history,
+                     {"role": "user", "content": prompt}],
+        "tools": tool_defs if tool_defs is not None else registry.function_defs,
+        "tool_choice": "auto"
+    }
+
+
+def reply(content):
+    return {"role": "assistant", "content": content}
+
+
+def time_call():
+    return {"role": "assistant", "content": None, "tool_calls": [
+        {"id": "call_0", "type": "function", "function": {"name": "get_current_time", "arguments": "{}"}}
+    ]}
+
+
+def test_repeat_prompt_is_served_from_cache(cache):
+    cache.put(payload("What is the capital of France?"), reply("Paris."), latency=0.8)
+    assert cache.get(payload("  what is the capital of france ")) == reply("Paris.")
+    assert cache.get(payload("What is the capital of Spain?")) is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_schema_change_with_same_tool_count_misses(cache):
+    tool_defs = copy.deepcopy(registry.function_defs)
+    cache.put(payload("Summarize this page", tool_defs), reply("Old answer."), latency=0.5)
+    assert cache.get(payload("Summarize this page", tool_defs)) == reply("Old answer.")
+
+    # Same number of tools, different description
+    tool_defs[0]["function"]["description"] += " Now with more detail."
+    assert cache.get(payload("Summarize this page", tool_defs)) is None
+
+    # Same number of tools, different parameters
+    tool_defs = copy.deepcopy(registry.function_defs)
+    tool_defs[0]["function"]["parameters"]["properties"]["extra"] = {"type": "string"}
+    assert cache.get(payload("Summarize this page", tool_defs)) is None
+
+
+def test_time_sensitive_tools_bypass_the_cache(cache):
+    assert registry.get("get_current_time").time_sensitive
+
+    # A reply that calls get_current_time is never stored
+    cache.put(payload("What time is it?"), time_call(), latency=0.5)
+    assert cache.get(payload("What time is it?")) is None
+    assert cache.get_stats()["stores"] == 0
+
+    # Nor is anything answered from a context that used it
+    history = [{"role": "user", "content": "What time is it?"}, time_call(),
+               {"role": "tool", "tool_call_id": "call_0", "content": "2026-01-01 12:00:00"}]
+    cache.put(payload("And in an hour?", history=history), reply("13:00."), latency=0.5)
+    assert cache.get(payload("And in an hour?", history=history)) is None
+    assert cache.get_stats()["bypassed"] == 1
+    assert cache.get_stats()["stores"] == 0
+
+
+def test_disabled_cache_never_stores():
+    cache = ResponseCache(enabled=False)
+    cache.put(payload("hi"), reply("Hello!"), latency=0.1)
+    assert cache.get(payload("hi")) is None
+    assert cache.get_stats()["entries"] == 0
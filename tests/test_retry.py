@@ -0,0 +1,204 @@
+# test_retry.py
+
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+import pytest
+
+import retry
+from retry import CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retry, parse_duration, server_delay
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(retry, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    """Backoff always takes the top of its jitter range"""
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: high)
+
+
+def scripted(*outcomes):
+    """send() returning (or raising) each outcome in turn; .calls counts them"""
+    outcomes = list(outcomes)
+
+    def send():
+        send.calls += 1
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    send.calls = 0
+    return send
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("2m59.56s", 179.56),
+    ("7.66s", 7.66),
+    ("250ms", 0.25),
+    ("1h2m", 3720.0),
+    ("3", 3.0),
+    (" 1.5 ", 1.5),
+    ("", None),
+    (None, None),
+    ("soon", None),
+])
+def test_parse_duration(value, seconds):
+    result = parse_duration(value)
+    if seconds is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(seconds)
+
+
+def test_server_delay(clock):
+    assert server_delay({"Retry-After": "4"}) == 4.0
+    later = datetime.fromtimestamp(clock.now + 30, tz=timezone.utc)
+    assert server_delay({"Retry-After": format_datetime(later, usegmt=True)}) == pytest.approx(30, abs=1)
+    assert server_delay({"Retry-After": "-5"}) == 0.0
+    # Retry-After wins over Groq's reset headers; otherwise the longest reset
+    headers = {"x-ratelimit-reset-requests": "2s", "x-ratelimit-reset-tokens": "7.5s"}
+    assert server_delay(headers) == 7.5
+    assert server_delay(dict(headers, **{"Retry-After": "1"})) == 1.0
+    assert server_delay({}) is None
+
+
+def test_retry_after_takes_precedence_over_backoff(no_jitter):
+    sleeps = []
+    send = scripted(FakeResponse(429, {"Retry-After": "3"}), FakeResponse(200))
+    policy = RetryPolicy(max_attempts=3, base_delay=0.5)
+
+    response = call_with_retry(send, policy, sleep=sleeps.append)
+    assert response.status_code == 200
+    assert sleeps == [3.5]  # 3s asked for plus up to base_delay of jitter
+
+
+def test_exponential_backoff_without_server_delay(no_jitter):
+    sleeps = []
+    failures = [FakeResponse(503) for _ in range(3)]
+    policy = RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=1.5)
+
+    response = call_with_retry(scripted(*failures, FakeResponse(200)), policy, sleep=sleeps.append)
+    assert response.status_code == 200
+    assert sleeps == [0.5, 1.0, 1.5]  # Doubling, capped at max_delay
+    assert all(failure.closed for failure in failures)
+
+
+def test_gives_up_when_server_asks_too_long():
+    sleeps = []
+    too_long = FakeResponse(429, {"Retry-After": "120"})
+    send = scripted(too_long, FakeResponse(200))
+
+    assert call_with_retry(send, RetryPolicy(max_server_delay=60), sleep=sleeps.append) is too_long
+    assert send.calls == 1
+    assert sleeps == []
+    assert not too_long.closed  # Handed back to the caller to report
+
+
+def test_client_errors_are_not_retried():
+    bad_request = FakeResponse(400)
+    send = scripted(bad_request, FakeResponse(200))
+    assert call_with_retry(send, RetryPolicy(), sleep=lambda s: None) is bad_request
+    assert send.calls == 1
+
+
+def test_exhausted_connection_errors_are_raised():
+    send = scripted(ConnectionError("reset"), ConnectionError("reset"), ConnectionError("reset"))
+    with pytest.raises(ConnectionError):
+        call_with_retry(send, RetryPolicy(max_attempts=3), sleep=lambda s: None)
+    assert send.calls == 3
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure("server")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 10
+    breaker.before_call()  # The single trial request
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # Everyone else waits on the trial
+
+    breaker.record_success()
+    assert breaker.get_stats() == {"state": "closed", "consecutive_failures": 0, "times_opened": 1}
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_breaker(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10)
+    breaker.record_failure("timeout")
+    breaker.record_failure("connection")
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_failure("server")
+
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+    clock.now += 9
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 1
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_rate_limit_and_client_failures_never_open_breaker(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10)
+    for category in ("rate_limit", "client") * 5:
+        breaker.record_failure(category)
+    assert breaker.state == "closed"
+
+    # They also reset the run of real failures
+    breaker.record_failure("server")
+    breaker.record_failure("rate_limit")
+    breaker.record_failure("server")
+    assert breaker.state == "closed"
+
+    # And a trial answered with 429 shows the service is back up
+    breaker.record_failure("server")
+    assert breaker.state == "open"
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_failure("rate_limit")
+    assert breaker.state == "closed"
+
+
+def test_open_breaker_fails_fast_without_sending(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10)
+    send = scripted(FakeResponse(500))
+    assert call_with_retry(send, RetryPolicy(max_attempts=1), breaker).status_code == 500
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(send, RetryPolicy(max_attempts=1), breaker)
+    assert send.calls == 1
@@ -0,0 +1,184 @@
+# test_tracing.py
+
+import json
+import threading
+
+import pytest
+
+import tracing
+from tracing import Tracer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+    def time(self):
+        return 1_700_000_000.0 + self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(tracing, "time", clock)
+    return clock
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def read_chrome(path):
+    with open(path, encoding="utf-8") as f:
+        return json.loads(f.read() + "]")
+
+
+def test_nested_spans_export_with_parent_and_trace_ids(tmp_path, clock):
+    path = str(tmp_path / "traces" / "spans.jsonl")
+    tracer = Tracer(path=path)
+    with tracer.span("turn", mode="sync") as turn:
+        clock.now += 0.010
+        with tracer.span("llm") as llm:
+            clock.now += 0.250
+            llm.set(status=200)
+        with pytest.raises(ValueError):
+            with tracer.span("tool.fail"):
+                raise ValueError("boom")
+
+        # A tool on another thread continues the trace through parent=
+        def tool():
+            with tracer.span("tool.calc", parent=turn):
+                clock.now += 0.005
+        worker = threading.Thread(target=tool)
+        worker.start()
+        worker.join()
+    tracer.close()
+    assert tracer.current() is None
+
+    records = {r["name"]: r for r in read_jsonl(path)}
+    assert list(records) == ["llm", "tool.fail", "tool.calc", "turn"]  # Written as they finish
+    root = records["turn"]
+    assert root["parent_id"] is None and root["trace_id"] == root["span_id"]
+    assert root["mode"] == "sync"
+    assert root["duration_ms"] == pytest.approx(265)
+    assert root["start"] == pytest.approx(1_700_000_100.0)
+    for name in ("llm", "tool.fail", "tool.calc"):
+        assert records[name]["parent_id"] == root["span_id"]
+        assert records[name]["trace_id"] == root["trace_id"]
+    assert records["llm"]["status"] == 200 and records["llm"]["duration_ms"] == pytest.approx(250)
+    assert records["tool.fail"]["error"] == "ValueError: boom"
+    assert records["tool.calc"]["thread"] != root["thread"]
+
+
+def test_sampling_keeps_or_drops_whole_turns(tmp_path, clock, monkeypatch):
+    path = str(tmp_path / "spans.jsonl")
+    tracer = Tracer(path=path, sample_rate=0.5)
+    draws = iter([0.1, 0.9, 0.2])  # Kept, dropped, kept - drawn once per root span
+    monkeypatch.setattr(tracing.random, "random", lambda: next(draws))
+    for turn in range(3):
+        with tracer.span("turn", n=turn):
+            with tracer.span("llm"):
+                with tracer.span("llm.decode"):
+                    pass
+    tracer.close()
+
+    records = read_jsonl(path)
+    assert [r["n"] for r in records if r["name"] == "turn"] == [0, 2]
+    assert len(records) == 6
+    traces = {r["trace_id"] for r in records}
+    assert all(sum(r["trace_id"] == t for r in records) == 3 for t in traces)
+    # Dropped turns still count in the stats
+    assert tracer.get_stats()["llm"]["count"] == 3
+
+
+def test_no_export_without_path(tmp_path, clock):
+    tracer = Tracer()
+    with tracer.span("turn") as span:
+        assert not span.sampled
+    assert tracer.get_stats()["turn"]["count"] == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_chrome_file_loads_as_json_after_closing_bracket(tmp_path, clock):
+    path = str(tmp_path / "trace.json")
+    tracer = Tracer(path=path)
+    with tracer.span("turn"):
+        clock.now += 0.002
+        tracer.add_span("llm.ttft", clock.now - 0.001, clock.now, tokens=3)
+    tracer.close()
+
+    events = read_chrome(path)
+    assert [e["name"] for e in events] == ["llm.ttft", "turn"]
+    ttft, turn = events
+    assert ttft["ph"] == "X" and ttft["cat"] == "tasktrek"
+    assert ttft["dur"] == pytest.approx(1000) and turn["dur"] == pytest.approx(2000)
+    assert ttft["ts"] == pytest.approx(1000)  # us since the tracer started
+    assert ttft["args"] == {"tokens": 3, "trace_id": turn["args"]["trace_id"]}
+
+    # A later session appends to the same array
+    tracer = Tracer(path=path)
+    with tracer.span("second"):
+        pass
+    tracer.close()
+    assert [e["name"] for e in read_chrome(path)] == ["llm.ttft", "turn", "second"]
+
+    # Even if the earlier session wrote no events
+    empty = str(tmp_path / "empty.json")
+    with open(empty, "w") as f:
+        f.write("[\n")
+    tracer = Tracer(path=empty)
+    with tracer.span("only"):
+        pass
+    tracer.close()
+    assert [e["name"] for e in read_chrome(empty)] == ["only"]
+
+
+def record(tracer, name, durations_ms):
+    for ms in durations_ms:
+        tracer.add_span(name, 0.0, ms / 1000)
+
+
+def test_percentiles_over_known_durations(clock):
+    tracer = Tracer()
+    record(tracer, "llm", range(1, 101))  # 1..100 ms
+    record(tracer, "tool", [7.0])
+    assert tracer.get_stats() == {
+        "llm": {"count": 100, "p50_ms": 50.0, "p95_ms": 95.0, "p99_ms": 99.0, "max_ms": 100.0},
+        "tool": {"count": 1, "p50_ms": 7.0, "p95_ms": 7.0, "p99_ms": 7.0, "max_ms": 7.0},
+    }
+
+
+def test_stats_window_is_rolling(clock):
+    tracer = Tracer(window=10)
+    record(tracer, "llm", range(1, 101))
+    assert tracer.get_stats()["llm"]["count"] == 10
+    assert tracer.get_stats()["llm"]["p50_ms"] == 95.0
+    tracer.reset_stats()
+    assert tracer.get_stats() == {}
+
+
+def test_histogram_buckets(clock):
+    tracer = Tracer()
+    record(tracer, "llm", [0.5, 1, 4.9, 7, 99, 100, 6000, 6000])
+    assert dict(tracer.histogram("llm")) == {
+        "<1ms": 1, "<5ms": 2, "<10ms": 1, "<50ms": 0, "<100ms": 1, "<250ms": 1,
+        "<500ms": 0, "<1000ms": 0, "<2500ms": 0, "<5000ms": 0, ">=5000ms": 2,
+    }
+    assert all(count == 0 for _, count in tracer.histogram("missing"))
+
+
+def test_format_stats(tmp_path, clock):
+    tracer = Tracer()
+    assert tracer.format_stats() == "No spans recorded yet."
+    record(tracer, "llm", [2, 3, 3, 3, 700])
+    assert tracer.format_stats(width=6).splitlines() == [
+        "llm: n=5 p50=3.0ms p95=700.0ms p99=700.0ms max=700.0ms",
+        "       <5ms ###### 4",
+        "    <1000ms ## 1",
+    ]
+    tracer.configure(path=str(tmp_path / "t.jsonl"), sample_rate=0.25)
+    assert tracer.format_stats().endswith(f"Exporting jsonl traces to {tmp_path / 't.jsonl'} (sample rate 0.25)")
@@ -0,0 +1,76 @@
+# test_workspace.py
+
+import re
+
+import pytest
+
+from workspace import WorkspaceIndex, required_literals
+
+
+@pytest.mark.parametrize("pattern, literals", [
+    ("hello world", ["hello world"]),
+    (r"foo\.bar\(", ["foo.bar("]),
+    ("hello+world", ["hello", "world"]),
+    ("abcd?ef", ["abc"]),
+    ("colou*rful", ["colo", "rful"]),
+    ("^start.*end$", ["start", "end"]),
+    # Classes break the run, and their quantifier is skipped whole
+    ("[a-z]{120}", []),
+    ("abc[a-z]{2,3}def", ["abc", "def"]),
+    ("abcd[0-9]{,3}", ["abcd"]),
+    ("abcd[0-9]+?wxyz", ["abcd", "wxyz"]),
+    (r"[^]abc]def", ["def"]),
+    (r"[\]abc]xyz", ["xyz"]),
+    ("abcde{3}fgh", ["abcd", "fgh"]),
+    # A brace that isn't a quantifier is literal to re - the run is broken, not skipped
+    ("abcd{x|yyyy}efgh", []),
+    ("abcd{}efgh", ["abc", "efgh"]),
+    # Escapes that aren't the character after the backslash
+    (r"\d{3}-\d{4} phone", [" phone"]),
+    (r"tab\there", ["tab", "here"]),
+    (r"\x41BCDE", ["BCDE"]),
+    (r"\N{BULLET}point", ["point"]),
+    (r"(abc)\1defg", []),
+    # Alternation and groups give up
+    ("error|warning", []),
+    ("(?i)needle", []),
+    ("ab", []),
+])
+def test_required_literals(pattern, literals):
+    assert required_literals(pattern) == literals
+    # Every match really contains them
+    for example in ("abcdeeefgh", "x" * 130, "start middle end"):
+        match = re.search(pattern, example)
+        if match:
+            assert all(literal in match.group() for literal in literals)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = tmp_path / "ws"
+    root.mkdir()
+    (root / "letters.txt").write_text("header\n" + "x" * 130 + "\n")
+    (root / "digits.txt").write_text("1234567890\n" * 20)
+    (root / "code.py").write_text("def foo_bar(value):\n    return value * 3\n")
+    index = WorkspaceIndex(str(root), db_path=str(tmp_path / "index.db"))
+    assert index.ready(timeout=10)
+    return index
+
+
+def search(index, pattern, ignore_case=False):
+    results, scanned, skipped, stopped = index.search(pattern, required_literals(pattern), ignore_case)
+    return {path: [line for line, _ in matches] for path, matches in results}, skipped
+
+
+def test_index_never_drops_a_real_match(workspace):
+    for pattern in ("[a-z]{120}", "x{100}", "^[x]{10,}$", r"[^]0-9\n]{120}"):
+        results, _ = search(workspace, pattern)
+        assert results == {"letters.txt": [2]}, pattern
+
+
+def test_index_rules_out_files_without_the_literals(workspace):
+    results, skipped = search(workspace, r"foo_bar\(\w+\)")
+    assert results == {"code.py": [1]}
+    assert skipped == 2
+    results, skipped = search(workspace, "RETURN VALUE", ignore_case=True)
+    assert results == {"code.py": [2]}
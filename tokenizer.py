@@ -0,0 +1,83 @@
+# tokenizer.py
+
+import re
+
+# Chat-format overhead: role/separator tokens around each message, plus the
+# tokens that prime the assistant reply (same accounting OpenAI documents)
+MESSAGE_OVERHEAD = 4
+REPLY_PRIMING = 3
+
+# GPT/Llama-3 style pre-tokenizer split: contractions, letter runs with an
+# optional leading space, digit groups of up to 3, punctuation runs, spaces
+_PRETOKENIZE = re.compile(
+    r"'(?:s|t|re|ve|m|ll|d)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+(?!\S)|\s+",
+    re.IGNORECASE
+)
+
+_encoding = None
+_encoding_checked = False
+
+
+def _get_encoding():
+    """Load tiktoken's cl100k_base encoding if it is installed and available"""
+    global _encoding, _encoding_checked
+    if not _encoding_checked:
+        _encoding_checked = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None  # Not installed or no cached vocab - use the estimator
+    return _encoding
+
+
+def tokenizer_name():
+    return "tiktoken:cl100k_base" if _get_encoding() is not None else "bpe-estimate"
+
+
+def _estimate_piece(piece):
+    """Approximate BPE token count for one pre-tokenized piece"""
+    if piece.isspace():
+        return 1
+    if not piece.isascii():
+        # Non-Latin scripts and emoji usually cost about one token per 1-2 bytes
+        return max(1, len(piece.encode("utf-8")) // 2)
+    word = piece.lstrip(" ")
+    if word.isalpha():
+        # Common English words are single tokens; long ones split every ~4 chars
+        return 1 if len(word) <= 6 else (len(word) + 3) // 4
+    if word.isdigit():
+        return 1
+    return max(1, (len(word) + 1) // 2)
+
+
+def count_tokens(text):
+    """Count tokens in text (tiktoken when available, else a BPE estimate)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(_estimate_piece(piece) for piece in _PRETOKENIZE.findall(text))
+
+
+def count_message_tokens(role, content):
+    """Tokens a single chat message adds to the prompt"""
+    return MESSAGE_OVERHEAD + count_tokens(role) + count_tokens(content)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text down so it fits in roughly max_tokens tokens"""
+    if max_tokens <= 0:
+        return ""
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    # Shrink proportionally, then trim until the estimate fits
+    cut = len(text) * max_tokens // total
+    while cut > 0 and count_tokens(text[:cut]) > max_tokens:
+        cut = cut * 9 // 10
+    return text[:cut]
@@ -1,232 +1,75 @@
-import json
 from datetime import datetime
-import requests
+import http_client
 from urllib.parse import quote
-from bs4 import BeautifulSoup
 import os
+import re
 import stat
+from cache import (
+    TOOL_TTLS, cache_key, conditional_headers, tool_cache, ttl_from_headers
+)
+from extract import CHUNK_SIZE, PageExtractor
+import fileread
+import listing
+import mathexpr
+import multifile
+from workspace import MAX_FILES, MAX_RESULTS, required_literals, workspace_index
+from registry import registry, tool
+from tracing import tracer
 
-function_defs = [
-    {
-        "type": "function",
-        "function": {
-            "name": "calculate",
-            "description": "Evaluate a math expression like '2 + 3 * (4 ** 2)'.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "expression": {
-                        "type": "string",
-                        "description": "The math expression to evaluate"
-                    }
-                },
-                "required": ["expression"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_current_time",
-            "description": "Get the current date and time",
-            "parameters": {
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "days_between",
-            "description": "Calculate the number of days between two dates",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "date1": {
-                        "type": "string",
-                        "description": "First date in YYYY-MM-DD format"
-                    },
-                    "date2": {
-                        "type": "string",
-                        "description": "Second date in YYYY-MM-DD format"
-                    }
-                },
-                "required": ["date1", "date2"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "count_words",
-            "description": "Count the number of words in text",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "text": {
-                        "type": "string",
-                        "description": "The text to count words in"
-                    }
-                },
-                "required": ["text"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "count_characters",
-            "description": "Count the number of characters in text",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "text": {
-                        "type": "string",
-                        "description": "The text to count characters in"
-                    }
-                },
-                "required": ["text"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "count_lines",
-            "description": "Count the number of lines in text",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "text": {
-                        "type": "string",
-                        "description": "The text to count lines in"
-                    }
-                },
-                "required": ["text"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "web_search",
-            "description": "Search the web using DuckDuckGo API",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "The search query"
-                    }
-                },
-                "required": ["query"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_weather",
-            "description": "Get current weather for a city",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "city": {
-                        "type": "string",
-                        "description": "The city name to get weather for"
-                    }
-                },
-                "required": ["city"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "url_content",
-            "description": "Fetch and summarize webpage content",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "url": {
-                        "type": "string",
-                        "description": "The URL to fetch content from"
-                    }
-                },
-                "required": ["url"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "list_files",
-            "description": "List files and directories in a given path",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "directory": {
-                        "type": "string",
-                        "description": "The directory path to list (default: current directory)",
-                        "default": "."
-                    }
-                },
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "read_file",
-            "description": "Read and return contents of a text file",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "filename": {
-                        "type": "string",
-                        "description": "The path to the file to read"
-                    }
-                },
-                "required": ["filename"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "file_info",
-            "description": "Get file information including size, modified date, and type",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "filename": {
-                        "type": "string",
-                        "description": "The path to the file to get information about"
-                    }
-                },
-                "required": ["filename"]
-            }
-        }
-    }
-    # Add more tool definitions here
-]
-
-def calculate(expression: str) -> str:
-    allowed_names = {
-        "__builtins__": None,
-        "abs": abs,
-        "pow": pow,
-        "round": round,
-    }
+@tool("Evaluate a math expression like '2 + 3 * (4 ** 2)' or 'sqrt(2) * sin(pi / 4)' "
+      "(math module functions and constants; '^' means power). To tabulate an expression of x, "
+      "pass values or value_range instead of calling calculate once per value.",
+      params={
+          "expression": "The math expression to evaluate; use x for the variable when passing values/value_range",
+          "mode": "'auto' (exact integers, float division), 'decimal' (50 significant digits) "
+                  "or 'fraction' (exact rational arithmetic, e.g. 1/3 + 1/6 = 1/2)",
+          "values": "Evaluate the expression for each of these values of x",
+          "value_range": "Evaluate for x from start to stop inclusive: 'start:stop' or 'start:stop:step', e.g. '0:1:0.1'"
+      })
+def calculate(expression: str, mode: str = "auto", values: list[float] = None, value_range: str = "") -> str:
+    """Evaluate a whitelisted, size-limited math expression, optionally over many values of x"""
     try:
-        result = eval(expression, allowed_names, {})
-        return str(result)
+        if values is None and not value_range:
+            return _truncate(mathexpr.format_number(mathexpr.evaluate(expression, mode)))
+        points = mathexpr.parse_range(value_range) if value_range else values
+        if not points:
+            return "Error: no values of x given"
+        results, vectorized = mathexpr.evaluate_many(expression, points, mode)
+        return _truncate(_format_sweep(expression, results, vectorized))
+    except ZeroDivisionError:
+        return "Error: division by zero"
     except Exception as e:
         return f"Error: {e}"
 
+def _format_sweep(expression, results, vectorized, show=10):
+    """Table of x -> value; long sweeps get min/max/mean and their first and last rows"""
+    lines = [f"{expression} for {len(results)} values of x" + (" (NumPy)" if vectorized else "") + ":"]
+    numeric = [(x, y) for x, y in results if not isinstance(y, str) and y == y]
+    if len(results) > 2 * show and numeric:
+        low, high = min(numeric, key=lambda r: r[1]), max(numeric, key=lambda r: r[1])
+        mean = sum(float(y) for _, y in numeric) / len(numeric)
+        lines.append(f"min {_short_number(low[1])} at x = {_short_number(low[0])}, "
+                     f"max {_short_number(high[1])} at x = {_short_number(high[0])}, mean {mean:.10g}")
+        failed = len(results) - len(numeric)
+        if failed:
+            lines.append(f"{failed} value(s) were errors or NaN")
+    rows = results if len(results) <= 2 * show else results[:show] + [None] + results[-show:]
+    for row in rows:
+        lines.append(f"  ... {len(results) - 2 * show} more ..." if row is None
+                     else f"  x = {_short_number(row[0])}: {_short_number(row[1])}")
+    return "\n".join(lines)
+
+def _truncate(text, limit=mathexpr.MAX_RESULT_CHARS):
+    if len(text) <= limit:
+        return text
+    return text[:limit] + f"... ({len(text) - limit:,} more characters)"
+
+def _short_number(value):
+    if isinstance(value, float):
+        return f"{value:.10g}"
+    return value if isinstance(value, str) else mathexpr.format_number(value)
+
+@tool("Get the current date and time", time_sensitive=True)
 def get_current_time() -> str:
     """Get current date and time"""
     try:
@@ -235,6 +78,8 @@ def get_current_time() -> str:
     except Exception as e:
         return f"Error getting time: {e}"
 
+@tool("Calculate the number of days between two dates",
+      params={"date1": "First date in YYYY-MM-DD format", "date2": "Second date in YYYY-MM-DD format"})
 def days_between(date1: str, date2: str) -> str:
     """Calculate days between two dates (YYYY-MM-DD format)"""
     try:
@@ -245,6 +90,7 @@ def days_between(date1: str, date2: str) -> str:
     except Exception as e:
         return f"Error: {e}. Please use YYYY-MM-DD format (e.g., 2025-01-23)"
 
+@tool("Count the number of words in text", params={"text": "The text to count words in"})
 def count_words(text: str) -> str:
     """Count the number of words in text"""
     try:
@@ -253,6 +99,7 @@ def count_words(text: str) -> str:
     except Exception as e:
         return f"Error counting words: {e}"
 
+@tool("Count the number of characters in text", params={"text": "The text to count characters in"})
 def count_characters(text: str) -> str:
     """Count the number of characters in text"""
     try:
@@ -261,6 +108,7 @@ def count_characters(text: str) -> str:
     except Exception as e:
         return f"Error counting characters: {e}"
 
+@tool("Count the number of lines in text", params={"text": "The text to count lines in"})
 def count_lines(text: str) -> str:
     """Count the number of lines in text"""
     try:
@@ -269,102 +117,164 @@ def count_lines(text: str) -> str:
     except Exception as e:
         return f"Error counting lines: {e}"
 
+# Public API endpoints (overridable, e.g. to point at the benchmark stubs)
+WEB_SEARCH_URL = os.getenv("TASKTREK_WEB_SEARCH_URL", "https://api.duckduckgo.com/")
+WEATHER_URL = os.getenv("TASKTREK_WEATHER_URL", "https://wttr.in")
+
+def _web_search_url(query: str) -> str:
+    # Using DuckDuckGo Instant Answer API (free, no API key needed)
+    encoded_query = quote(query)
+    return f"{WEB_SEARCH_URL}?q={encoded_query}&format=json&no_html=1&skip_disambig=1"
+
+def _format_web_search(query: str, data: dict) -> str:
+    # Try to get instant answer first
+    if data.get('AbstractText'):
+        return f"Search result for '{query}': {data['AbstractText'][:500]}..."
+    elif data.get('Answer'):
+        return f"Answer for '{query}': {data['Answer']}"
+    elif data.get('Definition'):
+        return f"Definition of '{query}': {data['Definition']}"
+    else:
+        return f"No detailed results found for '{query}'. Try a more specific search."
+
+@tool("Search the web using DuckDuckGo API", params={"query": "The search query"},
+      cache="ttl", max_concurrency=2)
 def web_search(query: str) -> str:
     """Search the web using DuckDuckGo API"""
     try:
-        # Using DuckDuckGo Instant Answer API (free, no API key needed)
-        encoded_query = quote(query)
-        url = f"https://api.duckduckgo.com/?q={encoded_query}&format=json&no_html=1&skip_disambig=1"
-        
-        response = requests.get(url, timeout=10)
+        response = http_client.get(_web_search_url(query))
         response.raise_for_status()
         
-        data = response.json()
-        
-        # Try to get instant answer first
-        if data.get('AbstractText'):
-            return f"Search result for '{query}': {data['AbstractText'][:500]}..."
-        elif data.get('Answer'):
-            return f"Answer for '{query}': {data['Answer']}"
-        elif data.get('Definition'):
-            return f"Definition of '{query}': {data['Definition']}"
-        else:
-            return f"No detailed results found for '{query}'. Try a more specific search."
+        return _format_web_search(query, response.json())
             
     except Exception as e:
         return f"Error searching web: {e}"
 
+def _weather_url(city: str) -> str:
+    # Using wttr.in API (free, no API key needed)
+    return f"{WEATHER_URL}/{quote(city)}?format=j1"
+
+def _format_weather(city: str, data: dict) -> str:
+    current = data['current_condition'][0]
+    
+    temp_c = current['temp_C']
+    temp_f = current['temp_F']
+    desc = current['weatherDesc'][0]['value']
+    humidity = current['humidity']
+    
+    return f"Weather in {city}: {desc}, {temp_c}°C ({temp_f}°F), Humidity: {humidity}%"
+
+@tool("Get current weather for a city", params={"city": "The city name to get weather for"},
+      cache="ttl", max_concurrency=4)
 def get_weather(city: str) -> str:
     """Get current weather for a city"""
     try:
-        # Using wttr.in API (free, no API key needed)
-        url = f"https://wttr.in/{quote(city)}?format=j1"
-        
-        response = requests.get(url, timeout=10)
+        response = http_client.get(_weather_url(city))
         response.raise_for_status()
         
-        data = response.json()
-        current = data['current_condition'][0]
-        
-        temp_c = current['temp_C']
-        temp_f = current['temp_F']
-        desc = current['weatherDesc'][0]['value']
-        humidity = current['humidity']
-        
-        return f"Weather in {city}: {desc}, {temp_c}°C ({temp_f}°F), Humidity: {humidity}%"
+        return _format_weather(city, response.json())
         
     except Exception as e:
         return f"Error getting weather for {city}: {e}"
 
-def url_content(url: str) -> str:
-    """Fetch and summarize webpage content using BeautifulSoup for clean extraction"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
+URL_CONTENT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def _read_page(url: str, response) -> str:
+    """Stream a page through PageExtractor until the byte cap or enough main text"""
+    extractor = PageExtractor(response.headers.get("Content-Type"))
+    with tracer.span("http.tool.body") as span:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if extractor.feed(chunk):
+                break
+        span.set(bytes=extractor.bytes_read, truncated=extractor.truncated)
+    return extractor.summary(url)
+
+def _url_cache_lookup(url: str):
+    """Fresh cached summary, or (key, request headers) to fetch/revalidate with"""
+    key = cache_key("url_content", url, case_sensitive=True)
+    cached = tool_cache.get(key)
+    if cached is not None:
+        return key, cached, None
+    headers = dict(URL_CONTENT_HEADERS, **conditional_headers(tool_cache.lookup(key)))
+    return key, None, headers
+
+def _url_cache_store(key: str, response_headers, result: str) -> None:
+    """Cache a page summary honoring Cache-Control and keeping ETag/Last-Modified"""
+    ttl = ttl_from_headers(response_headers, TOOL_TTLS["url_content"])
+    if ttl is None or result.startswith("Error"):
+        return
+    tool_cache.set(
+        key, result, ttl,
+        etag=response_headers.get("ETag"),
+        last_modified=response_headers.get("Last-Modified")
+    )
+
+def _fetch_page(url: str, key: str, headers: dict):
+    """GET and summarize a page; None if it answered 304 but the cached entry is gone"""
+    with http_client.get(url, headers=headers, stream=True) as response:
+        if response.status_code == 304:
+            # Page unchanged since we cached it
+            return tool_cache.refresh(key, ttl_from_headers(response.headers, TOOL_TTLS["url_content"]) or 0)
         response.raise_for_status()
         
-        # Parse HTML with BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove unwanted elements (scripts, styles, navigation, ads, etc.)
-        for element in soup(['script', 'style', 'nav', 'footer', 'aside', 'header', 'noscript']):
-            element.decompose()
-        
-        # Remove common ad/tracking classes and IDs
-        for element in soup.find_all(attrs={'class': ['ad', 'advertisement', 'sidebar', 'menu', 'navigation']}):
-            element.decompose()
-        
-        # Try to find main content area (prioritize semantic HTML)
-        main_content = (
-            soup.find('article') or 
-            soup.find('main') or 
-            soup.find('div', {'class': ['content', 'main-content', 'post-content']}) or
-            soup.find('body')
-        )
-        
-        if not main_content:
-            return f"Error: Could not find main content in {url}"
-        
-        # Extract clean text with proper spacing
-        text_content = main_content.get_text(separator=' ', strip=True)
-        
-        # Clean up extra whitespace
-        import re
-        text_content = re.sub(r'\s+', ' ', text_content).strip()
-        
-        # Return summary
-        if len(text_content) > 500:
-            return f"Content from {url}: {text_content[:500]}..."
-        else:
-            return f"Content from {url}: {text_content}"
+        result = _read_page(url, response)
+    _url_cache_store(key, response.headers, result)
+    return result
+
+@tool("Fetch and summarize webpage content", params={"url": "The URL to fetch content from"},
+      cache="http", max_concurrency=4)
+def url_content(url: str) -> str:
+    """Fetch and summarize webpage content, reading only as much of it as needed"""
+    try:
+        key, cached, headers = _url_cache_lookup(url)
+        if cached is not None:
+            return cached
+        
+        result = _fetch_page(url, key, headers)
+        if result is None:
+            # The entry was evicted before the 304 came back - fetch the page unconditionally
+            result = _fetch_page(url, key, URL_CONTENT_HEADERS)
+        if result is None:
+            raise ValueError("server answered 304 Not Modified to an unconditional request")
+        return result
             
     except Exception as e:
         return f"Error fetching content from {url}: {e}"
 
-def list_files(directory: str = ".") -> str:
+def _format_size(size: int) -> str:
+    """Human-readable file size"""
+    if size < 1024:
+        return f"{size} bytes"
+    elif size < 1024 * 1024:
+        return f"{size/1024:.1f} KB"
+    elif size < 1024 * 1024 * 1024:
+        return f"{size/(1024*1024):.1f} MB"
+    else:
+        return f"{size/(1024*1024*1024):.1f} GB"
+
+def _short_size(size: int) -> str:
+    """Compact size for listing entries"""
+    if size < 1024:
+        return f"{size}B"
+    elif size < 1024 * 1024:
+        return f"{size//1024}KB"
+    else:
+        return f"{size//(1024*1024)}MB"
+
+@tool("List files and directories in a path, optionally recursive, filtered by a glob and sorted. "
+      "Large listings are paged: pass the returned cursor to get the next page.",
+      params={
+          "directory": "The directory path to list (default: current directory)",
+          "depth": f"Levels to descend (1 = this directory only, at most {listing.MAX_DEPTH})",
+          "pattern": "Glob filter on file names, e.g. '*.py' (matched against the relative path if it contains '/')",
+          "sort": "Sort order: 'name', 'size' (largest first) or 'modified' (newest first)",
+          "limit": f"Entries per page (at most {listing.MAX_PAGE_SIZE})",
+          "cursor": "Cursor from a previous call's output to get the next page"
+      })
+def list_files(directory: str = ".", depth: int = 1, pattern: str = "", sort: str = "name",
+               limit: int = listing.PAGE_SIZE, cursor: str = "") -> str:
     """List files and directories in a given path"""
     try:
         # Security: Resolve path and check if it exists
@@ -375,66 +285,200 @@ def list_files(directory: str = ".") -> str:
         if not os.path.isdir(abs_path):
             return f"Error: '{directory}' is not a directory"
         
-        # Get directory contents
-        items = []
-        for item in sorted(os.listdir(abs_path)):
-            item_path = os.path.join(abs_path, item)
-            if os.path.isdir(item_path):
-                items.append(f"📁 {item}/")
-            else:
-                # Get file size
-                size = os.path.getsize(item_path)
-                if size < 1024:
-                    size_str = f"{size}B"
-                elif size < 1024 * 1024:
-                    size_str = f"{size//1024}KB"
-                else:
-                    size_str = f"{size//(1024*1024)}MB"
-                items.append(f"📄 {item} ({size_str})")
-        
-        if not items:
+        if sort not in listing.SORT_KEYS:
+            return f"Error: sort must be one of {', '.join(listing.SORT_KEYS)}"
+        depth = max(1, min(depth, listing.MAX_DEPTH))
+        limit = max(1, min(limit, listing.MAX_PAGE_SIZE))
+        args = (abs_path, depth, pattern, sort)
+        
+        # Cached per directory mtime - paging through a listing re-stats, not re-scans
+        result = listing.get_listing(abs_path, depth, pattern or None, sort)
+        try:
+            offset = listing.parse_cursor(cursor, *args, version=result.version) if cursor else 0
+        except ValueError as e:
+            return f"Error: {e}"
+        entries = result.entries
+        if not entries:
+            if pattern:
+                return f"No files in '{directory}' match '{pattern}'"
             return f"Directory '{directory}' is empty"
         
-        return f"Contents of '{directory}':\n" + "\n".join(items)
+        dirs, files, total, extensions = result.dirs, result.files, result.total_size, result.extensions
+        page = entries[offset:offset + limit]
+        
+        items = []
+        for entry in page:
+            if entry.is_dir:
+                items.append(f"📁 {entry.path}/")
+            else:
+                items.append(f"📄 {entry.path} ({_short_size(entry.size or 0)})")
+        
+        header = f"Contents of '{directory}'"
+        if depth > 1 or pattern:
+            header += f" (depth {depth}" + (f", matching '{pattern}'" if pattern else "") + ")"
+        lines = [f"{header}: {dirs} directories, {files} files, {_format_size(total)}"]
+        if files and (len(entries) > limit or depth > 1):
+            lines.append("By extension: " + ", ".join(
+                f"{ext} {count} ({_format_size(size)})" for ext, count, size in extensions))
+        if not result.complete:
+            lines.append(f"(stopped after {len(entries)} entries - use a pattern or smaller depth)")
+        lines.extend(items or [f"(no entries past position {offset})"])
+        if offset + limit < len(entries):
+            next_cursor = listing.make_cursor(offset + limit, *args, version=result.version)
+            lines.append(f"Showing {offset + 1}-{offset + len(page)} of {len(entries)}. "
+                         f"Next page: cursor='{next_cursor}'")
+        return "\n".join(lines)
         
     except PermissionError:
         return f"Error: Permission denied accessing '{directory}'"
     except Exception as e:
         return f"Error listing files in '{directory}': {e}"
 
+def _check_file(filename: str):
+    """(absolute path, None) for an existing file, else (None, error message)"""
+    # Security: Resolve path and check if it exists
+    abs_path = os.path.abspath(filename)
+    if not os.path.exists(abs_path):
+        return None, f"Error: File '{filename}' does not exist"
+    if not os.path.isfile(abs_path):
+        return None, f"Error: '{filename}' is not a file"
+    return abs_path, None
+
+@tool("Read and return the contents of a text file (large files: the first 1000 characters)",
+      params={"filename": "The path to the file to read"})
 def read_file(filename: str) -> str:
     """Read and return contents of a text file"""
     try:
-        # Security: Resolve path and check if it exists
-        abs_path = os.path.abspath(filename)
-        if not os.path.exists(abs_path):
-            return f"Error: File '{filename}' does not exist"
-        
-        if not os.path.isfile(abs_path):
-            return f"Error: '{filename}' is not a file"
-        
-        # Check file size (limit to 10KB for safety)
-        file_size = os.path.getsize(abs_path)
-        if file_size > 10 * 1024:  # 10KB limit
-            return f"Error: File '{filename}' is too large ({file_size} bytes). Maximum size is 10KB."
-        
-        # Try to read as text file
-        with open(abs_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Truncate if too long for display
-        if len(content) > 1000:
-            return f"Content of '{filename}' (first 1000 characters):\n{content[:1000]}..."
+        abs_path, error = _check_file(filename)
+        if error:
+            return error
+        
+        # Memory-mapped, so only the start of a huge file is read
+        content, truncated = fileread.read_head(abs_path, 1000)
+        if truncated:
+            size = _format_size(os.path.getsize(abs_path))
+            return (f"Content of '{filename}' (first 1000 characters of {size} - "
+                    f"use read_lines, read_bytes or grep_file for the rest):\n{content}...")
         else:
             return f"Content of '{filename}':\n{content}"
             
-    except UnicodeDecodeError:
+    except fileread.BinaryFileError:
+        return f"Error: '{filename}' appears to be a binary file, not a text file"
+    except PermissionError:
+        return f"Error: Permission denied reading '{filename}'"
+    except Exception as e:
+        return f"Error reading file '{filename}': {e}"
+
+@tool("Read a range of lines from a text file of any size, with line numbers. "
+      "A negative start counts from the end: start=-20 returns the last 20 lines.",
+      params={
+          "filename": "The path to the file to read",
+          "start": "First line to return (1-based; negative counts from the end)",
+          "count": f"Number of lines to return (at most {fileread.MAX_LINES})"
+      }, timeout=60)
+def read_lines(filename: str, start: int = 1, count: int = 50) -> str:
+    """Line range / head / tail of a file via the cached sparse line index"""
+    try:
+        abs_path, error = _check_file(filename)
+        if error:
+            return error
+        
+        lines, total, truncated = fileread.read_lines(abs_path, start, max(1, min(count, fileread.MAX_LINES)))
+        if not lines:
+            return f"'{filename}' is empty" if total == 0 else f"Error: '{filename}' has no line {start}"
+        
+        first, last = lines[0][0], lines[-1][0]
+        width = len(str(last))
+        header = f"Lines {first}-{last} of '{filename}'" + (f" ({total} lines total)" if total else "") + ":"
+        body = "\n".join(f"{number:>{width}}: {text}" for number, text in lines)
+        if truncated:
+            body += f"\n... (output limit reached - continue with start={last + 1})"
+        return f"{header}\n{body}"
+        
+    except fileread.BinaryFileError:
         return f"Error: '{filename}' appears to be a binary file, not a text file"
     except PermissionError:
         return f"Error: Permission denied reading '{filename}'"
     except Exception as e:
         return f"Error reading file '{filename}': {e}"
 
+@tool("Read a byte range from a text file of any size. A negative offset counts from the end of the file.",
+      params={
+          "filename": "The path to the file to read",
+          "offset": "Byte offset to start at (negative counts from the end)",
+          "length": f"Number of bytes to read (at most {fileread.READ_MAX_CHARS})"
+      })
+def read_bytes(filename: str, offset: int = 0, length: int = 2000) -> str:
+    """Byte range of a file, read through a memory map"""
+    try:
+        abs_path, error = _check_file(filename)
+        if error:
+            return error
+        
+        length = max(1, min(length, fileread.READ_MAX_CHARS))
+        text, size = fileread.read_bytes(abs_path, offset, length)
+        start = max(0, size + offset) if offset < 0 else offset
+        if not size:
+            return f"'{filename}' is empty"
+        if start >= size:
+            return f"Error: offset {offset} is past the end of '{filename}' ({size} bytes)"
+        end = min(size, start + length)
+        return f"Bytes {start}-{end} of '{filename}' ({_format_size(size)}):\n{text}"
+        
+    except fileread.BinaryFileError:
+        return f"Error: '{filename}' appears to be a binary file, not a text file"
+    except PermissionError:
+        return f"Error: Permission denied reading '{filename}'"
+    except Exception as e:
+        return f"Error reading file '{filename}': {e}"
+
+@tool("Search a text file of any size for a regular expression (grep) and return the matching lines with line numbers",
+      params={
+          "filename": "The path to the file to search",
+          "pattern": "Regular expression to search for (Python syntax)",
+          "ignore_case": "Match case-insensitively",
+          "max_matches": "Most matching lines to return"
+      }, timeout=60)
+def grep_file(filename: str, pattern: str, ignore_case: bool = False, max_matches: int = 50) -> str:
+    """grep over a memory-mapped file - nothing is loaded into memory"""
+    try:
+        abs_path, error = _check_file(filename)
+        if error:
+            return error
+        
+        matches, more = fileread.grep(abs_path, pattern, ignore_case, max(1, min(max_matches, fileread.MAX_LINES)))
+        if not matches:
+            return f"No lines in '{filename}' match '{pattern}'"
+        
+        width = len(str(matches[-1][0]))
+        lines = "\n".join(f"{number:>{width}}: {text}" for number, text in matches)
+        note = f"\n... (more matches - narrow the pattern or raise max_matches)" if more else ""
+        return f"{len(matches)} matching line(s) for '{pattern}' in '{filename}':\n{lines}{note}"
+        
+    except re.error as e:
+        return f"Error: invalid pattern '{pattern}': {e}"
+    except fileread.BinaryFileError:
+        return f"Error: '{filename}' appears to be a binary file, not a text file"
+    except PermissionError:
+        return f"Error: Permission denied reading '{filename}'"
+    except Exception as e:
+        return f"Error searching file '{filename}': {e}"
+
+def _describe(file_stat) -> tuple:
+    """(type, size, modified, permissions) as file_info shows them"""
+    if stat.S_ISDIR(file_stat.st_mode):
+        file_type = "Directory"
+    elif stat.S_ISREG(file_stat.st_mode):
+        file_type = "File"
+    elif stat.S_ISLNK(file_stat.st_mode):
+        file_type = "Symbolic Link"
+    else:
+        file_type = "Other"
+    modified = datetime.fromtimestamp(file_stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+    return file_type, _format_size(file_stat.st_size), modified, stat.filemode(file_stat.st_mode)
+
+@tool("Get file information including size, modified date, and type",
+      params={"filename": "The path to the file to get information about"})
 def file_info(filename: str) -> str:
     """Get file information including size, modified date, and type"""
     try:
@@ -445,34 +489,7 @@ def file_info(filename: str) -> str:
         
         # Get file stats
         file_stat = os.stat(abs_path)
-        
-        # Determine type
-        if os.path.isdir(abs_path):
-            file_type = "Directory"
-        elif os.path.isfile(abs_path):
-            file_type = "File"
-        elif os.path.islink(abs_path):
-            file_type = "Symbolic Link"
-        else:
-            file_type = "Other"
-        
-        # Format size
-        size = file_stat.st_size
-        if size < 1024:
-            size_str = f"{size} bytes"
-        elif size < 1024 * 1024:
-            size_str = f"{size/1024:.1f} KB"
-        elif size < 1024 * 1024 * 1024:
-            size_str = f"{size/(1024*1024):.1f} MB"
-        else:
-            size_str = f"{size/(1024*1024*1024):.1f} GB"
-        
-        # Format dates
-        modified_time = datetime.fromtimestamp(file_stat.st_mtime)
-        modified_str = modified_time.strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Get permissions (Unix-style)
-        permissions = stat.filemode(file_stat.st_mode)
+        file_type, size_str, modified_str, permissions = _describe(file_stat)
         
         info = f"Information for '{filename}':\n"
         info += f"Type: {file_type}\n"
@@ -487,46 +504,192 @@ def file_info(filename: str) -> str:
     except Exception as e:
         return f"Error getting info for '{filename}': {e}"
 
+def _batch_error(e: Exception) -> str:
+    """Short per-file error line for batch results"""
+    if isinstance(e, FileNotFoundError):
+        return "Error: does not exist"
+    if isinstance(e, IsADirectoryError):
+        return "Error: is a directory"
+    if isinstance(e, PermissionError):
+        return "Error: permission denied"
+    if isinstance(e, fileread.BinaryFileError):
+        return "Error: binary file"
+    return f"Error: {e}"
+
+@tool("Get information (type, size, modified date, permissions) for several files in one call. "
+      "Prefer this over calling file_info once per file.",
+      params={
+          "filenames": "Paths of the files",
+          "pattern": "Glob selecting the files instead of (or as well as) filenames, e.g. '*.py' or 'src/**/*.md'"
+      })
+def file_info_many(filenames: list[str] = None, pattern: str = "") -> str:
+    """file_info for a list of paths or a glob, stat'ed concurrently"""
+    try:
+        paths, more = multifile.expand_paths(filenames, pattern)
+        if not paths:
+            return f"No files match '{pattern}'" if pattern else "Error: give filenames or a pattern"
+        
+        results = multifile.map_files(lambda path: os.stat(os.path.abspath(path)), paths)
+        total = sum(st.st_size for _, st, error in results if error is None and stat.S_ISREG(st.st_mode))
+        lines = [f"{len(paths)} file(s), {_format_size(total)} total:", "path | type | size | modified | permissions"]
+        for path, file_stat, error in results:
+            if error is not None:
+                lines.append(f"{path} | {_batch_error(error)}")
+            else:
+                lines.append(" | ".join((path,) + _describe(file_stat)))
+        if more:
+            lines.append(f"... and more (at most {multifile.MAX_BATCH_FILES} per call - narrow the pattern)")
+        return "\n".join(lines)
+        
+    except Exception as e:
+        return f"Error getting file info: {e}"
+
+@tool("Read several text files in one call, concurrently, sharing one output budget "
+      "(small files whole, large ones truncated). Prefer this over calling read_file once per file.",
+      params={
+          "filenames": "Paths of the files to read",
+          "pattern": "Glob selecting the files instead of (or as well as) filenames, e.g. '*.py' or 'src/**/*.md'",
+          "max_chars": f"Total characters of content to return (at most {multifile.BATCH_MAX_CHARS * 2})"
+      }, timeout=60)
+def read_files(filenames: list[str] = None, pattern: str = "", max_chars: int = multifile.BATCH_MAX_CHARS) -> str:
+    """read_file for a list of paths or a glob under a shared character budget"""
+    try:
+        paths, more = multifile.expand_paths(filenames, pattern)
+        if not paths:
+            return f"No files match '{pattern}'" if pattern else "Error: give filenames or a pattern"
+        budget = max(multifile.MIN_FILE_CHARS, min(max_chars, multifile.BATCH_MAX_CHARS * 2))
+        
+        # Sizes first, so small files can be read whole and large ones share the rest
+        stats = multifile.map_files(lambda path: os.stat(os.path.abspath(path)), paths)
+        readable = [(path, st.st_size) for path, st, error in stats
+                    if error is None and stat.S_ISREG(st.st_mode)]
+        shares = dict(zip([path for path, _ in readable],
+                          multifile.share_budget([size for _, size in readable], budget)))
+        sizes = dict(readable)
+        
+        omitted = [path for path, size in readable if size and not shares[path]]
+        
+        def read(path):
+            if path not in shares:
+                raise IsADirectoryError(path)
+            return fileread.read_head(os.path.abspath(path), shares[path])
+        
+        results = multifile.map_files(read, [path for path in paths if path not in omitted])
+        lines = [f"{len(paths)} file(s), {_format_size(sum(sizes.values()))} total, "
+                 f"{budget}-character budget:"]
+        for path, value, error in results:
+            if error is not None:
+                stat_error = next((e for p, _, e in stats if p == path and e is not None), None)
+                lines.append(f"--- {path}: {_batch_error(stat_error or error)} ---")
+                continue
+            content, truncated = value
+            if truncated:
+                lines.append(f"--- {path} ({_format_size(sizes[path])}, first {len(content)} characters - "
+                             f"use read_lines for more) ---")
+            else:
+                lines.append(f"--- {path} ({_format_size(sizes[path])}) ---")
+            lines.append(content)
+        if omitted:
+            lines.append(f"... {len(omitted)} file(s) left out to stay within the budget: {', '.join(omitted)} - "
+                         f"read them separately or raise max_chars")
+        if more:
+            lines.append(f"... and more (at most {multifile.MAX_BATCH_FILES} per call - narrow the pattern)")
+        return "\n".join(lines)
+        
+    except Exception as e:
+        return f"Error reading files: {e}"
+
+def _index_note() -> str:
+    """Caveat for answers from an index that isn't complete"""
+    if not workspace_index.ready():
+        return f"\n(workspace index still building - {len(workspace_index.records())} files so far)"
+    if workspace_index.truncated:
+        return f"\n(workspace index stops at {MAX_FILES} files)"
+    return ""
+
+@tool("Find files anywhere in the workspace by name, extension, size or modification time, in one call",
+      params={
+          "name": "Glob like '*test*.py', or text the file's path must contain",
+          "extension": "Only files with this extension, e.g. 'md'",
+          "min_size": "Only files at least this many bytes",
+          "modified_within_days": "Only files modified in the last N days",
+          "limit": "Most files to return"
+      }, timeout=60)
+def find_files(name: str = "", extension: str = "", min_size: int = 0,
+               modified_within_days: float = 0, limit: int = 50) -> str:
+    """Answer "where is / which files" questions from the workspace index"""
+    try:
+        if not workspace_index.enabled:
+            return "Error: The workspace index is disabled (TASKTREK_WORKSPACE_INDEX=0)"
+        note = _index_note()
+        records = workspace_index.find(name, extension, min_size, modified_within_days)
+        if not records:
+            return f"No files in workspace '{workspace_index.root}' match the search{note}"
+        
+        records.sort(key=lambda r: r.path)
+        limit = max(1, min(limit, listing.MAX_PAGE_SIZE))
+        lines = [f"{len(records)} file(s) in workspace '{workspace_index.root}':"]
+        for record in records[:limit]:
+            modified = datetime.fromtimestamp(record.mtime_ns / 1e9).strftime("%Y-%m-%d %H:%M")
+            lines.append(f"📄 {record.path} ({_short_size(record.size)}, modified {modified})")
+        if len(records) > limit:
+            lines.append(f"... and {len(records) - limit} more - narrow the search or raise limit")
+        return "\n".join(lines) + note
+        
+    except Exception as e:
+        return f"Error searching the workspace: {e}"
+
+@tool("Search the contents of every text file in the workspace (like grep -r) and return "
+      "matching lines grouped by file, in one call",
+      params={
+          "query": "Text to search for (a regular expression if regex is true)",
+          "regex": "Treat query as a regular expression",
+          "ignore_case": "Match case-insensitively",
+          "path_glob": "Only files matching this glob, e.g. '*.py' or 'docs/*.md'",
+          "max_results": f"Most matching lines to return (at most {MAX_RESULTS * 4})"
+      }, timeout=60)
+def search_files(query: str, regex: bool = False, ignore_case: bool = True,
+                 path_glob: str = "", max_results: int = MAX_RESULTS) -> str:
+    """Answer "which files mention X" from the workspace index"""
+    try:
+        if not workspace_index.enabled:
+            return "Error: The workspace index is disabled (TASKTREK_WORKSPACE_INDEX=0)"
+        if not query:
+            return "Error: query is empty"
+        if regex:
+            re.compile(query)
+            pattern, literals = query, required_literals(query)
+        else:
+            pattern, literals = re.escape(query), [query]
+        note = _index_note()
+        
+        # The trigram index rules out files that can't match; the rest are grep'd via mmap
+        results, scanned, skipped, stopped = workspace_index.search(
+            pattern, literals, ignore_case, path_glob, max(1, min(max_results, MAX_RESULTS * 4))
+        )
+        if not results:
+            return f"No files in the workspace contain '{query}' ({scanned} searched, {skipped} ruled out by the index){note}"
+        
+        count = sum(len(matches) for _, matches in results)
+        lines = [f"'{query}' found in {len(results)} file(s), {count} line(s):"]
+        for path, matches in results:
+            lines.append(path)
+            lines.extend(f"  {number}: {text.strip()}" for number, text in matches)
+        if stopped:
+            lines.append("... (result limit reached - narrow the query or use path_glob)")
+        lines.append(f"({scanned} files searched, {skipped} ruled out by the index)")
+        return "\n".join(lines) + note
+        
+    except re.error as e:
+        return f"Error: invalid pattern '{query}': {e}"
+    except Exception as e:
+        return f"Error searching the workspace: {e}"
+
+# Add more tools with the @tool decorator (or registry.lazy_tool for plug-ins)
+
+# Tool schemas for the API, kept up to date by the registry
+function_defs = registry.function_defs
+
 def handle_tool_call(tool_call):
-    name = tool_call["function"]["name"]
-    args = json.loads(tool_call["function"]["arguments"])
-    
-    if name == "calculate":
-        return calculate(args["expression"])
-    
-    if name == "get_current_time":
-        return get_current_time()
-    
-    if name == "days_between":
-        return days_between(args["date1"], args["date2"])
-    
-    if name == "count_words":
-        return count_words(args["text"])
-    
-    if name == "count_characters":
-        return count_characters(args["text"])
-    
-    if name == "count_lines":
-        return count_lines(args["text"])
-    
-    if name == "web_search":
-        return web_search(args["query"])
-    
-    if name == "get_weather":
-        return get_weather(args["city"])
-    
-    if name == "url_content":
-        return url_content(args["url"])
-    
-    if name == "list_files":
-        directory = args.get("directory", ".")
-        return list_files(directory)
-    
-    if name == "read_file":
-        return read_file(args["filename"])
-    
-    if name == "file_info":
-        return file_info(args["filename"])
-    
-    # Add dispatch for more tools here
-    return f"Unknown tool: {name}"
\ No newline at end of file
+    """Dispatch a tool call through the registry (lookup + argument validation)"""
+    return registry.dispatch(tool_call)
\ No newline at end of file
@@ -0,0 +1,263 @@
+# tracing.py
+
+from collections import deque
+import contextvars
+import itertools
+import json
+import math
+import os
+import random
+import threading
+import time
+
+# Upper bounds (ms) of the latency histogram buckets shown by `stats`
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current = contextvars.ContextVar("tasktrek_span", default=None)
+
+
+class Span:
+    """One timed stage of a turn (times are time.perf_counter() seconds)"""
+
+    __slots__ = ("name", "span_id", "parent_id", "trace_id", "sampled", "start", "end", "thread_id", "attrs")
+
+    def __init__(self, name, span_id, parent, sampled, start, attrs):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else span_id
+        self.sampled = sampled
+        self.start = start
+        self.end = None
+        self.thread_id = threading.get_ident()
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+
+class _SpanContext:
+    """Context manager returned by Tracer.span"""
+
+    __slots__ = ("tracer", "name", "parent", "attrs", "span", "_token")
+
+    def __init__(self, tracer, name, parent, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+
+    def __enter__(self):
+        parent = self.parent if self.parent is not None else _current.get()
+        self.span = self.tracer._start(self.name, parent, self.attrs)
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            pass  # Closed from another context (e.g. an abandoned generator)
+        if exc_type is not None:
+            self.span.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(self.span)
+        return False
+
+
+class Tracer:
+    """Per-turn spans with rolling per-stage latency stats and file export.
+
+    Every span feeds the rolling stats behind the `stats` REPL command.
+    With an export path set, sampled traces are also written as JSONL (one
+    span per line) or, for any other extension, Chrome trace events that
+    load in chrome://tracing or Perfetto. Sampling is decided once per
+    root span, so a turn is exported whole or not at all.
+    """
+
+    def __init__(self, path=None, sample_rate=1.0, window=1000):
+        self.path = None
+        self.format = None
+        self.sample_rate = sample_rate
+        self.window = window
+        self._ids = itertools.count(1)
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._separator = ""
+        self._epoch_wall = time.time()
+        self._epoch = time.perf_counter()
+        self._pid = os.getpid()
+        self.configure(path=path)
+
+    def configure(self, path=None, sample_rate=None, window=None):
+        """Set the export file (None disables export) and/or sampling rate"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.path = path
+            self.format = "jsonl" if path and path.endswith(".jsonl") else "chrome"
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            if window is not None:
+                self.window = window
+                self._stages = {}
+
+    def span(self, name, parent=None, **attrs):
+        """Time a block: `with tracer.span("llm.request", kind="llm") as span:`.
+
+        Nests under the current span; pass parent= to continue a trace on
+        another thread (e.g. a tool running in the executor pool).
+        """
+        return _SpanContext(self, name, parent, attrs)
+
+    def add_span(self, name, start, end, **attrs):
+        """Record an already-measured stage under the current span"""
+        span = self._start(name, _current.get(), attrs, start)
+        span.end = end
+        self._finish(span)
+
+    def current(self):
+        return _current.get()
+
+    def get_stats(self):
+        """{stage: count, p50/p95/p99/max ms} over the rolling window"""
+        with self._lock:
+            stages = {name: sorted(samples) for name, samples in self._stages.items()}
+        stats = {}
+        for name, samples in sorted(stages.items()):
+            if not samples:
+                continue
+            # Nearest rank: the smallest sample with pct% of the window at or below it
+            pick = lambda pct: samples[max(0, math.ceil(pct / 100 * len(samples)) - 1)]
+            stats[name] = {
+                "count": len(samples),
+                "p50_ms": round(pick(50), 2),
+                "p95_ms": round(pick(95), 2),
+                "p99_ms": round(pick(99), 2),
+                "max_ms": round(samples[-1], 2)
+            }
+        return stats
+
+    def histogram(self, name):
+        """[(bucket label, count)] for one stage's rolling window"""
+        with self._lock:
+            samples = list(self._stages.get(name, ()))
+        counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        for value in samples:
+            index = next((i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if value < bound), len(HISTOGRAM_BUCKETS_MS))
+            counts[index] += 1
+        labels = [f"<{bound}ms" for bound in HISTOGRAM_BUCKETS_MS] + [f">={HISTOGRAM_BUCKETS_MS[-1]}ms"]
+        return list(zip(labels, counts))
+
+    def format_stats(self, width=30):
+        """Text report of per-stage percentiles and histograms for the REPL"""
+        stats = self.get_stats()
+        if not stats:
+            return "No spans recorded yet."
+        lines = []
+        for name, stage in stats.items():
+            lines.append(
+                f"{name}: n={stage['count']} p50={stage['p50_ms']}ms p95={stage['p95_ms']}ms "
+                f"p99={stage['p99_ms']}ms max={stage['max_ms']}ms"
+            )
+            buckets = [(label, count) for label, count in self.histogram(name) if count]
+            peak = max(count for _, count in buckets)
+            for label, count in buckets:
+                bar = "#" * max(1, round(count / peak * width))
+                lines.append(f"  {label:>9} {bar} {count}")
+        if self.path:
+            lines.append(f"Exporting {self.format} traces to {self.path} (sample rate {self.sample_rate})")
+        return "\n".join(lines)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stages = {}
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _start(self, name, parent, attrs, start=None):
+        if parent is not None:
+            sampled = parent.sampled
+        else:
+            sampled = bool(self.path) and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+        return Span(name, next(self._ids), parent, sampled, time.perf_counter() if start is None else start, attrs)
+
+    def _finish(self, span):
+        if span.end is None:
+            span.end = time.perf_counter()
+        duration_ms = (span.end - span.start) * 1000
+        with self._lock:
+            samples = self._stages.get(span.name)
+            if samples is None:
+                samples = self._stages[span.name] = deque(maxlen=self.window)
+            samples.append(duration_ms)
+            if span.sampled and self.path:
+                self._export(span, duration_ms)
+                if span.parent_id is None:
+                    self._file.flush()
+
+    def _export(self, span, duration_ms):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if self.format == "chrome":
+                # Chrome's JSON array format tolerates a missing closing bracket;
+                # separators go before each event so adding "]" gives valid JSON
+                if self._file.tell() == 0:
+                    self._file.write("[\n")
+                    self._separator = ""
+                else:
+                    self._separator = "" if _last_char(self.path) == "[" else ",\n"
+
+        if self.format == "jsonl":
+            record = {
+                "name": span.name,
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "start": round(self._epoch_wall + span.start - self._epoch, 6),
+                "duration_ms": round(duration_ms, 3),
+                "thread": span.thread_id,
+                **span.attrs
+            }
+            self._file.write(json.dumps(record, default=str) + "\n")
+        else:
+            event = {
+                "name": span.name,
+                "cat": "tasktrek",
+                "ph": "X",
+                "ts": round((span.start - self._epoch) * 1e6, 1),
+                "dur": round(duration_ms * 1000, 1),
+                "pid": self._pid,
+                "tid": span.thread_id,
+                "args": dict(span.attrs, trace_id=span.trace_id)
+            }
+            self._file.write(self._separator + json.dumps(event, default=str))
+            self._separator = ",\n"
+
+
+def _last_char(path):
+    """Last non-whitespace character of a file ("" if there is none)"""
+    with open(path, "rb") as f:
+        f.seek(max(0, os.path.getsize(path) - 64))
+        return f.read().decode("utf-8", "ignore").rstrip()[-1:]
+
+
+# Process-wide tracer. TASKTREK_TRACE_FILE=traces.jsonl (or trace.json for
+# Chrome format) turns on export; TASKTREK_TRACE_SAMPLE=0.1 keeps 10% of turns.
+tracer = Tracer(
+    path=os.getenv("TASKTREK_TRACE_FILE") or None,
+    sample_rate=float(os.getenv("TASKTREK_TRACE_SAMPLE", "1.0"))
+)
+span = tracer.span
@@ -0,0 +1,414 @@
+# workspace.py
+
+from collections import namedtuple
+import fnmatch
+import hashlib
+import os
+import re
+import threading
+import time
+import fileread
+from listing import NO_DESCEND
+
+# Files bigger than this are listed but their content isn't indexed - searches
+# always scan them
+MAX_INDEX_BYTES = int(os.getenv("TASKTREK_WORKSPACE_MAX_FILE_BYTES", str(1024 * 1024)))
+# Files tracked at most
+MAX_FILES = int(os.getenv("TASKTREK_WORKSPACE_MAX_FILES", "100000"))
+# A search re-checks the file system for changes when the index is older than this
+REFRESH_SECONDS = 10.0
+# How long a tool waits for the first build before answering from what's indexed
+BUILD_WAIT = 20.0
+# Matching lines one search returns
+MAX_RESULTS = 50
+# Rows written per transaction while (re)indexing
+_BATCH = 500
+
+_WORD = re.compile(rb"\w{3,}")
+
+# status: "text" (content in the signature), "large" (content not indexed)
+# or "binary" (never searched); signature is an int bitmap of `bits` bits
+FileRecord = namedtuple("FileRecord", "path size mtime_ns status bits signature")
+
+
+def trigram_positions(words, bits):
+    """Bit positions of the trigrams in words (lowercased ASCII-word bytes)"""
+    mask = bits - 1
+    trigrams = set()
+    for word in words:
+        if len(word) == 3:
+            trigrams.add(word)
+        else:
+            trigrams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return {(int.from_bytes(t, "little") * 2654435761 >> 7) & mask for t in trigrams}, len(trigrams)
+
+
+def signature(data):
+    """(bits, bitmap) trigram signature of a file's content.
+
+    A one-hash Bloom filter over the trigrams of its words, sized to about
+    4 bits per trigram so a file with a few hundred distinct words costs
+    512 bytes. Lowercased, so it filters case-insensitive searches too.
+    """
+    words = set(_WORD.findall(data.lower()))
+    positions, count = trigram_positions(words, 1 << 16)
+    bits = 256
+    while bits < count * 4 and bits < 1 << 16:
+        bits <<= 1
+    bitmap = bytearray(bits // 8)
+    for position in positions:
+        position &= bits - 1  # Same hash, folded to this file's size
+        bitmap[position >> 3] |= 1 << (position & 7)
+    return bits, int.from_bytes(bitmap, "little")
+
+
+class TrigramQuery:
+    """Trigram filter for a search: which files can contain the query"""
+
+    def __init__(self, literals):
+        self.words = set()
+        for literal in literals:
+            self.words.update(_WORD.findall(literal.encode("utf-8").lower()))
+        self._masks = {}
+
+    def mask(self, bits):
+        mask = self._masks.get(bits)
+        if mask is None:
+            positions, _ = trigram_positions(self.words, 1 << 16)
+            mask = 0
+            for position in positions:
+                mask |= 1 << (position & (bits - 1))
+            self._masks[bits] = mask
+        return mask
+
+    def may_match(self, record):
+        if record.status == "large" or not self.words:
+            return True
+        mask = self.mask(record.bits)
+        return record.signature & mask == mask
+
+
+# Hex digits taken by \x, \u and \U escapes
+_ESCAPE_DIGITS = {"x": 2, "u": 4, "U": 8}
+# A {m,n} repeat; any other "{" is a literal brace to re
+_QUANTIFIER = re.compile(r"\{\d*(?:,\d*)?\}")
+
+
+def _class_end(pattern, i):
+    """Index just past the [...] class starting at pattern[i]"""
+    i += 1
+    if pattern.startswith("^", i):
+        i += 1
+    if pattern.startswith("]", i):
+        i += 1  # A leading ] is a member, not the end
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            i += 2
+            continue
+        if pattern[i] == "]":
+            return i + 1
+        i += 1
+    return len(pattern)
+
+
+def required_literals(pattern):
+    """Literal runs every match of a regex must contain ([] if unsure).
+
+    Conservative: gives up on alternation and groups, drops the character
+    before a ?, * or {m,n} quantifier, and only escaped punctuation counts
+    as literal text.
+    """
+    runs, current, i = [], "", 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            i += 2
+            if escaped.isascii() and not escaped.isalnum():  # \. \( \\ ... stand for themselves
+                current += escaped
+                continue
+            # \d, \b, \n, \x41, \u00e9, \N{...}, \1 ... aren't the characters
+            # written after the backslash: end the run and skip their argument
+            runs.append(current)
+            current = ""
+            if escaped in _ESCAPE_DIGITS:
+                i += _ESCAPE_DIGITS[escaped]
+            elif escaped == "N" and pattern.startswith("{", i):
+                i = pattern.find("}", i) + 1 or len(pattern)
+            elif escaped.isdigit():
+                while i < len(pattern) and pattern[i].isdigit():
+                    i += 1
+            continue
+        if char in "?*{":
+            current = current[:-1]
+            runs.append(current)
+            current = ""
+            if char == "{":
+                # Skip a {m,n} repeat; a literal brace just breaks the run
+                quantifier = _QUANTIFIER.match(pattern, i)
+                i = quantifier.end() if quantifier else i + 1
+                continue
+        elif char == "+":
+            runs.append(current)
+            current = ""
+        elif char == "[":
+            runs.append(current)
+            current = ""
+            i = _class_end(pattern, i)
+            # The class's own quantifier is handled above with an empty run
+            continue
+        elif char in "|(":
+            return []
+        elif char in ".^$":
+            runs.append(current)
+            current = ""
+        else:
+            current += char
+        i += 1
+    runs.append(current)
+    return [run for run in runs if len(run) >= 3]
+
+
+def _default_db(root):
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    digest = hashlib.sha1(root.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_home, "tasktrek", f"workspace-{digest}.db")
+
+
+class WorkspaceIndex:
+    """Persistent index of the files under a workspace root.
+
+    Each file's path, size and mtime are tracked, plus a trigram signature
+    of text files (see signature()) so searches only open files that can
+    contain the query. The index lives in SQLite and is loaded at start;
+    a background thread then walks the workspace and re-indexes only files
+    whose size or mtime changed. Later searches repeat that diff when the
+    index is more than REFRESH_SECONDS old. The walk follows list_files'
+    rules: hidden directories, __pycache__ and node_modules are skipped.
+    """
+
+    def __init__(self, root=".", db_path=None, enabled=True, preload=False):
+        self.root = os.path.abspath(root)
+        self.db_path = db_path or _default_db(self.root)
+        self.enabled = enabled
+        self.preload = preload  # Build before the first search instead of on it
+        self._files = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._built = threading.Event()
+        self._thread = None
+        self._db = None
+        self.refreshed_at = 0.0
+        self.truncated = False
+        self.stats = {"refreshes": 0, "indexed": 0, "removed": 0, "last_refresh_ms": 0.0,
+                      "searches": 0, "files_scanned": 0, "files_skipped": 0}
+
+    def start(self):
+        """Load the saved index and bring it up to date in the background"""
+        with self._lock:
+            if not self.enabled or self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._build, name="workspace-index", daemon=True)
+        self._thread.start()
+
+    def ready(self, timeout=BUILD_WAIT):
+        """Start if needed, wait for the first build; refresh a stale index"""
+        self.start()
+        if not self._built.wait(timeout):
+            return False
+        if time.monotonic() - self.refreshed_at > REFRESH_SECONDS:
+            self.refresh()
+        return True
+
+    def records(self):
+        with self._lock:
+            return list(self._files.values())
+
+    def find(self, name="", extension="", min_size=0, modified_within_days=0):
+        """Records matching a name (glob, or substring of the path), an extension,
+        a minimum size and a modification age"""
+        records = self.records()
+        if name:
+            if any(char in name for char in "*?["):
+                regex = re.compile(fnmatch.translate(name), re.IGNORECASE)
+                by_path = "/" in name
+                records = [r for r in records if regex.match(r.path if by_path else os.path.basename(r.path))]
+            else:
+                needle = name.lower()
+                records = [r for r in records if needle in r.path.lower()]
+        if extension:
+            suffix = "." + extension.lower().lstrip(".")
+            records = [r for r in records if r.path.lower().endswith(suffix)]
+        if min_size:
+            records = [r for r in records if r.size >= min_size]
+        if modified_within_days:
+            cutoff = (time.time() - modified_within_days * 86400) * 1e9
+            records = [r for r in records if r.mtime_ns >= cutoff]
+        return records
+
+    def search(self, regex, literals, ignore_case=True, path_glob="", max_results=MAX_RESULTS):
+        """grep the workspace: ([(path, [(line, text)])], files scanned, files skipped,
+        stopped early). Only files whose signature holds the literals' trigrams are read."""
+        query = TrigramQuery(literals)
+        records = [r for r in self.records() if r.status != "binary"]
+        if path_glob:
+            glob = re.compile(fnmatch.translate(path_glob), re.IGNORECASE)
+            by_path = "/" in path_glob
+            records = [r for r in records if glob.match(r.path if by_path else os.path.basename(r.path))]
+        candidates = sorted((r for r in records if query.may_match(r)), key=lambda r: r.path)
+
+        results, remaining, chars, scanned, stopped = [], max_results, fileread.READ_MAX_CHARS, 0, False
+        for record in candidates:
+            try:
+                matches, more = fileread.grep(os.path.join(self.root, record.path), regex, ignore_case,
+                                              max_matches=remaining, max_chars=chars)
+            except (OSError, fileread.BinaryFileError):
+                continue  # Deleted or changed since the last refresh
+            scanned += 1
+            if matches:
+                results.append((record.path, matches))
+                remaining -= len(matches)
+                chars -= len(record.path) + sum(len(text) + 8 for _, text in matches)  # As the tool prints them
+            if more or remaining <= 0 or chars <= 0:
+                stopped = True
+                break
+        with self._lock:
+            self.stats["searches"] += 1
+            self.stats["files_scanned"] += scanned
+            self.stats["files_skipped"] += len(records) - len(candidates)
+        return results, scanned, len(records) - len(candidates), stopped
+
+    def refresh(self):
+        """Diff the workspace against the index by size and mtime; returns files re-indexed"""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            with self._lock:
+                known = dict(self._files)
+            seen, pending, indexed, truncated = set(), [], 0, False
+            for path, size, mtime_ns in self._walk():
+                if len(seen) >= MAX_FILES:
+                    truncated = True
+                    break
+                seen.add(path)
+                record = known.get(path)
+                if record is None or record.size != size or record.mtime_ns != mtime_ns:
+                    record = self._index_file(path, size, mtime_ns)
+                    if record is not None:
+                        pending.append(record)
+                if len(pending) >= _BATCH:
+                    # Publish as we go - a first build of a big tree is searchable early
+                    self._apply(pending, [])
+                    indexed += len(pending)
+                    pending = []
+            removed = [path for path in known if path not in seen]
+            self._apply(pending, removed)
+            indexed += len(pending)
+
+            with self._lock:
+                self.truncated = truncated
+                self.stats["refreshes"] += 1
+                self.stats["indexed"] += indexed
+                self.stats["removed"] += len(removed)
+                self.stats["last_refresh_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self.refreshed_at = time.monotonic()
+            return indexed
+
+    def get_stats(self):
+        with self._lock:
+            statuses = {"text": 0, "large": 0, "binary": 0}
+            for record in self._files.values():
+                statuses[record.status] += 1
+            return dict(self.stats, root=self.root, files=len(self._files), **statuses,
+                        ready=self._built.is_set(), truncated=self.truncated)
+
+    def _build(self):
+        try:
+            self._open_db()
+            self.refresh()
+        except Exception as e:
+            print(f"[TOOL] Workspace index failed: {e}")
+        finally:
+            self._built.set()
+
+    def _walk(self):
+        """(relative path, size, mtime_ns) of every file under the root"""
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                with os.scandir(os.path.join(self.root, rel_dir)) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name[0] != "." and entry.name not in NO_DESCEND:
+                            stack.append(rel)
+                    elif entry.is_file():
+                        st = entry.stat()
+                        yield rel, st.st_size, st.st_mtime_ns
+                except OSError:
+                    continue
+
+    def _index_file(self, path, size, mtime_ns):
+        try:
+            with fileread.MappedFile(os.path.join(self.root, path)) as f:
+                f.check_text()
+                if size > MAX_INDEX_BYTES:
+                    return FileRecord(path, size, mtime_ns, "large", 0, 0)
+                bits, bitmap = signature(bytes(f.mm))
+        except fileread.BinaryFileError:
+            return FileRecord(path, size, mtime_ns, "binary", 0, 0)
+        except OSError:
+            return None  # Vanished or unreadable - picked up again next refresh
+        return FileRecord(path, size, mtime_ns, "text", bits, bitmap)
+
+    def _open_db(self):
+        if self._db is not None:
+            return
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        import sqlite3  # Only loaded once the index is first used
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, status TEXT, bits INTEGER, signature BLOB)"
+        )
+        rows = self._db.execute("SELECT path, size, mtime_ns, status, bits, signature FROM files").fetchall()
+        with self._lock:
+            for path, size, mtime_ns, status, bits, blob in rows:
+                self._files[path] = FileRecord(path, size, mtime_ns, status, bits,
+                                               int.from_bytes(blob, "little") if blob else 0)
+
+    def _apply(self, records, removed):
+        """Update the in-memory index and its SQLite copy"""
+        with self._lock:
+            for record in records:
+                self._files[record.path] = record
+            for path in removed:
+                self._files.pop(path, None)
+        if self._db is None or not (records or removed):
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+            [(r.path, r.size, r.mtime_ns, r.status, r.bits,
+              r.signature.to_bytes(r.bits // 8, "little") if r.bits else None) for r in records]
+        )
+        self._db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+        self._db.commit()
+
+
+# Index of TASKTREK_WORKSPACE (default: the working directory), saved under
+# ~/.cache/tasktrek unless TASKTREK_WORKSPACE_DB is set. Nothing is read until
+# find_files / search_files is first called, unless TASKTREK_WORKSPACE is set:
+# then the CLI loads it in the background after the first task.
+# TASKTREK_WORKSPACE_INDEX=0 turns it off.
+workspace_index = WorkspaceIndex(
+    root=os.getenv("TASKTREK_WORKSPACE") or ".",
+    db_path=os.getenv("TASKTREK_WORKSPACE_DB") or None,
+    enabled=os.getenv("TASKTREK_WORKSPACE_INDEX", "1") != "0",
+    preload=bool(os.getenv("TASKTREK_WORKSPACE"))
+)